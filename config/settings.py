@@ -4,12 +4,14 @@ Pliki konfiguracyjne są przechowywane w katalogu 'config' w katalogu głównym
 Kolejno:
 - db_config.json: Ustawienia połączenia z bazą danych.
 - key.json: Klucz szyfrowania w formacie Base64 (32 bajty).
+- security.json: Polityka haszowania haseł (koszt bcrypt) i wyprowadzania klucza sejfu (koszt scrypt).
 
 kopie zapasowe istniejących plików konfiguracyjnych są tworzone w katalogu 'logs' z prefiksem 'backup' i znacznikiem czasu.
 
 Zawiera funkcje:
 - edit_db_config(): Interaktywnie edytuje plik config/db_config.json.
 - edit_key_file(): Interaktywnie edytuje plik config/key.json.
+- edit_security_config(): Interaktywnie ustawia lub kalibruje koszt bcrypt i scrypt w config/security.json.
 - configure_application(): Uruchamia interfejs ustawień i obsługuje przerwanie użytkownika.
 - main(): Główna pętla interfejsu użytkownika ustawień.
 - generate_key(): Generuje losowy klucz Base64 o długości 32 bajtów.
@@ -24,7 +26,8 @@ Zawiera funkcje:
 - _ensure_log_dir(): Tworzy katalog 'logs', jeśli nie istnieje.
 - _backup_existing_file(): Tworzy kopię zapasową istniejącego pliku konfiguracyjnego w katalogu 'logs'.
 - DEFAULT_DB_CONFIG: Domyślne ustawienia bazy danych.
-- ROOT_DIR, CONFIG_DIR, LOG_DIR, DB_CONFIG_PATH, KEY_PATH: Ścieżki do odpowiednich katalogów i plików konfiguracyjnych.
+- DEFAULT_SECURITY_CONFIG: Domyślna polityka haszowania haseł.
+- ROOT_DIR, CONFIG_DIR, LOG_DIR, DB_CONFIG_PATH, KEY_PATH, SECURITY_CONFIG_PATH: Ścieżki do odpowiednich katalogów i plików konfiguracyjnych.
 """
 
 import base64 # do kodowania i dekodowania Base64
@@ -48,9 +51,11 @@ CONFIG_DIR = ROOT_DIR / "config" # katalog konfiguracyjny
 LOG_DIR = ROOT_DIR / "logs" # katalog logów i kopii zapasowych
 DB_CONFIG_PATH = CONFIG_DIR / "db_config.json" # ścieżka do pliku konfiguracyjnego bazy danych
 KEY_PATH = CONFIG_DIR / "key.json" # ścieżka do pliku klucza szyfrowania
+SECURITY_CONFIG_PATH = CONFIG_DIR / "security.json" # ścieżka do pliku polityki haszowania haseł
 
 DEFAULT_DB_CONFIG: dict[str, Any] = { # domyślne ustawienia bazy danych
-    "engine": "mssql", # silnik bazy danych
+    "engine": "mssql", # silnik bazy danych ("mssql" lub "sqlite")
+    "sqlite_path": "", # plik bazy dla silnika sqlite (puste = data/password_manager.db)
     "driver": "ODBC Driver 18 for SQL Server", # sterownik ODBC
     "server": "localhost", # adres serwera
     "port": 1433, # port serwera
@@ -61,6 +66,15 @@ DEFAULT_DB_CONFIG: dict[str, Any] = { # domyślne ustawienia bazy danych
     "column_encryption": False, # Always Encrypted (Column Encryption)
     "trust_server_certificate": True, # zaufaj certyfikatowi serwera
     "timeout": 5, # timeout połączenia w sekundach
+    "pool_size": 5, # maksymalna liczba połączeń w puli
+    "pool_idle_timeout": 300, # czas (s), po którym bezczynne połączenie z puli jest zamykane
+}
+
+DEFAULT_SECURITY_CONFIG: dict[str, Any] = { # domyślna polityka haszowania haseł
+    "bcrypt_rounds": 15, # koszt bcrypt dla nowych skrótów (skróty o innym koszcie są przeliczane przy logowaniu)
+    "bcrypt_target_ms": 250, # docelowy czas haszowania używany przy kalibracji
+    "scrypt_log_n": 15, # koszt scrypt (log2 N) klucza opakowującego klucz danych (klucze o innym koszcie są opakowywane ponownie przy logowaniu)
+    "scrypt_target_ms": 250, # docelowy czas odblokowania sejfu używany przy kalibracji
 }
 
 
@@ -136,7 +150,12 @@ def edit_db_config() -> None: # interaktywnie edytuje plik config/db_config.json
     print("\n--- Edycja config/db_config.json ---") # nagłówek sekcji edycji konfiguracji bazy danych
     config = _load_json(DB_CONFIG_PATH, DEFAULT_DB_CONFIG) # wczytuje istniejącą konfigurację lub używa domyślnych wartości
 # interaktywnie pobiera nowe wartości od użytkownika
-    config["engine"] = _prompt_value("Silnik bazy danych", config["engine"], str) 
+    config["engine"] = _prompt_value("Silnik bazy danych (mssql/sqlite)", config["engine"], str) 
+    if str(config["engine"]).strip().lower() == "sqlite": # lokalny plik bazy - parametry serwera nie są potrzebne
+        config["sqlite_path"] = _prompt_value("Plik bazy SQLite (puste = data/password_manager.db)", config["sqlite_path"], str)
+        config["timeout"] = _prompt_value("Timeout blokady (s)", config["timeout"], int)
+        _save_json(DB_CONFIG_PATH, config, backup_prefix="backupdb_config")
+        return
     config["driver"] = _prompt_value("Sterownik ODBC", config["driver"], str) 
     config["server"] = _prompt_value("Adres serwera", config["server"], str) 
     config["port"] = _prompt_value("Port", config["port"], int)
@@ -214,11 +233,63 @@ def edit_key_file() -> None: # interaktywnie edytuje plik config/key.json
             print("[!] Nieznana opcja.")
 
 
+def edit_security_config() -> None: # interaktywnie ustawia koszt bcrypt i scrypt w config/security.json
+    print("\n--- Edycja config/security.json ---") # nagłówek sekcji edycji polityki haszowania
+    config = _load_json(SECURITY_CONFIG_PATH, DEFAULT_SECURITY_CONFIG) # wczytuje istniejącą politykę lub używa domyślnych wartości
+    print(f"Aktualny koszt bcrypt: {config['bcrypt_rounds']}")
+    print(f"Aktualny koszt scrypt (log2 N): {config['scrypt_log_n']}")
+    print("\n1. Skalibruj koszt bcrypt do docelowego czasu logowania")
+    print("2. Wprowadź koszt bcrypt ręcznie")
+    print("3. Skalibruj koszt scrypt do docelowego czasu odblokowania sejfu")
+    print("4. Wprowadź koszt scrypt ręcznie")
+    print("Q. Powrót")
+    choice = input("Wybierz opcję: ").strip().lower()
+
+    if choice == "1":
+        from security.hashing import calibrate_bcrypt_cost # import tylko przy kalibracji (wymaga bcrypt)
+
+        config["bcrypt_target_ms"] = _prompt_value("Docelowy czas haszowania (ms)", config["bcrypt_target_ms"], int)
+        print("Trwa pomiar szybkości bcrypt...")
+        rounds, elapsed = calibrate_bcrypt_cost(config["bcrypt_target_ms"])
+        print(f"[+] Dobrany koszt: {rounds} (~{elapsed:.0f} ms na haszowanie).")
+        config["bcrypt_rounds"] = rounds
+    elif choice == "2":
+        rounds = _prompt_value("Koszt bcrypt (10-31)", config["bcrypt_rounds"], int)
+        if not 10 <= rounds <= 31:
+            print("[!] Koszt musi mieścić się w zakresie 10-31.")
+            return
+        config["bcrypt_rounds"] = rounds
+    elif choice == "3":
+        from security.kdf import calibrate_scrypt_cost # import tylko przy kalibracji
+
+        config["scrypt_target_ms"] = _prompt_value("Docelowy czas odblokowania sejfu (ms)", config["scrypt_target_ms"], int)
+        print("Trwa pomiar szybkości scrypt...")
+        log_n, elapsed = calibrate_scrypt_cost(config["scrypt_target_ms"])
+        print(f"[+] Dobrany koszt: {log_n} (~{elapsed:.0f} ms i {2 ** log_n // 1024} MiB na odblokowanie).")
+        config["scrypt_log_n"] = log_n
+    elif choice == "4":
+        log_n = _prompt_value("Koszt scrypt - log2 N (14-20)", config["scrypt_log_n"], int)
+        if not 14 <= log_n <= 20:
+            print("[!] Koszt musi mieścić się w zakresie 14-20.")
+            return
+        config["scrypt_log_n"] = log_n
+    else:
+        print("Przerwano edycję polityki haszowania.")
+        return
+
+    if choice in {"1", "2"}:
+        print("[i] Skróty o innym koszcie zostaną przeliczone przy najbliższym logowaniu użytkowników.")
+    else:
+        print("[i] Klucze danych o innym koszcie zostaną opakowane ponownie przy najbliższym logowaniu użytkowników.")
+    _save_json(SECURITY_CONFIG_PATH, config, backup_prefix="backupsecurity") # zapisuje politykę z kopią zapasową
+
+
 def main() -> None: # główna pętla interfejsu użytkownika ustawień W CLI
     while True:
         print("\n===== Ustawienia aplikacji =====")
         print("1. Edytuj config/db_config.json")
         print("2. Edytuj config/key.json")
+        print("3. Koszt haszowania haseł (config/security.json)")
         print("Q. Zakończ")
 
         choice = input("Wybierz opcję: ").strip().lower()
@@ -226,6 +297,8 @@ def main() -> None: # główna pętla interfejsu użytkownika ustawień W CLI
             edit_db_config()
         elif choice == "2":
             edit_key_file()
+        elif choice == "3":
+            edit_security_config()
         elif choice == "q":
             print("Do zobaczenia!")
             break
@@ -1,23 +1,37 @@
-"""Logika połączenia z bazą danych SQL Server. Odczytuje konfigurację z pliku JSON i tworzy połączenie za pomocą pyodbc. Zarówno do użytku w CLI, jak i do integracji z GUI.
+"""Logika połączenia z bazą danych. Odczytuje konfigurację z pliku JSON i tworzy połączenie przez silnik wskazany kluczem "engine" (storage_engine.py). Zarówno do użytku w CLI, jak i do integracji z GUI.
 
 
 
-Zawiera funkcje do formatowania serwera i portu oraz budowania łańcucha połączenia.
+Funkcje formatowania serwera i portu oraz budowania łańcucha połączenia (split_server_and_port, format_server_with_port,
+build_connection_string) znajdują się w storage_engine.py i są tu reeksportowane.
 Kolejno:
-- split_server_and_port: Rozdziela surowy ciąg serwera na serwer i port.
-- format_server_with_port: Formatuje serwer z portem do postaci odpowiedniej dla łańcucha połączenia.
-- build_connection_string: Buduje łańcuch połączenia na podstawie konfiguracji.
 - connect_with_config: Nawiązuje połączenie z bazą danych na podstawie podanej konfiguracji.
+- get_storage_engine: Zwraca silnik składowania dla pliku konfiguracyjnego.
 - connect: Nawiązuje połączenie z bazą danych, odczytując konfigurację z pliku JSON.
 - disconnect: Zamyka połączenie z bazą danych.  
+- load_config: Zwraca konfigurację z pliku JSON, buforowaną według ścieżki i czasu modyfikacji pliku.
+- ConnectionPool: Ograniczona pula połączeń z walidacją i usuwaniem bezczynnych połączeń.
+- get_pool: Zwraca pulę połączeń dla podanego pliku konfiguracyjnego (tworzy ją przy zmianie konfiguracji).
+- pooled_connection: Menedżer kontekstu wypożyczający połączenie z puli i oddający je po użyciu.
+- close_all_pools: Zamyka wszystkie pule połączeń (np. przy zamykaniu aplikacji).
 
 
 """
 
 import json #importowanie modułu json celem odczytania pliku JSON
+import threading #importowanie modułu threading do synchronizacji dostępu do puli
+import time #importowanie modułu time do mierzenia czasu bezczynności połączeń
+from contextlib import contextmanager #importowanie dekoratora contextmanager do budowy menedżerów kontekstu
 from pathlib import Path #importowanie modułu Path do obsługi ścieżek
 
-import pyodbc #importowanie modułu pyodbc do obsługi połączeń z bazą danych
+from .storage_engine import ( #importowanie silników składowania (reeksport funkcji łańcucha połączenia dla zgodności)
+    DB_DISCONNECT_ERRORS,
+    StorageEngine,
+    build_connection_string,
+    format_server_with_port,
+    get_engine,
+    split_server_and_port,
+)
 
 def _resolve_config_path(path: str) -> Path: #zamyka względne ścieżki do katalogu głównego aplikacji
     candidate = Path(path)
@@ -26,79 +40,43 @@ def _resolve_config_path(path: str) -> Path: #zamyka względne ścieżki do kata
     root_dir = Path(__file__).resolve().parent.parent
     return root_dir / candidate
 
-def split_server_and_port( #logika rozdzielania serwera i portu z surowego ciągu np. "localhost,1433 ----> ("localhost", 1433)
-    raw_server: str, default_server: str, default_port: int | None 
-) -> tuple[str, int | None, str | None]: 
-    server_value = raw_server.strip() or default_server #usuwanie białych znaków i ustawianie domyślnego serwera
-    port_value: int | None = default_port #ustawianie domyślnego portu
-    warning: str | None = None #inicjalizacja zmiennej ostrzeżenia jako None
-    if "," in server_value: #sprawdzanie czy w surowym ciągu znajduje się przecinek
-        host_part, port_part = server_value.split(",", 1) #rozdzielanie surowego ciągu na część hosta i portu
-        server_value = host_part.strip() or default_server #usuwanie białych znaków z części hosta i ustawianie domyślnego serwera
-        port_candidate = port_part.strip() #usuwanie białych znaków z części portu
-        if port_candidate: #sprawdzanie czy część portu nie jest pusta
-            try:
-                port_value = int(port_candidate) #próba konwersji części portu na liczbę całkowitą
-            except ValueError:
-                warning = "[!] Nieprawidłowy port w adresie serwera – użyto wartości domyślnej."
-    return server_value, port_value, warning #zwracanie serwera, portu i ostrzeżenia
-
-
-def format_server_with_port(server: str, port: int | None) -> str: #formatowanie serwera z portem do postaci odpowiedniej dla łańcucha połączenia
-    return f"{server},{port}" if port else server #jeżeli port jest podany to zwróć serwer z portem, w przeciwnym razie zwróć sam serwer
-
-
-def build_connection_string( # buduje lancuch polaczenia
+def connect_with_config( #Logika połaczenia z baza danych, uzywane dane do polaczenia sa z pliku json config\db_config.json
     config: dict, *, include_database: bool = False
-) -> str:
-    raw_server = str(config.get("server") or "")
-    default_server = raw_server or "localhost"
-    server_value, port_value, _ = split_server_and_port(
-        raw_server, default_server, config.get("port")
-    )
-    server = format_server_with_port(server_value, port_value) #Formatowanie serwera z portem
-    driver = config.get("driver", "ODBC Driver 18 for SQL Server") #Domyślny sterownik ODBC
-    trust = "yes" if config.get("trust_server_certificate", True) else "no" #Ustawienie zaufania do certyfikatu serwera
-    encrypt = "yes" if config.get("encrypt", True) else "no" #Ustawienie szyfrowania połączenia
-    column_encryption = bool(config.get("column_encryption")) #Always Encrypted (Column Encryption)
-    app_name = "PasswordManagerClient" #Nazwa aplikacji - wymagane gdyż SQL Server blokuje bez nazwy aplikacji
-
-    parts = [
-        f"DRIVER={{{driver}}}",  #Utworzenie ciagu polaczenia z uzyciem sterownika ODBC
-        f"SERVER={server}",  #Utworzenie ciagu polaczenia z serwerem
-        f"Encrypt={encrypt}", #Ustawienie szyfrowania
-        f"TrustServerCertificate={trust}", #Ustawienie zaufania do certyfikatu serwera
-        f"APP={app_name}", #Nazwa aplikacji - wymagane gdyż SQL Server blokuje bez nazwy aplikacji
-    ]
-
-    if column_encryption:
-        parts.append("ColumnEncryption=Enabled")
+):
+    return get_engine(config).connect(config, include_database=include_database) #połączenie przez silnik wskazany kluczem "engine"
 
-    if include_database and config.get("database"):
-        parts.append(f"DATABASE={config['database']}")
 
-    if config.get("username"):  #jeżeli podano nazwe uzytkownika i haslo to dodaj je do ciagu polaczenia
-        parts += [f"UID={config['username']}", f"PWD={config.get('password', '')}"]
-    else:
-        parts += ["Trusted_Connection=yes"] #jeżeli nie podano to uzyj polaczenia zaufanego (Windows Authentication)
+_CONFIG_CACHE: dict[Path, tuple[int, dict]] = {} #bufor konfiguracji: ścieżka -> (czas modyfikacji, konfiguracja)
+_CONFIG_LOCK = threading.Lock() #blokada chroniąca bufor konfiguracji
 
-    return ";".join(parts) #Utworzenie koncowego ciagu polaczenia
 
+def load_config(path: str = "config/db_config.json") -> dict: #odczytuje konfigurację z pliku JSON z buforowaniem
+    """Zwraca konfigurację połączenia, parsując plik tylko po jego zmianie.
 
-def connect_with_config( #Logika połaczenia z baza danych, uzywane dane do polaczenia sa z pliku json config\db_config.json
-    config: dict, *, include_database: bool = False
-):
-    conn_str = build_connection_string(config, include_database=include_database)
-    timeout = int(config.get("timeout", 5)) #pobranie timeoutu z pliku konfiguracyjnego lub ustawienie domyślnej wartosci 5 sekund
-    return pyodbc.connect(conn_str, timeout=timeout, autocommit=False) #zwrócenie obiektu połączenia z bazą danych
-
-
-def connect(path: str = "config/db_config.json"): #Logika połaczenia z baza danych, uzywane dane do polaczenia sa z pliku json config\db_config.json
+    Bufor jest kluczowany ścieżką pliku, a ważność wpisu sprawdzana po czasie
+    modyfikacji, więc zapis nowej konfiguracji z GUI jest widoczny od razu.
+    """
     config_path = _resolve_config_path(path)
+    mtime = config_path.stat().st_mtime_ns #czas modyfikacji pliku (FileNotFoundError gdy brak pliku)
+    with _CONFIG_LOCK:
+        cached = _CONFIG_CACHE.get(config_path)
+        if cached is not None and cached[0] == mtime: #plik nie zmienił się od ostatniego odczytu
+            return dict(cached[1])
+
     with config_path.open("r", encoding="utf-8") as f:
         c = json.load(f)
 
-    return connect_with_config(c, include_database=True)
+    with _CONFIG_LOCK:
+        _CONFIG_CACHE[config_path] = (mtime, c)
+    return dict(c)
+
+
+def get_storage_engine(path: str = "config/db_config.json") -> StorageEngine: #zwraca silnik dla pliku konfiguracyjnego
+    return get_engine(load_config(path))
+
+
+def connect(path: str = "config/db_config.json"): #Logika połaczenia z baza danych, uzywane dane do polaczenia sa z pliku json config\db_config.json
+    return connect_with_config(load_config(path), include_database=True)
 
 
 
@@ -109,6 +87,184 @@ def disconnect(conn) -> None: # Logika rozłączania z bazą danych
         except:
             pass #ignorowanie bledow przy zamykaniu polaczenia
 
+
+class PoolTimeoutError(RuntimeError): #wyjątek zgłaszany, gdy w puli zabrakło wolnych połączeń
+    """Zgłaszany, gdy nie udało się wypożyczyć połączenia w zadanym czasie."""
+
+
+class ConnectionPool: #ograniczona pula połączeń z bazą danych
+    """Pula ciepłych połączeń dla jednej konfiguracji bazy danych.
+
+    - max_size ogranicza liczbę jednocześnie otwartych połączeń,
+    - połączenia bezczynne dłużej niż idle_timeout są zamykane,
+    - połączenie bezczynne dłużej niż validate_after jest sprawdzane
+      zapytaniem ``SELECT 1`` przed wydaniem,
+    - przy oddaniu połączenia niezatwierdzona transakcja jest wycofywana.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        *,
+        max_size: int = 5,
+        idle_timeout: float = 300.0,
+        validate_after: float = 30.0,
+        acquire_timeout: float = 30.0,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError("Rozmiar puli musi być dodatni.")
+        self.config = dict(config) #kopia konfiguracji, dla której utworzono pulę
+        self.engine = get_engine(self.config) #silnik składowania dla tej konfiguracji
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._validate_after = validate_after
+        self._acquire_timeout = acquire_timeout
+        self._idle: list[tuple[object, float]] = [] #stos bezczynnych połączeń (połączenie, czas oddania)
+        self._size = 0 #liczba otwartych połączeń (bezczynne + wypożyczone)
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _open(self): #otwiera nowe połączenie fizyczne
+        return self.engine.connect(self.config, include_database=True)
+
+    def _is_alive(self, conn) -> bool: #sprawdza, czy połączenie nadal odpowiada
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            finally:
+                cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle_locked(self, now: float) -> list: #wybiera połączenia bezczynne zbyt długo (wywoływane pod blokadą)
+        expired = [conn for conn, released in self._idle if now - released > self._idle_timeout]
+        if expired:
+            self._idle = [(conn, released) for conn, released in self._idle if now - released <= self._idle_timeout]
+            self._size -= len(expired)
+        return expired
+
+    def acquire(self): #wypożycza połączenie z puli
+        deadline = time.monotonic() + self._acquire_timeout
+        while True:
+            conn = None
+            released_at = 0.0
+            expired: list = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Pula połączeń została zamknięta.")
+                    now = time.monotonic()
+                    expired += self._evict_idle_locked(now)
+                    if self._idle: #najpierw najcieplejsze (ostatnio oddane) połączenie
+                        conn, released_at = self._idle.pop()
+                        break
+                    if self._size < self._max_size: #rezerwacja miejsca na nowe połączenie
+                        self._size += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise PoolTimeoutError("Brak wolnych połączeń w puli.")
+                    self._cond.wait(remaining)
+            for stale in expired: #zamykanie poza blokadą, aby nie blokować innych wątków
+                disconnect(stale)
+
+            if conn is None: #nowe połączenie
+                try:
+                    return self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if time.monotonic() - released_at <= self._validate_after or self._is_alive(conn):
+                return conn
+            disconnect(conn) #martwe połączenie - zwolnij miejsce i spróbuj ponownie
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+    def release(self, conn, *, discard: bool = False) -> None: #oddaje połączenie do puli
+        if not discard:
+            try:
+                conn.rollback() #porzucenie niezatwierdzonych zmian poprzedniego użytkownika
+            except Exception:
+                discard = True
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            disconnect(conn)
+
+    @contextmanager
+    def connection(self): #menedżer kontekstu: wypożycz i oddaj połączenie
+        conn = self.acquire()
+        try:
+            yield conn
+        except DB_DISCONNECT_ERRORS: #zerwane połączenie nie wraca do puli
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self) -> None: #zamyka pulę i wszystkie bezczynne połączenia
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            disconnect(conn)
+
+
+_POOLS: dict[Path, ConnectionPool] = {} #rejestr pul: ścieżka konfiguracji -> pula
+_POOLS_LOCK = threading.Lock() #blokada rejestru pul
+
+
+def get_pool(path: str = "config/db_config.json") -> ConnectionPool: #zwraca pulę dla pliku konfiguracyjnego
+    """Zwraca pulę połączeń dla ``path``; przy zmianie konfiguracji tworzy nową."""
+    config = load_config(path)
+    key = _resolve_config_path(path)
+    stale = None
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None or pool.config != config:
+            stale = pool
+            pool = ConnectionPool(
+                config,
+                max_size=int(config.get("pool_size", 5)),
+                idle_timeout=float(config.get("pool_idle_timeout", 300)),
+            )
+            _POOLS[key] = pool
+    if stale is not None: #stara pula - połączenia do poprzedniej konfiguracji nie są już potrzebne
+        stale.close()
+    return pool
+
+
+@contextmanager
+def pooled_connection(path: str = "config/db_config.json"): #wypożycza połączenie z puli dla pliku konfiguracyjnego
+    with get_pool(path).connection() as conn:
+        yield conn
+
+
+def close_all_pools() -> None: #zamyka wszystkie pule połączeń
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+
 """ pozostawiona logika do testowania bazy danych. 
 def testbazy(): # testuje polaczenie z baza:
     conn = None
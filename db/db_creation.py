@@ -1,56 +1,41 @@
 """Logika tworzenia bazy danych. Sprawdza istnienie bazy danych o podanej nazwie, a jeśli nie istnieje, tworzy ją. 
 Domyślnie tworzy bazę danych o nazwie 'password_manager'.
 Używa konfiguracji połączenia z pliku config/db_config.json lub przyjętej jako słownik.
+Sposób sprawdzenia i utworzenia bazy zależy od silnika (storage_engine.py) - dla SQLite bazą jest plik wskazany w konfiguracji.
 Zwraca True, jeśli baza danych została utworzona, lub False, jeśli już istniała.
 
 Plik .py zawiera funkcje kolejno:
 - ensure_database_exists: Sprawdza istnienie bazy danych i tworzy ją, jeśli nie istnieje.
 """
 
-from .db_connection import connect, connect_with_config, disconnect #importowanie funkcji connect i disconnect z pliku db_connection.py
+from .db_connection import disconnect, get_pool #importowanie funkcji połączeń z pliku db_connection.py
+from .storage_engine import get_engine #importowanie wyboru silnika składowania
+from .schema_registry import DATABASE, is_schema_ready, mark_schema_ready, schema_scope #importowanie rejestru stanu schematu
 
 def ensure_database_exists( #funkcja sprawdzająca istnienie bazy danych i tworząca ją, jeśli nie istnieje
     db_name: str = "password_manager", #nazwa bazy danych do utworzenia lub sprawdzenia
     config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego z danymi połączenia
     config: dict | None = None, #opcjonalny słownik z danymi konfiguracyjnymi do połączenia
 ) -> bool: #logika tworzenia bazy danych o nazwie password_manager
-    cn = connect_with_config(config) if config else connect(config_path) #nawiązanie połączenia z serwerem baz danych
-    try:
-        cur = cn.cursor() #utworzenie kursora do wykonywania zapytań SQL
+    if config: #jednorazowe połączenie dla konfiguracji spoza pliku (np. test połączenia z GUI)
+        engine = get_engine(config) #silnik wskazany w testowanej konfiguracji
+        cn = engine.connect(config) #nawiązanie połączenia z serwerem baz danych
         try:
-            # 1 - sprawdzenie istnienia bazy danych
-            cur.execute("""
-                DECLARE @db sysname = ?;
-                SELECT DB_ID(@db);
-            """, db_name)
-            exists_before = cur.fetchone()[0] is not None #sprawdzenie czy baza danych o podanej nazwie już istnieje
-            if exists_before: #jeżeli baza danych istnieje to zwróć False
-                return False 
-
-            
-            prev_autocommit = cn.autocommit #wyłączenie autocommitu na czas tworzenia bazy danych
-            cn.autocommit = True #ustawienie autocommitu na True
-            try: # 2 - tworzenie bazy danych
-                cur.execute("""
-IF DB_ID(?) IS NULL
-BEGIN
-    DECLARE @n sysname = ?;
-    DECLARE @sql nvarchar(max) = N'CREATE DATABASE [' + REPLACE(@n, ']', ']]') + N']';
-    EXEC(@sql);
-END
-""", db_name, db_name) #utworzenie bazy danych o podanej nazwie jeżeli nie istnieje
-            finally:
-                cn.autocommit = prev_autocommit #przywrócenie poprzedniego stanu autocommitu
-
-    
-            cur.execute("SELECT DB_ID(?)", db_name) # 3 - potwierdzenie istnienia bazy danych po utworzeniu
-            exists_after = cur.fetchone()[0] is not None #sprawdzenie czy baza danych została utworzona
-            return exists_after and not exists_before #zwrócenie True jeżeli baza danych została utworzona, False jeżeli istniała wcześniej
+            return engine.ensure_database(cn, db_name)
         finally:
-            cur.close() #zamknięcie kursora
-    finally:
-        disconnect(cn) #rozłączenie z serwerem baz danych
-        
+            disconnect(cn) #rozłączenie z serwerem baz danych
+
+    scope = schema_scope(config_path, db_name) #zakres rejestru dla bieżącej konfiguracji
+    if is_schema_ready(scope, DATABASE): #baza została już sprawdzona w tym procesie
+        return False
+
+    pool = get_pool(config_path)
+    with pool.connection() as cn: #połączenie wypożyczone z puli
+        created = pool.engine.ensure_database(cn, db_name) #sprawdzenie i utworzenie bazy zależne od silnika
+    mark_schema_ready(scope, DATABASE)
+    return created
+
+
 """
 #Nieużywana logika testowania tworzenia bazy danych.
 def testbazy(): # testuje polaczenie z baza:
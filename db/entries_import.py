@@ -0,0 +1,192 @@
+"""Import wpisów z plików CSV innych menedżerów haseł (Chrome, Firefox, Bitwarden, KeePass/KeePassXC).
+Import działa jako strumieniowy potok generatorów: odczyt wierszy CSV -> normalizacja serwisu i loginu -> szyfrowanie
+kluczem danych użytkownika w puli wątków -> wstawianie partiami (add_password_entries). W pamięci znajduje się tylko
+bieżąca partia, więc zużycie pamięci nie zależy od wielkości pliku.
+Wiersze odrzucone (brak hasła, wpis innego typu niż login itp.) zapisywane są do pliku obok importowanego
+("<plik>.rejected.csv") z numerem wiersza i powodem odrzucenia.
+
+Zawiera funkcje kolejno:
+- ImportResult: Klasa opisująca wynik importu.
+- detect_layout: Rozpoznaje układ kolumn na podstawie nagłówka CSV.
+- read_csv_records: Zwraca nagłówek i generator kolejnych wierszy pliku CSV.
+- normalize_records: Zamienia wiersze CSV na wpisy (serwis, login, hasło, data wygaśnięcia), odrzucając niepoprawne.
+- import_password_csv: Importuje plik CSV do sejfu użytkownika.
+
+Dodatkowo używa funkcji z tablepassword_crud.py do wstawiania wpisów partiami.
+"""
+
+import csv #importowanie modułu csv do odczytu i zapisu plików CSV
+import io #importowanie modułu io do dekodowania pliku z licznikiem odczytanych bajtów
+import os #importowanie modułu os do ustalenia rozmiaru pliku
+from pathlib import Path #importowanie modułu Path do obsługi ścieżek
+from typing import Callable, Iterable, Iterator, NamedTuple #importowanie typów z modułu typing
+from urllib.parse import urlsplit #importowanie funkcji urlsplit do wyznaczenia serwisu z adresu URL
+
+from security.keyring import SessionKeyRing #importowanie pęku kluczy sesji (typ klucza szyfrowania)
+from .tablepassword_crud import ENTRY_INSERT_CHUNK_SIZE, add_password_entries #importowanie wstawiania partiami z pliku tablepassword_crud.py
+
+MAX_FIELD_LENGTH = 255 #długość kolumn service i login w dbo.entries
+REJECTED_SUFFIX = ".rejected.csv" #sufiks pliku z odrzuconymi wierszami
+
+# układ -> (kolumny serwisu, kolumny adresu URL, kolumny loginu, kolumny hasła); nazwy kolumn małymi literami
+_LAYOUTS: dict[str, tuple[tuple[str, ...], tuple[str, ...], tuple[str, ...], tuple[str, ...]]] = {
+    "bitwarden": (("name",), ("login_uri",), ("login_username",), ("login_password",)),
+    "keepass": (("title", "account"), ("url", "web site"), ("username", "login name", "user name"), ("password",)),
+    "chrome": (("name",), ("url",), ("username",), ("password",)),
+    "firefox": ((), ("url",), ("username",), ("password",)),
+}
+
+
+class ImportResult(NamedTuple): #wynik importu pliku CSV
+    """Opisuje wynik importu pliku CSV."""
+
+    layout: str
+    imported: int
+    rejected: int
+    rejected_path: str | None = None
+
+
+def detect_layout(header: Iterable[str]) -> str: #rozpoznaje układ kolumn po nagłówku
+    """Zwraca nazwę układu (``chrome``, ``firefox``, ``bitwarden``, ``keepass``) lub zgłasza ``ValueError``."""
+    columns = {column.strip().lower() for column in header}
+    if {"login_uri", "login_username", "login_password"} <= columns:
+        return "bitwarden"
+    if "password" in columns and ({"title", "group"} <= columns or {"account", "login name"} <= columns):
+        return "keepass"
+    if {"name", "url", "username", "password"} <= columns:
+        return "chrome"
+    if {"url", "username", "password"} <= columns:
+        return "firefox"
+    raise ValueError("Nieobsługiwany format pliku CSV (oczekiwano eksportu Chrome, Firefox, Bitwarden lub KeePass).")
+
+
+def read_csv_records(stream) -> tuple[list[str], Iterator[tuple[int, dict[str, str]]]]: #nagłówek i kolejne wiersze pliku CSV
+    """Zwraca nagłówek (małymi literami) i generator par (numer wiersza w pliku, wiersz)."""
+    reader = csv.reader(stream)
+    keys = [column.strip().lower() for column in next(reader, [])]
+
+    def records() -> Iterator[tuple[int, dict[str, str]]]:
+        for row in reader:
+            if not any(value.strip() for value in row): #pusta linia
+                continue
+            yield reader.line_num, dict(zip(keys, row))
+
+    return keys, records()
+
+
+def _first_value(record: dict[str, str], columns: tuple[str, ...]) -> str: #pierwsza niepusta wartość z podanych kolumn
+    for column in columns:
+        value = (record.get(column) or "").strip()
+        if value:
+            return value
+    return ""
+
+
+def _service_from_url(url: str) -> str: #nazwa serwisu z adresu URL (host bez "www.")
+    candidate = url if "://" in url else f"https://{url}"
+    try:
+        host = urlsplit(candidate).hostname or ""
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalize_records( #zamienia wiersze CSV na wpisy, odrzucając niepoprawne
+    records: Iterable[tuple[int, dict[str, str]]],
+    layout: str,
+    on_reject: Callable[[int, dict[str, str], str], None],
+) -> Iterator[tuple[str, str, str, None]]:
+    """Zwraca wpisy ``(serwis, login, hasło, None)``; odrzucone wiersze przekazuje do ``on_reject``."""
+    service_columns, url_columns, login_columns, password_columns = _LAYOUTS[layout]
+    for line_number, record in records:
+        if layout == "bitwarden" and (record.get("type") or "login").strip().lower() != "login":
+            on_reject(line_number, record, "wpis innego typu niż login")
+            continue
+        password = record.get(password_columns[0]) or ""
+        if not password:
+            on_reject(line_number, record, "brak hasła")
+            continue
+        service = _first_value(record, service_columns) or _service_from_url(_first_value(record, url_columns))
+        if not service:
+            on_reject(line_number, record, "brak nazwy serwisu i adresu URL")
+            continue
+        account_login = _first_value(record, login_columns) or "-" #kolumna login jest wymagana w dbo.entries
+        if len(service) > MAX_FIELD_LENGTH or len(account_login) > MAX_FIELD_LENGTH:
+            on_reject(line_number, record, f"serwis lub login dłuższy niż {MAX_FIELD_LENGTH} znaków")
+            continue
+        yield service, account_login, password, None
+
+
+class _RejectWriter: #zapisuje odrzucone wiersze do pliku obok importowanego (otwierany przy pierwszym wierszu)
+    def __init__(self, path: Path, header: list[str]) -> None:
+        self.path = path
+        self.count = 0
+        self._header = header
+        self._file = None
+        self._writer = None
+
+    def __call__(self, line_number: int, record: dict[str, str], reason: str) -> None:
+        if self._writer is None:
+            self._file = open(self.path, "w", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["line", "reason", *self._header])
+        values = [
+            "" if column == "password" or column.endswith("_password") else record.get(column, "") #bez haseł w jawnej postaci
+            for column in self._header
+        ]
+        self._writer.writerow([line_number, reason, *values])
+        self.count += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def import_password_csv( #importuje plik CSV do sejfu użytkownika
+    user_id: int,
+    user_secret: SessionKeyRing | str | bytes,
+    csv_path: str | os.PathLike,
+    *,
+    chunk_size: int = ENTRY_INSERT_CHUNK_SIZE,
+    progress: Callable[[float], None] | None = None,
+    config_path: str = "config/db_config.json",
+) -> ImportResult:
+    """Importuje wpisy z pliku CSV w jednej transakcji i zwraca :class:`ImportResult`.
+
+    ``progress`` otrzymuje ułamek 0-1 liczony po odczytanych bajtach pliku.
+    Hasła odrzuconych wierszy nie są zapisywane w pliku odrzuceń.
+    """
+    path = Path(csv_path)
+    total_bytes = max(1, os.path.getsize(path))
+    with open(path, "rb") as raw, io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as text:
+        header, records = read_csv_records(text)
+        layout = detect_layout(header)
+        rejects = _RejectWriter(path.with_name(path.name + REJECTED_SUFFIX), header)
+
+        def report(_count: int) -> None: #postęp po każdej partii - pozycja w pliku
+            if progress is not None:
+                progress(min(raw.tell() / total_bytes, 1.0))
+
+        try:
+            new_ids = add_password_entries(
+                user_id,
+                normalize_records(records, layout, rejects),
+                user_secret=user_secret,
+                chunk_size=chunk_size,
+                progress=report,
+                config_path=config_path,
+            )
+        finally:
+            rejects.close()
+    if progress is not None:
+        progress(1.0)
+    return ImportResult(layout, len(new_ids), rejects.count, str(rejects.path) if rejects.count else None)
+
+
+__all__ = [
+    "ImportResult",
+    "detect_layout",
+    "import_password_csv",
+    "normalize_records",
+    "read_csv_records",
+]
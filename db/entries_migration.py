@@ -0,0 +1,423 @@
+"""Migracja wpisów z tabel per użytkownik (dbo.[{login} entries]) do wspólnej tabeli dbo.entries.
+Starsze wersje aplikacji tworzyły osobną tabelę haseł dla każdego konta. Ten moduł przenosi ich wiersze partiami,
+zapisując postęp w tabeli dbo.entries_migration, dzięki czemu migrację można przerwać i wznowić bez duplikowania wpisów.
+Użytkownicy przełączani są pojedynczo - aplikacja działa w trakcie migracji, a konto jeszcze nieprzeniesione
+jest migrowane przy logowaniu (verify_user) lub zmianie danych konta (update_user_credentials).
+
+Przebieg dla jednego użytkownika:
+1. wiersz w dbo.entries_migration ze stanem "copying" (ostatnie skopiowane id źródła, liczba wierszy, suma kontrolna),
+2. kopiowanie partiami po id źródła - każda partia i jej punkt kontrolny zatwierdzane są w jednej transakcji,
+3. przełączenie: dogranie wierszy dodanych w międzyczasie, porównanie liczby wierszy i sum kontrolnych źródła i celu,
+   stan "done" i zmiana nazwy źródła na "{login} entries (migrated)" - w jednej transakcji.
+Niezgodność sum kontrolnych (np. wiersz źródła zmieniony w trakcie kopiowania) usuwa w jednej transakcji skopiowane wiersze
+użytkownika z dbo.entries i cofa punkt kontrolny do stanu "copying" od początku - tabela źródłowa pozostaje bez zmian, a migracja
+jest powtarzana przy kolejnym logowaniu lub uruchomieniu. Dopóki przełączenie się nie powiedzie, logowanie jest odrzucane.
+Konta pozostawione w stanie "mismatch" przez starsze wersje można przywrócić opcją --retry-mismatch.
+
+Zawiera funkcje kolejno:
+- MigrationResult: Klasa opisująca wynik migracji jednej tabeli.
+- list_legacy_stores: Zwraca tabele per użytkownik wraz z właścicielem.
+- migrate_user_store: Przenosi (lub wznawia przenoszenie) wpisy jednej tabeli i przełącza użytkownika.
+- migrate_user_entries: Przenosi wpisy zalogowanego użytkownika, jeśli ma on jeszcze tabelę w starym układzie.
+- run_migration: Przenosi wszystkie tabele per użytkownik.
+- retry_mismatched: Przywraca do kopiowania konta pozostawione w stanie "mismatch".
+- main: Wywołanie z wiersza poleceń (python -m db.entries_migration).
+
+Dodatkowo używa funkcji z db_connection.py do zarządzania połączeniami z bazą danych oraz funkcji z tablepassword_creation.py
+do zapewnienia istnienia tabeli dbo.entries.
+"""
+
+import argparse #importowanie modułu argparse do obsługi argumentów wiersza poleceń
+import hashlib #importowanie modułu hashlib do sum kontrolnych wierszy
+from collections import Counter #importowanie klasy Counter do porównania zbiorów wierszy
+from datetime import datetime #importowanie klasy datetime z modułu datetime
+from typing import Callable, Literal, NamedTuple #importowanie klas Callable, Literal i NamedTuple z modułu typing
+
+from .db_connection import get_pool #importowanie puli połączeń z pliku db_connection.py
+from .storage_engine import DB_INTEGRITY_ERRORS #importowanie krotki wyjątków naruszenia ograniczeń
+from .schema_registry import ENTRIES_MIGRATION_TABLE, is_schema_ready, mark_schema_ready, schema_scope #importowanie rejestru stanu schematu
+from .tablepassword_creation import ensure_entries_table #importowanie funkcji ensure_entries_table z pliku tablepassword_creation.py
+
+MIGRATION_BATCH_SIZE = 1000 #liczba wierszy kopiowanych w jednej transakcji
+LEGACY_SUFFIX = " entries" #sufiks nazw tabel per użytkownik
+MIGRATED_SUFFIX = " (migrated)" #sufiks dopisywany do nazwy tabeli po przełączeniu użytkownika
+_CHECKSUM_MODULUS = 1 << 128 #suma kontrolna to suma skrótów wierszy modulo 2^128 (niezależna od kolejności)
+_ENTRY_COLUMNS = "service, login, password, created_at, updated_at, expire_date" #kolumny kopiowane i porównywane
+
+
+class MigrationResult(NamedTuple): #wynik migracji jednej tabeli
+    """Opisuje wynik migracji jednej tabeli per użytkownik."""
+
+    user_id: int | None
+    source_table: str
+    status: Literal["done", "mismatch", "orphaned"]
+    copied_rows: int = 0
+
+
+def _value_text(value) -> str: #kanoniczna postać wartości kolumny do sumy kontrolnej
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(" ", timespec="seconds")
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def _row_digest(row) -> int: #skrót jednego wiersza (kolumny _ENTRY_COLUMNS)
+    payload = "\x1f".join(_value_text(value) for value in row).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(payload).digest()[:16], "big")
+
+
+def _checksum_text(total: int) -> str: #zapis sumy kontrolnej w dbo.entries_migration
+    return f"{total % _CHECKSUM_MODULUS:032x}"
+
+
+def _ensure_migration_table(conn, engine, scope: tuple) -> None: #tworzy tabelę postępu migracji przy pierwszym użyciu
+    if is_schema_ready(scope, ENTRIES_MIGRATION_TABLE):
+        return
+    cur = conn.cursor()
+    if not engine.table_exists(cur, "entries_migration"):
+        engine.create_entries_migration_table(cur)
+        conn.commit()
+    cur.close()
+    mark_schema_ready(scope, ENTRIES_MIGRATION_TABLE)
+
+
+def _resolve_owner(cur, engine, table: str) -> int | None: #ustala właściciela tabeli per użytkownik
+    cur.execute(f"SELECT MIN(user_id), MAX(user_id) FROM {engine.quote_table(table)}")
+    low, high = cur.fetchone()
+    if low is not None:
+        return int(low) if low == high else None #tabela z wpisami kilku kont wymaga ręcznej decyzji
+    cur.execute("SELECT users_id FROM dbo.users WHERE login = ?", (table[: -len(LEGACY_SUFFIX)],))
+    row = cur.fetchone() #pusta tabela - właściciel po loginie z nazwy
+    return int(row[0]) if row else None
+
+
+def _is_legacy_table(table: str) -> bool: #czy nazwa to tabela per użytkownik w starym układzie
+    return table.endswith(LEGACY_SUFFIX) and len(table) > len(LEGACY_SUFFIX)
+
+
+def list_legacy_stores( #zwraca tabele per użytkownik wraz z właścicielem
+    *,
+    db_name: str = "password_manager",
+    config_path: str = "config/db_config.json",
+) -> list[tuple[str, int | None]]:
+    """Zwraca pary (nazwa tabeli, users_id) dla tabel ``dbo.[{login} entries]``.
+
+    ``users_id`` wynosi None, gdy właściciela nie da się jednoznacznie ustalić.
+    """
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
+        cur = conn.cursor()
+        engine.use_database(cur, db_name)
+        tables = [table for table in engine.list_tables(cur) if _is_legacy_table(table)] #sys.tables / sqlite_master
+        stores = [(table, _resolve_owner(cur, engine, table)) for table in tables]
+        cur.close()
+    return stores
+
+
+def _load_state(cur, user_id: int): #odczyt punktu kontrolnego użytkownika
+    cur.execute(
+        "SELECT source_table, last_id, copied_rows, checksum, status FROM dbo.entries_migration WHERE user_id = ?",
+        (user_id,),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return str(row[0]), int(row[1]), int(row[2]), int(str(row[3]), 16), str(row[4])
+
+
+def _start_state(conn, user_id: int, source_table: str): #tworzy (lub odczytuje) punkt kontrolny użytkownika
+    cur = conn.cursor()
+    state = _load_state(cur, user_id)
+    if state is None:
+        try:
+            cur.execute(
+                """
+                INSERT INTO dbo.entries_migration (user_id, source_table, last_id, copied_rows, checksum, status, started_at, updated_at)
+                VALUES (?, ?, 0, 0, ?, 'copying', SYSUTCDATETIME(), SYSUTCDATETIME())
+                """,
+                (user_id, source_table, _checksum_text(0)),
+            )
+            conn.commit()
+        except DB_INTEGRITY_ERRORS: #równoległy proces rozpoczął migrację tego użytkownika
+            conn.rollback()
+        state = _load_state(cur, user_id)
+    cur.close()
+    return state
+
+
+def _fetch_source_rows(cur, engine, source_table: str, user_id: int, after_id: int, limit: int | None): #kolejne wiersze źródła po id
+    cur.execute(
+        f"SELECT id, {_ENTRY_COLUMNS} FROM {engine.quote_table(source_table)} WHERE user_id = ? AND id > ? ORDER BY id",
+        (user_id, after_id),
+    )
+    return cur.fetchall() if limit is None else cur.fetchmany(limit)
+
+
+def _insert_rows(cur, engine, user_id: int, rows) -> None: #wsadowy zapis wierszy w dbo.entries
+    engine.executemany(
+        cur,
+        f"INSERT INTO dbo.entries (user_id, {_ENTRY_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(user_id, *row[1:]) for row in rows],
+    )
+
+
+def _copy_batch(conn, engine, source_table: str, user_id: int, state, batch_size: int) -> int: #kopiuje jedną partię z punktem kontrolnym
+    _, last_id, copied_rows, checksum, _ = state
+    cur = conn.cursor()
+    rows = _fetch_source_rows(cur, engine, source_table, user_id, last_id, batch_size)
+    cur.close()
+    if not rows:
+        return 0
+
+    cur = conn.cursor()
+    try:
+        _insert_rows(cur, engine, user_id, rows)
+        checksum += sum(_row_digest(row[1:]) for row in rows)
+        cur.execute(
+            """
+            UPDATE dbo.entries_migration
+            SET last_id = ?, copied_rows = ?, checksum = ?, updated_at = SYSUTCDATETIME()
+            WHERE user_id = ? AND last_id = ? AND status = 'copying'
+            """,
+            (int(rows[-1][0]), copied_rows + len(rows), _checksum_text(checksum), user_id, last_id),
+        )
+        if cur.rowcount != 1: #inny proces przesunął punkt kontrolny - partia jest już skopiowana
+            conn.rollback()
+            return -1
+        conn.commit() #wiersze i punkt kontrolny zatwierdzane razem - wznowienie nie duplikuje wpisów
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def _reset_copy(cur, user_id: int) -> None: #usuwa skopiowane wiersze i cofa punkt kontrolny do początku (bez zatwierdzania)
+    cur.execute("DELETE FROM dbo.entries WHERE user_id = ?", (user_id,)) #przed przełączeniem dbo.entries zawiera tylko kopię źródła
+    cur.execute(
+        """
+        UPDATE dbo.entries_migration
+        SET last_id = 0, copied_rows = 0, checksum = ?, status = 'copying', updated_at = SYSUTCDATETIME()
+        WHERE user_id = ?
+        """,
+        (_checksum_text(0), user_id),
+    )
+
+
+def _digests(cur, table_sql: str, user_id: int) -> Counter: #skróty wszystkich wierszy użytkownika w tabeli
+    cur.execute(f"SELECT {_ENTRY_COLUMNS} FROM {table_sql} WHERE user_id = ?", (user_id,))
+    return Counter(_row_digest(row) for row in cur.fetchall())
+
+
+def _cut_over(conn, engine, source_table: str, user_id: int, state) -> MigrationResult: #dogrywa resztę, weryfikuje i przełącza użytkownika
+    _, last_id, copied_rows, checksum, _ = state
+    cur = conn.cursor()
+    try:
+        delta = _fetch_source_rows(cur, engine, source_table, user_id, last_id, None) #wiersze dodane w trakcie migracji
+        if delta:
+            _insert_rows(cur, engine, user_id, delta)
+            copied_rows += len(delta)
+            checksum += sum(_row_digest(row[1:]) for row in delta)
+
+        source = _digests(cur, engine.quote_table(source_table), user_id)
+        target = _digests(cur, "dbo.entries", user_id)
+        source_checksum = sum(source.elements())
+        verified = (
+            sum(source.values()) == copied_rows #liczba wierszy
+            and _checksum_text(source_checksum) == _checksum_text(checksum) #suma kontrolna źródła i skopiowanych partii
+            and not source - target #każdy wiersz źródła jest w dbo.entries
+        )
+        if not verified: #wiersze źródła zmienione w trakcie kopiowania - bez przełączania, kopiowanie od nowa
+            conn.rollback()
+            _reset_copy(cur, user_id) #nieaktualna kopia nie może zostać w dbo.entries
+            conn.commit()
+            return MigrationResult(user_id, source_table, "mismatch", copied_rows)
+
+        cur.execute(
+            """
+            UPDATE dbo.entries_migration
+            SET last_id = COALESCE(?, last_id), copied_rows = ?, checksum = ?, status = 'done',
+                updated_at = SYSUTCDATETIME(), completed_at = SYSUTCDATETIME()
+            WHERE user_id = ?
+            """,
+            (int(delta[-1][0]) if delta else None, copied_rows, _checksum_text(checksum), user_id),
+        )
+        engine.rename_table(cur, source_table, source_table + MIGRATED_SUFFIX) #źródło zostaje jako kopia, poza listą do migracji
+        conn.commit()
+        return MigrationResult(user_id, source_table, "done", copied_rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def migrate_user_store( #przenosi wpisy jednej tabeli per użytkownik do dbo.entries
+    conn,
+    engine,
+    source_table: str,
+    user_id: int,
+    *,
+    scope: tuple,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    progress: Callable[[float], None] | None = None,
+) -> MigrationResult:
+    """Kopiuje wiersze ``source_table`` partiami, wznawiając od punktu kontrolnego, i przełącza użytkownika.
+
+    Każda partia zatwierdzana jest osobno; przerwanie w dowolnym miejscu
+    pozostawia spójny punkt kontrolny. ``progress`` otrzymuje ułamek 0-1.
+    """
+    _ensure_migration_table(conn, engine, scope)
+    state = _start_state(conn, user_id, source_table)
+    if state[4] != "copying": #użytkownik już przełączony albo oczekuje na decyzję po niezgodności
+        return MigrationResult(user_id, source_table, state[4], state[2])
+
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM {engine.quote_table(source_table)} WHERE user_id = ?", (user_id,))
+    total = int(cur.fetchone()[0])
+    cur.close()
+
+    while True:
+        copied = _copy_batch(conn, engine, source_table, user_id, state, batch_size)
+        cur = conn.cursor()
+        state = _load_state(cur, user_id)
+        cur.close()
+        if state[4] != "copying":
+            return MigrationResult(user_id, source_table, state[4], state[2])
+        if progress is not None and total:
+            progress(min(state[2] / total, 1.0))
+        if copied == 0:
+            return _cut_over(conn, engine, source_table, user_id, state)
+
+
+def migrate_user_entries( #przenosi wpisy użytkownika, który ma jeszcze tabelę w starym układzie
+    conn,
+    engine,
+    user_id: int,
+    login: str,
+    *,
+    db_name: str = "password_manager",
+    config_path: str = "config/db_config.json",
+    progress: Callable[[float], None] | None = None,
+) -> MigrationResult | None:
+    """Przełącza użytkownika na dbo.entries, jeśli istnieje jeszcze ``dbo.[{login} entries]``.
+
+    Wywoływana przy logowaniu na połączeniu bez niezatwierdzonych zmian;
+    dla kont już przeniesionych kosztuje jedno zapytanie o metadane.
+    """
+    source_table = f"{login}{LEGACY_SUFFIX}"
+    cur = conn.cursor()
+    exists = engine.table_exists(cur, source_table)
+    cur.close()
+    if not exists:
+        return None
+    return migrate_user_store(
+        conn, engine, source_table, user_id, scope=schema_scope(config_path, db_name), progress=progress
+    )
+
+
+def run_migration( #przenosi wszystkie tabele per użytkownik
+    *,
+    db_name: str = "password_manager",
+    config_path: str = "config/db_config.json",
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    on_result: Callable[[MigrationResult], None] | None = None,
+) -> list[MigrationResult]:
+    """Migruje kolejno wszystkie tabele ``dbo.[{login} entries]``; można ją przerwać i uruchomić ponownie."""
+    ensure_entries_table(db_name=db_name, config_path=config_path)
+    scope = schema_scope(config_path, db_name)
+    results: list[MigrationResult] = []
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    for table, user_id in list_legacy_stores(db_name=db_name, config_path=config_path):
+        if user_id is None:
+            result = MigrationResult(None, table, "orphaned")
+        else:
+            with pool.connection() as conn: #osobne połączenie dla każdego użytkownika
+                cur = conn.cursor()
+                engine.use_database(cur, db_name)
+                cur.close()
+                result = migrate_user_store(conn, engine, table, user_id, scope=scope, batch_size=batch_size)
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return results
+
+
+def retry_mismatched( #przywraca do kopiowania konta w stanie "mismatch"
+    *,
+    db_name: str = "password_manager",
+    config_path: str = "config/db_config.json",
+) -> list[int]:
+    """Usuwa skopiowane wiersze kont w stanie ``"mismatch"`` i cofa ich punkt kontrolny; zwraca ich users_id."""
+    ensure_entries_table(db_name=db_name, config_path=config_path)
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
+        cur = conn.cursor()
+        engine.use_database(cur, db_name)
+        cur.close()
+        _ensure_migration_table(conn, engine, schema_scope(config_path, db_name))
+        cur = conn.cursor()
+        cur.execute("SELECT user_id FROM dbo.entries_migration WHERE status = 'mismatch'")
+        user_ids = [int(row[0]) for row in cur.fetchall()]
+        for user_id in user_ids:
+            _reset_copy(cur, user_id)
+        conn.commit() #wszystkie konta przywracane w jednej transakcji
+        cur.close()
+    return user_ids
+
+
+def main(argv: list[str] | None = None) -> int: #wywołanie z wiersza poleceń
+    parser = argparse.ArgumentParser(
+        prog="python -m db.entries_migration",
+        description="Przenosi wpisy z tabel dbo.[{login} entries] do wspólnej tabeli dbo.entries.",
+    )
+    parser.add_argument("--config", default="config/db_config.json", help="plik konfiguracyjny bazy danych")
+    parser.add_argument("--db-name", default="password_manager", help="nazwa bazy danych")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE, help="liczba wierszy w jednej transakcji")
+    parser.add_argument("--list", action="store_true", help="tylko wyświetl tabele do migracji")
+    parser.add_argument(
+        "--retry-mismatch", action="store_true", help='ponów migrację kont w stanie "mismatch" (usuwa ich niezweryfikowaną kopię)'
+    )
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for table, user_id in list_legacy_stores(db_name=args.db_name, config_path=args.config):
+            print(f"{table}\tusers_id={user_id if user_id is not None else '?'}")
+        return 0
+
+    if args.retry_mismatch:
+        reset = retry_mismatched(db_name=args.db_name, config_path=args.config)
+        print(f"Przywrócono do kopiowania {len(reset)} kont (users_id: {', '.join(map(str, reset)) or '-'}).")
+
+    def report(result: MigrationResult) -> None: #wypisuje wynik dla każdej tabeli
+        print(f"[{result.status}] {result.source_table} (users_id={result.user_id}, wierszy: {result.copied_rows})")
+
+    results = run_migration(
+        db_name=args.db_name, config_path=args.config, batch_size=max(1, args.batch_size), on_result=report
+    )
+    failed = [result for result in results if result.status != "done"]
+    print(f"Przeniesiono {len(results) - len(failed)} z {len(results)} tabel.")
+    return 1 if failed else 0
+
+
+__all__ = [
+    "MIGRATION_BATCH_SIZE",
+    "MigrationResult",
+    "list_legacy_stores",
+    "main",
+    "migrate_user_entries",
+    "migrate_user_store",
+    "retry_mismatched",
+    "run_migration",
+]
+
+
+if __name__ == "__main__": # uruchamia migrację z wiersza poleceń
+    raise SystemExit(main())
@@ -0,0 +1,61 @@
+"""Pamięć podręczna wpisów sesji sejfu. Przechowuje rekordy wpisów pobrane z bazy (id, service, login, zaszyfrowane hasło,
+created_at, expire_date), aby podgląd, kopiowanie i edycja tego samego wpisu nie wykonywały ponownie zapytania SELECT.
+
+Hasła trzymane są wyłącznie w postaci zaszyfrowanej kluczem danych użytkownika - nigdy jawnie. Rekord wygasa po ENTRY_CACHE_TTL
+sekundach, a po przekroczeniu ENTRY_CACHE_SIZE usuwany jest najdawniej używany (LRU). Zmiana lub usunięcie wpisu w sesji
+usuwa tylko jego rekord, a zamknięcie sesji (wylogowanie, wygaśnięcie) czyści całą pamięć.
+
+Zawiera kolejno:
+- EntryCache: Bezpieczna wątkowo pamięć podręczna rekordów wpisów z TTL i limitem liczby rekordów (LRU).
+"""
+
+import threading #importowanie modułu threading do synchronizacji dostępu z wątków zadań GUI
+import time #importowanie modułu time do wyznaczania wygaśnięcia rekordów
+from collections import OrderedDict #importowanie OrderedDict do kolejności LRU
+
+ENTRY_CACHE_TTL = 300.0 #czas ważności rekordu w sekundach
+ENTRY_CACHE_SIZE = 512 #maksymalna liczba rekordów
+
+
+class EntryCache: #pamięć podręczna rekordów wpisów jednej sesji
+    """Rekordy wpisów według ID z wygasaniem po ``ttl`` i usuwaniem najdawniej używanych."""
+
+    def __init__(self, *, ttl: float = ENTRY_CACHE_TTL, max_entries: int = ENTRY_CACHE_SIZE) -> None:
+        self._ttl = ttl
+        self._max_entries = max(1, max_entries)
+        self._records: OrderedDict[int, tuple[float, tuple]] = OrderedDict() #id -> (wygaśnięcie, rekord), od najdawniej używanego
+        self._lock = threading.Lock()
+
+    def get(self, entry_id: int) -> tuple | None: #zwraca ważny rekord lub None
+        with self._lock:
+            cached = self._records.get(entry_id)
+            if cached is None:
+                return None
+            expires, record = cached
+            if expires < time.monotonic(): #rekord wygasł
+                del self._records[entry_id]
+                return None
+            self._records.move_to_end(entry_id) #ostatnio używany
+            return record
+
+    def put(self, entry_id: int, record: tuple) -> None: #zapamiętuje rekord wpisu
+        with self._lock:
+            self._records[entry_id] = (time.monotonic() + self._ttl, record)
+            self._records.move_to_end(entry_id)
+            while len(self._records) > self._max_entries: #usunięcie najdawniej używanych
+                self._records.popitem(last=False)
+
+    def discard(self, entry_id: int) -> None: #usuwa rekord zmienionego lub usuniętego wpisu
+        with self._lock:
+            self._records.pop(entry_id, None)
+
+    def clear(self) -> None: #usuwa wszystkie rekordy
+        with self._lock:
+            self._records.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+
+__all__ = ["ENTRY_CACHE_SIZE", "ENTRY_CACHE_TTL", "EntryCache"]
@@ -0,0 +1,90 @@
+"""Rejestr stanu schematu bazy danych. Zapamiętuje, które elementy schematu (baza danych, tabela dbo.users, tabela haseł dbo.entries, tabela migracji)
+zostały już sprawdzone lub utworzone w bieżącym procesie, aby funkcje ensure_* nie odpytywały serwera przy każdej operacji CRUD.
+
+Wpisy są grupowane według zakresu - ścieżki pliku konfiguracyjnego i parametrów połączenia - więc zmiana konfiguracji bazy
+(np. z poziomu GUI) powoduje ponowne sprawdzenie schematu dla nowego serwera.
+
+Zawiera kolejno:
+- SchemaRegistry: Bezpieczny wątkowo zbiór gotowych elementów schematu.
+- schema_scope: Buduje klucz zakresu na podstawie pliku konfiguracyjnego i nazwy bazy.
+- is_schema_ready: Sprawdza, czy element schematu był już zweryfikowany.
+- mark_schema_ready: Oznacza element schematu jako gotowy.
+- invalidate_schema: Usuwa wpisy z rejestru (pojedynczy element, zakres lub całość).
+"""
+
+import threading #importowanie modułu threading do synchronizacji dostępu do rejestru
+
+from .db_connection import _resolve_config_path, load_config #importowanie funkcji odczytu konfiguracji z pliku db_connection.py
+
+DATABASE = ("database",) #klucz elementu: baza danych
+USERS_TABLE = ("users",) #klucz elementu: tabela dbo.users
+ENTRIES_TABLE = ("entries",) #klucz elementu: wspólna tabela haseł dbo.entries
+ENTRIES_MIGRATION_TABLE = ("entries_migration",) #klucz elementu: tabela postępu migracji dbo.entries_migration
+
+
+class SchemaRegistry: #zbiór zweryfikowanych elementów schematu
+    """Przechowuje pary (zakres, element) potwierdzone w bieżącym procesie."""
+
+    def __init__(self) -> None:
+        self._ready: set[tuple] = set()
+        self._lock = threading.Lock()
+
+    def is_ready(self, scope: tuple, item: tuple) -> bool: #czy element był już sprawdzony
+        with self._lock:
+            return (scope, item) in self._ready
+
+    def mark_ready(self, scope: tuple, item: tuple) -> None: #zapamiętuje gotowy element
+        with self._lock:
+            self._ready.add((scope, item))
+
+    def invalidate(self, scope: tuple | None = None, item: tuple | None = None) -> None: #usuwa wpisy z rejestru
+        with self._lock:
+            self._ready = {
+                (s, i)
+                for s, i in self._ready
+                if not ((scope is None or s == scope) and (item is None or i == item))
+            }
+
+
+_REGISTRY = SchemaRegistry() #rejestr współdzielony w obrębie procesu
+
+
+def schema_scope(config_path: str, db_name: str) -> tuple: #klucz zakresu dla pliku konfiguracyjnego i bazy
+    """Zwraca klucz zakresu zależny od pliku konfiguracyjnego i parametrów serwera."""
+    config = load_config(config_path)
+    return (
+        str(_resolve_config_path(config_path)),
+        str(config.get("engine", "mssql")),
+        str(config.get("server", "")),
+        str(config.get("port", "")),
+        str(config.get("database", "")),
+        str(config.get("username", "")),
+        str(config.get("sqlite_path", "")),
+        db_name,
+    )
+
+
+def is_schema_ready(scope: tuple, item: tuple) -> bool: #sprawdza, czy element schematu jest gotowy
+    return _REGISTRY.is_ready(scope, item)
+
+
+def mark_schema_ready(scope: tuple, item: tuple) -> None: #oznacza element schematu jako gotowy
+    _REGISTRY.mark_ready(scope, item)
+
+
+def invalidate_schema(scope: tuple | None = None, item: tuple | None = None) -> None: #unieważnia wpisy rejestru
+    """Unieważnia element ``item`` w zakresie ``scope``; ``None`` oznacza wszystkie."""
+    _REGISTRY.invalidate(scope, item)
+
+
+__all__ = [
+    "DATABASE",
+    "ENTRIES_MIGRATION_TABLE",
+    "ENTRIES_TABLE",
+    "USERS_TABLE",
+    "SchemaRegistry",
+    "invalidate_schema",
+    "is_schema_ready",
+    "mark_schema_ready",
+    "schema_scope",
+]
@@ -0,0 +1,693 @@
+"""Silniki składowania danych. Oddziela różnice dialektów SQL (kontekst bazy, zwracanie ID po INSERT, metadane i lista tabel, zmiana nazwy tabeli,
+tworzenie bazy i tabel) od logiki CRUD, dzięki czemu te same moduły db/ działają na Microsoft SQL Server oraz na wbudowanej bazie SQLite.
+
+Silnik wybierany jest kluczem "engine" w pliku config/db_config.json:
+- "mssql": SQL Server przez pyodbc (domyślnie),
+- "sqlite": lokalny plik bazy (klucz "sqlite_path", domyślnie data/password_manager.db) w trybie WAL - dla instalacji jednostanowiskowych,
+  testów i benchmarków bez serwera SQL.
+
+Zapytania DML aplikacji korzystają ze wspólnego podzbioru T-SQL: tabele w schemacie dbo (w SQLite plik bazy jest podłączany pod aliasem dbo)
+oraz funkcja SYSUTCDATETIME() (w SQLite rejestrowana jako funkcja użytkownika). Pozostałe różnice obsługują metody silnika.
+
+Zawiera kolejno:
+- split_server_and_port: Rozdziela surowy ciąg serwera na serwer i port.
+- format_server_with_port: Formatuje serwer z portem do postaci odpowiedniej dla łańcucha połączenia.
+- build_connection_string: Buduje łańcuch połączenia ODBC na podstawie konfiguracji.
+- StorageEngine: Klasa bazowa opisująca operacje zależne od silnika.
+- MssqlEngine: Implementacja dla Microsoft SQL Server.
+- SqliteEngine: Implementacja dla wbudowanej bazy SQLite (WAL).
+- get_engine: Zwraca silnik wskazany w konfiguracji.
+- DB_ERRORS, DB_INTEGRITY_ERRORS, DB_DISCONNECT_ERRORS: Krotki wyjątków bazodanowych niezależne od silnika.
+"""
+
+import sqlite3 #importowanie modułu sqlite3 do obsługi wbudowanej bazy danych
+from datetime import datetime, timezone #importowanie klas datetime i timezone do znaczników czasu w SQLite
+from pathlib import Path #importowanie modułu Path do obsługi ścieżek
+
+try:
+    import pyodbc #importowanie modułu pyodbc do obsługi połączeń z SQL Server
+except ImportError: #instalacja wyłącznie z SQLite nie wymaga sterownika ODBC
+    pyodbc = None
+
+_ROOT_DIR = Path(__file__).resolve().parent.parent #katalog główny aplikacji
+
+
+def split_server_and_port( #logika rozdzielania serwera i portu z surowego ciągu np. "localhost,1433 ----> ("localhost", 1433)
+    raw_server: str, default_server: str, default_port: int | None
+) -> tuple[str, int | None, str | None]:
+    server_value = raw_server.strip() or default_server #usuwanie białych znaków i ustawianie domyślnego serwera
+    port_value: int | None = default_port #ustawianie domyślnego portu
+    warning: str | None = None #inicjalizacja zmiennej ostrzeżenia jako None
+    if "," in server_value: #sprawdzanie czy w surowym ciągu znajduje się przecinek
+        host_part, port_part = server_value.split(",", 1) #rozdzielanie surowego ciągu na część hosta i portu
+        server_value = host_part.strip() or default_server #usuwanie białych znaków z części hosta i ustawianie domyślnego serwera
+        port_candidate = port_part.strip() #usuwanie białych znaków z części portu
+        if port_candidate: #sprawdzanie czy część portu nie jest pusta
+            try:
+                port_value = int(port_candidate) #próba konwersji części portu na liczbę całkowitą
+            except ValueError:
+                warning = "[!] Nieprawidłowy port w adresie serwera – użyto wartości domyślnej."
+    return server_value, port_value, warning #zwracanie serwera, portu i ostrzeżenia
+
+
+def format_server_with_port(server: str, port: int | None) -> str: #formatowanie serwera z portem do postaci odpowiedniej dla łańcucha połączenia
+    return f"{server},{port}" if port else server #jeżeli port jest podany to zwróć serwer z portem, w przeciwnym razie zwróć sam serwer
+
+
+def build_connection_string( # buduje lancuch polaczenia
+    config: dict, *, include_database: bool = False
+) -> str:
+    raw_server = str(config.get("server") or "")
+    default_server = raw_server or "localhost"
+    server_value, port_value, _ = split_server_and_port(
+        raw_server, default_server, config.get("port")
+    )
+    server = format_server_with_port(server_value, port_value) #Formatowanie serwera z portem
+    driver = config.get("driver", "ODBC Driver 18 for SQL Server") #Domyślny sterownik ODBC
+    trust = "yes" if config.get("trust_server_certificate", True) else "no" #Ustawienie zaufania do certyfikatu serwera
+    encrypt = "yes" if config.get("encrypt", True) else "no" #Ustawienie szyfrowania połączenia
+    column_encryption = bool(config.get("column_encryption")) #Always Encrypted (Column Encryption)
+    app_name = "PasswordManagerClient" #Nazwa aplikacji - wymagane gdyż SQL Server blokuje bez nazwy aplikacji
+
+    parts = [
+        f"DRIVER={{{driver}}}",  #Utworzenie ciagu polaczenia z uzyciem sterownika ODBC
+        f"SERVER={server}",  #Utworzenie ciagu polaczenia z serwerem
+        f"Encrypt={encrypt}", #Ustawienie szyfrowania
+        f"TrustServerCertificate={trust}", #Ustawienie zaufania do certyfikatu serwera
+        f"APP={app_name}", #Nazwa aplikacji - wymagane gdyż SQL Server blokuje bez nazwy aplikacji
+    ]
+
+    if column_encryption:
+        parts.append("ColumnEncryption=Enabled")
+
+    if include_database and config.get("database"):
+        parts.append(f"DATABASE={config['database']}")
+
+    if config.get("username"):  #jeżeli podano nazwe uzytkownika i haslo to dodaj je do ciagu polaczenia
+        parts += [f"UID={config['username']}", f"PWD={config.get('password', '')}"]
+    else:
+        parts += ["Trusted_Connection=yes"] #jeżeli nie podano to uzyj polaczenia zaufanego (Windows Authentication)
+
+    return ";".join(parts) #Utworzenie koncowego ciagu polaczenia
+
+
+class StorageEngine: #klasa bazowa silnika składowania
+    """Operacje zależne od dialektu SQL.
+
+    Nazwy tabel przekazywane do metod to nazwy w schemacie ``dbo`` bez
+    cytowania (np. ``"users"``); :meth:`quote_table` zwraca ich postać
+    gotową do wstawienia w zapytanie.
+    """
+
+    name = "" #nazwa silnika w konfiguracji
+    binary_param = "?" #znacznik parametru binarnego (np. dla wartości NULL w kolumnie VARBINARY)
+    max_params = 999 #maksymalna liczba parametrów jednego zapytania
+
+    def connect(self, config: dict, *, include_database: bool = False): #otwiera połączenie DB-API
+        raise NotImplementedError
+
+    def use_database(self, cur, db_name: str) -> None: #ustawia kontekst bazy danych na kursorze
+        raise NotImplementedError
+
+    def ensure_database(self, conn, db_name: str) -> bool: #tworzy bazę danych, jeśli nie istnieje
+        raise NotImplementedError
+
+    def quote_table(self, table: str) -> str: #zwraca w pełni kwalifikowaną nazwę tabeli
+        raise NotImplementedError
+
+    def table_exists(self, cur, table: str) -> bool: #sprawdza istnienie tabeli w schemacie dbo
+        raise NotImplementedError
+
+    def list_tables(self, cur) -> list[str]: #zwraca nazwy wszystkich tabel w schemacie dbo
+        raise NotImplementedError
+
+    def create_users_table(self, cur) -> None: #tworzy tabelę dbo.users wraz z indeksem na login
+        raise NotImplementedError
+
+    def upgrade_users_table(self, cur) -> None: #dodaje kolumny dbo.users brakujące w starszych bazach
+        raise NotImplementedError
+
+    def create_entries_table(self, cur) -> None: #tworzy wspólną tabelę haseł dbo.entries wraz z indeksami
+        raise NotImplementedError
+
+    def create_entries_indexes(self, cur) -> None: #tworzy brakujące indeksy sortowania listy dbo.entries (również w starszych bazach)
+        raise NotImplementedError
+
+    def upgrade_entries_table(self, cur) -> None: #dodaje kolumnę row_version i śledzenie zmian brakujące w starszych bazach
+        raise NotImplementedError
+
+    def create_entries_change_tracking(self, cur) -> None: #tworzy tabelę usuniętych wpisów dbo.entries_deleted i wyzwalacze
+        raise NotImplementedError
+
+    def row_version_watermark(self, cur) -> int: #najwyższa wersja wiersza, poniżej której wszystkie zmiany są zatwierdzone
+        raise NotImplementedError
+
+    def version_after(self, column: str) -> str: #warunek "wersja wiersza większa od parametru" (wyszukiwanie w indeksie)
+        return f"{column} > ?"
+
+    def version_value(self, expression: str) -> str: #wersja wiersza jako liczba całkowita
+        return expression
+
+    def create_entries_migration_table(self, cur) -> None: #tworzy tabelę postępu migracji dbo.entries_migration
+        raise NotImplementedError
+
+    def rename_table(self, cur, old_table: str, new_table: str) -> None: #zmienia nazwę tabeli w schemacie dbo
+        raise NotImplementedError
+
+    def executemany(self, cur, sql: str, rows) -> None: #wsadowe wykonanie zapytania dla wielu wierszy
+        cur.executemany(sql, rows)
+
+    def insert_many_returning( #wielowierszowy INSERT zwracający klucze nowych wierszy
+        self, cur, table_sql: str, columns: tuple[str, ...], rows, key_column: str
+    ) -> list[int]:
+        """Wstawia ``rows`` jednym zapytaniem i zwraca klucze w kolejności wierszy.
+
+        Liczba parametrów (``len(rows) * len(columns)``) nie może przekraczać
+        :attr:`max_params` - dzielenie na partie należy do wywołującego.
+        """
+        raise NotImplementedError
+
+    def output_inserted(self, column: str) -> str: #klauzula zwracająca ID umieszczana przed VALUES
+        return ""
+
+    def returning(self, column: str) -> str: #klauzula zwracająca ID umieszczana po VALUES
+        return ""
+
+    def top(self, count: int) -> str: #klauzula ograniczająca liczbę wierszy umieszczana po SELECT
+        return ""
+
+    def nocase(self, column: str) -> str: #kolumna porównywana bez rozróżniania wielkości liter (zgodnie z indeksem wyszukiwania)
+        return column
+
+    def limit(self, count: int) -> str: #klauzula ograniczająca liczbę wierszy umieszczana na końcu zapytania
+        return ""
+
+
+
+class MssqlEngine(StorageEngine): #silnik Microsoft SQL Server
+    """Microsoft SQL Server przez pyodbc."""
+
+    name = "mssql"
+    binary_param = "CAST(? AS varbinary(max))" #jawny typ, aby NULL nie był wysyłany jako varchar
+    max_params = 2099 #limit parametrów RPC w SQL Server (2100)
+
+    def connect(self, config: dict, *, include_database: bool = False):
+        if pyodbc is None:
+            raise RuntimeError("Brak modułu pyodbc - silnik 'mssql' jest niedostępny.")
+        conn_str = build_connection_string(config, include_database=include_database)
+        timeout = int(config.get("timeout", 5)) #pobranie timeoutu z pliku konfiguracyjnego lub ustawienie domyślnej wartosci 5 sekund
+        return pyodbc.connect(conn_str, timeout=timeout, autocommit=False) #zwrócenie obiektu połączenia z bazą danych
+
+    def use_database(self, cur, db_name: str) -> None:
+        escaped = db_name.replace("]", "]]") #ucieczka nawiasów zamykających w nazwie bazy danych
+        cur.execute(f"USE [{escaped}]")
+
+    def ensure_database(self, conn, db_name: str) -> bool:
+        cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
+        try:
+            # 1 - sprawdzenie istnienia bazy danych
+            cur.execute("""
+                DECLARE @db sysname = ?;
+                SELECT DB_ID(@db);
+            """, (db_name,))
+            exists_before = cur.fetchone()[0] is not None #sprawdzenie czy baza danych o podanej nazwie już istnieje
+            if exists_before: #jeżeli baza danych istnieje to zwróć False
+                return False
+
+            prev_autocommit = conn.autocommit #wyłączenie autocommitu na czas tworzenia bazy danych
+            conn.autocommit = True #ustawienie autocommitu na True
+            try: # 2 - tworzenie bazy danych
+                cur.execute("""
+IF DB_ID(?) IS NULL
+BEGIN
+    DECLARE @n sysname = ?;
+    DECLARE @sql nvarchar(max) = N'CREATE DATABASE [' + REPLACE(@n, ']', ']]') + N']';
+    EXEC(@sql);
+END
+""", (db_name, db_name)) #utworzenie bazy danych o podanej nazwie jeżeli nie istnieje
+            finally:
+                conn.autocommit = prev_autocommit #przywrócenie poprzedniego stanu autocommitu
+
+            cur.execute("SELECT DB_ID(?)", (db_name,)) # 3 - potwierdzenie istnienia bazy danych po utworzeniu
+            exists_after = cur.fetchone()[0] is not None #sprawdzenie czy baza danych została utworzona
+            return exists_after and not exists_before #zwrócenie True jeżeli baza danych została utworzona, False jeżeli istniała wcześniej
+        finally:
+            cur.close() #zamknięcie kursora
+
+    def quote_table(self, table: str) -> str:
+        # Uwaga: ']' w nazwie należy podwoić wewnątrz nawiasów kwadratowych.
+        return f"dbo.[{table.replace(']', ']]')}]"
+
+    def table_exists(self, cur, table: str) -> bool:
+        cur.execute( #sprawdzenie istnienia tabeli po nazwie i schemacie, bez ucieczki w OBJECT_ID
+            """
+            SELECT 1
+            FROM sys.tables t
+            JOIN sys.schemas s ON s.schema_id = t.schema_id
+            WHERE t.name = ? AND s.name = 'dbo'
+            """,
+            (table,),
+        )
+        return cur.fetchone() is not None
+
+    def list_tables(self, cur) -> list[str]:
+        cur.execute(
+            """
+            SELECT t.name
+            FROM sys.tables t
+            JOIN sys.schemas s ON s.schema_id = t.schema_id
+            WHERE s.name = 'dbo'
+            ORDER BY t.name
+            """
+        )
+        return [str(row[0]) for row in cur.fetchall()]
+
+    def create_users_table(self, cur) -> None:
+        cur.execute("""
+CREATE TABLE dbo.users (
+    users_id        INT IDENTITY(1,1) PRIMARY KEY,
+    login           NVARCHAR(255)   NOT NULL,
+    secured_pwd     VARBINARY(MAX)  NOT NULL,
+    check_mfa       BIT             NOT NULL CONSTRAINT DF_users_check_mfa DEFAULT(0),
+    mfa_secret      VARBINARY(MAX)  NULL,
+    data_key        VARBINARY(MAX)  NULL,
+    is_locked       BIT             NOT NULL CONSTRAINT DF_users_is_locked DEFAULT(0),
+    failed_attempts INT             NOT NULL CONSTRAINT DF_users_failed_attempts DEFAULT(0),
+    created_at      DATETIME2(0)    NOT NULL CONSTRAINT DF_users_created_at DEFAULT (SYSUTCDATETIME()),
+    updated_at      DATETIME2(0)    NOT NULL CONSTRAINT DF_users_updated_at DEFAULT (SYSUTCDATETIME())
+);
+""")
+
+        # zabezpieczenie przed powtórnym uruchomieniem
+        cur.execute("""
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = N'UX_users_login' AND object_id = OBJECT_ID(N'dbo.users')
+)
+    CREATE UNIQUE INDEX UX_users_login ON dbo.users(login);
+""")
+
+    def upgrade_users_table(self, cur) -> None:
+        cur.execute("""
+IF COL_LENGTH(N'dbo.users', N'data_key') IS NULL
+    ALTER TABLE dbo.users ADD data_key VARBINARY(MAX) NULL;
+""")
+
+    def create_entries_table(self, cur) -> None:
+        # Klucz klastrowany (user_id, id) - wpisy jednego użytkownika leżą obok siebie
+        cur.execute("""
+CREATE TABLE dbo.entries (
+    user_id     INT             NOT NULL,
+    id          BIGINT          IDENTITY(1,1) NOT NULL,
+    service     NVARCHAR(255)   NOT NULL,
+    login       NVARCHAR(255)   NOT NULL,
+    password    VARBINARY(MAX)  NOT NULL,
+    created_at  DATETIME2(0)    NOT NULL CONSTRAINT DF_entries_created_at DEFAULT (SYSUTCDATETIME()),
+    updated_at  DATETIME2(0)    NOT NULL CONSTRAINT DF_entries_updated_at DEFAULT (SYSUTCDATETIME()),
+    expire_date DATETIME2(0)    NULL,
+    row_version ROWVERSION      NOT NULL,
+    CONSTRAINT PK_entries PRIMARY KEY CLUSTERED (user_id, id),
+    CONSTRAINT FK_entries_users FOREIGN KEY (user_id) REFERENCES dbo.users(users_id) ON DELETE CASCADE
+);
+""")
+        self.create_entries_change_tracking(cur)
+        self.create_entries_indexes(cur)
+
+    def upgrade_entries_table(self, cur) -> None:
+        cur.execute("""
+IF COL_LENGTH(N'dbo.entries', N'row_version') IS NULL
+    ALTER TABLE dbo.entries ADD row_version ROWVERSION NOT NULL;
+""")
+        self.create_entries_change_tracking(cur)
+
+    def create_entries_change_tracking(self, cur) -> None:
+        # ROWVERSION jest wspólny dla całej bazy, więc wersje usuniętych wpisów są porównywalne z wersjami w dbo.entries
+        cur.execute("""
+IF OBJECT_ID(N'dbo.entries_deleted', N'U') IS NULL
+    CREATE TABLE dbo.entries_deleted (
+        user_id     INT             NOT NULL,
+        id          BIGINT          NOT NULL,
+        row_version ROWVERSION      NOT NULL,
+        deleted_at  DATETIME2(0)    NOT NULL CONSTRAINT DF_entries_deleted_deleted_at DEFAULT (SYSUTCDATETIME()),
+        CONSTRAINT PK_entries_deleted PRIMARY KEY CLUSTERED (user_id, id)
+    );
+""")
+        cur.execute("""
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_entries_deleted_user_version' AND object_id = OBJECT_ID(N'dbo.entries_deleted'))
+    CREATE NONCLUSTERED INDEX IX_entries_deleted_user_version ON dbo.entries_deleted(user_id, row_version);
+""")
+        cur.execute("""
+IF OBJECT_ID(N'dbo.TR_entries_deleted', N'TR') IS NULL
+    EXEC(N'CREATE TRIGGER dbo.TR_entries_deleted ON dbo.entries AFTER DELETE AS
+    BEGIN
+        SET NOCOUNT ON;
+        INSERT INTO dbo.entries_deleted (user_id, id) SELECT user_id, id FROM deleted;
+    END');
+""") #również usunięcia kaskadowe z dbo.users
+
+    def row_version_watermark(self, cur) -> int:
+        # wersje niższe od MIN_ACTIVE_ROWVERSION() należą tylko do zatwierdzonych transakcji
+        cur.execute("SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1")
+        return int(cur.fetchone()[0])
+
+    def version_after(self, column: str) -> str:
+        return f"{column} > CAST(CAST(? AS BIGINT) AS BINARY(8))"
+
+    def version_value(self, expression: str) -> str:
+        return f"CAST({expression} AS BIGINT)"
+
+    def create_entries_indexes(self, cur) -> None:
+        # jeden indeks na klucz sortowania listy, bez odczytu kolumny password; klucz klastrowany (user_id, id)
+        # jest dołączany do klucza indeksu nieunikalnego, więc strona (kolumna, id) to wyszukiwanie w indeksie bez sortowania
+        for name, key, include in _MSSQL_ENTRY_INDEXES:
+            cur.execute(f"""
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'{name}' AND object_id = OBJECT_ID(N'dbo.entries'))
+    CREATE NONCLUSTERED INDEX {name}
+        ON dbo.entries(user_id, {key})
+        INCLUDE ({include});
+""")
+
+    def create_entries_migration_table(self, cur) -> None:
+        cur.execute("""
+CREATE TABLE dbo.entries_migration (
+    user_id      INT             NOT NULL CONSTRAINT PK_entries_migration PRIMARY KEY,
+    source_table NVARCHAR(300)   NOT NULL,
+    last_id      BIGINT          NOT NULL CONSTRAINT DF_entries_migration_last_id DEFAULT(0),
+    copied_rows  BIGINT          NOT NULL CONSTRAINT DF_entries_migration_copied_rows DEFAULT(0),
+    checksum     CHAR(32)        NOT NULL,
+    status       NVARCHAR(16)    NOT NULL,
+    started_at   DATETIME2(0)    NOT NULL CONSTRAINT DF_entries_migration_started_at DEFAULT (SYSUTCDATETIME()),
+    updated_at   DATETIME2(0)    NOT NULL CONSTRAINT DF_entries_migration_updated_at DEFAULT (SYSUTCDATETIME()),
+    completed_at DATETIME2(0)    NULL
+);
+""")
+
+    def rename_table(self, cur, old_table: str, new_table: str) -> None:
+        cur.execute("EXEC sp_rename ?, ?, 'OBJECT'", (self.quote_table(old_table), new_table))
+
+    def executemany(self, cur, sql: str, rows) -> None:
+        cur.fast_executemany = True #parametry wysyłane jedną tablicą zamiast osobnego round trip na wiersz
+        try:
+            cur.executemany(sql, rows)
+        finally:
+            cur.fast_executemany = False
+
+    def insert_many_returning(
+        self, cur, table_sql: str, columns: tuple[str, ...], rows, key_column: str
+    ) -> list[int]:
+        column_list = ", ".join(columns)
+        row_sql = "(" + ", ".join("?" for _ in columns) + ")"
+        values = ", ".join(f"({position}, {row_sql[1:]}" for position in range(len(rows))) #numer wiersza jako literał
+        # INSERT ... SELECT ... ORDER BY gwarantuje nadanie IDENTITY w kolejności wierszy (kolejność OUTPUT - nie)
+        cur.execute(
+            f"""
+            INSERT INTO {table_sql} ({column_list})
+            OUTPUT INSERTED.{key_column}
+            SELECT {", ".join(f"v.{column}" for column in columns)}
+            FROM (VALUES {values}) AS v(row_order, {column_list})
+            ORDER BY v.row_order
+            """,
+            [value for row in rows for value in row],
+        )
+        return sorted(int(row[0]) for row in cur.fetchall())
+
+    def output_inserted(self, column: str) -> str:
+        return f"OUTPUT INSERTED.{column}"
+
+    def top(self, count: int) -> str:
+        return f"TOP ({int(count)})"
+
+    def nocase(self, column: str) -> str: #kolumny mają domyślną kolację bazy (zwykle *_CI_AS) - COLLATE wyłączyłby wyszukiwanie w indeksie
+        return column
+
+
+_MSSQL_ENTRY_INDEXES = ( #indeksy listy wpisów: (nazwa, klucz po user_id, kolumny dołączone)
+    ("IX_entries_user_created", "created_at DESC, id DESC", "service, login, expire_date"),
+    ("IX_entries_user_service", "service", "login, created_at, expire_date"),
+    ("IX_entries_user_login", "login", "service, created_at, expire_date"),
+    ("IX_entries_user_expire", "expire_date", "service, login, created_at"),
+    ("IX_entries_user_version", "row_version", "service, login, created_at, expire_date"), #zmiany od znacznika wersji
+)
+
+
+def _utc_now_text() -> str: #odpowiednik SYSUTCDATETIME() z precyzją DATETIME2(0)
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _adapt_datetime(value: datetime) -> str: #zapis datetime w SQLite (format zgodny z CURRENT_TIMESTAMP)
+    return value.isoformat(" ", timespec="seconds")
+
+
+def _convert_datetime(raw: bytes) -> datetime: #odczyt kolumn DATETIME z SQLite jako datetime
+    return datetime.fromisoformat(raw.decode("ascii"))
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+
+
+def _quote_ident(name: str) -> str: #cytowanie identyfikatora SQLite (nawiasy kwadratowe nie obsługują ucieczki ']')
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sqlite_database_path(config: dict) -> Path: #ścieżka pliku bazy SQLite dla konfiguracji
+    candidate = Path(config.get("sqlite_path") or "data/password_manager.db")
+    return candidate if candidate.is_absolute() else _ROOT_DIR / candidate
+
+
+class SqliteEngine(StorageEngine): #wbudowany silnik SQLite
+    """Lokalny plik SQLite w trybie WAL.
+
+    Plik bazy jest podłączany pod aliasem ``dbo``, więc zapytania odwołujące
+    się do ``dbo.users`` i ``dbo.entries`` działają bez zmian.
+    Połączenie może być używane z wielu wątków (pula, QThreadPool), ale
+    w danej chwili tylko przez jeden - tak jak wydaje je pula.
+    """
+
+    name = "sqlite"
+    max_params = 32766 #SQLITE_MAX_VARIABLE_NUMBER od SQLite 3.32
+
+    def connect(self, config: dict, *, include_database: bool = False):
+        path = sqlite_database_path(config)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        timeout = float(config.get("timeout", 5)) #czas oczekiwania na zwolnienie blokady zapisu
+        conn = sqlite3.connect(
+            ":memory:",
+            timeout=timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        try:
+            conn.execute("ATTACH DATABASE ? AS dbo", (str(path),))
+            conn.execute("PRAGMA dbo.journal_mode=WAL") #czytelnicy nie blokują zapisu
+            conn.execute("PRAGMA dbo.synchronous=NORMAL") #w trybie WAL bezpieczne i szybsze niż FULL
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.create_function("SYSUTCDATETIME", 0, _utc_now_text)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def use_database(self, cur, db_name: str) -> None: #plik bazy wskazuje konfiguracja - brak przełączania kontekstu
+        return None
+
+    def ensure_database(self, conn, db_name: str) -> bool:
+        cur = conn.cursor()
+        try:
+            cur.execute("PRAGMA dbo.user_version")
+            if cur.fetchone()[0]: #plik był już zainicjalizowany
+                return False
+            cur.execute("PRAGMA dbo.user_version = 1")
+            conn.commit()
+            return True
+        finally:
+            cur.close()
+
+    def quote_table(self, table: str) -> str:
+        return f"dbo.{_quote_ident(table)}"
+
+    def table_exists(self, cur, table: str) -> bool:
+        cur.execute(
+            "SELECT 1 FROM dbo.sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        )
+        return cur.fetchone() is not None
+
+    def list_tables(self, cur) -> list[str]:
+        cur.execute("SELECT name FROM dbo.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' ORDER BY name")
+        return [str(row[0]) for row in cur.fetchall()]
+
+    def create_users_table(self, cur) -> None:
+        cur.execute("""
+CREATE TABLE IF NOT EXISTS dbo.users (
+    users_id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    login           TEXT     NOT NULL COLLATE NOCASE,
+    secured_pwd     BLOB     NOT NULL,
+    check_mfa       INTEGER  NOT NULL DEFAULT 0,
+    mfa_secret      BLOB     NULL,
+    data_key        BLOB     NULL,
+    is_locked       INTEGER  NOT NULL DEFAULT 0,
+    failed_attempts INTEGER  NOT NULL DEFAULT 0,
+    created_at      DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at      DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+""") #COLLATE NOCASE odpowiada domyślnemu porównaniu loginów w SQL Server
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS dbo.UX_users_login ON users(login)")
+
+    def upgrade_users_table(self, cur) -> None:
+        cur.execute("PRAGMA dbo.table_info(users)")
+        columns = {row[1] for row in cur.fetchall()}
+        if "data_key" not in columns:
+            cur.execute("ALTER TABLE dbo.users ADD COLUMN data_key BLOB NULL")
+
+    def create_entries_table(self, cur) -> None:
+        # rowid (id) pozostaje kluczem tabeli; wyszukiwanie po użytkowniku obsługują indeksy z user_id na początku
+        cur.execute("""
+CREATE TABLE IF NOT EXISTS dbo.entries (
+    id          INTEGER  PRIMARY KEY AUTOINCREMENT,
+    user_id     INTEGER  NOT NULL REFERENCES users(users_id) ON DELETE CASCADE,
+    service     TEXT     NOT NULL,
+    login       TEXT     NOT NULL,
+    password    BLOB     NOT NULL,
+    created_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expire_date DATETIME NULL,
+    row_version INTEGER  NOT NULL DEFAULT 0
+)
+""")
+        self.create_entries_change_tracking(cur)
+        self.create_entries_indexes(cur)
+
+    def upgrade_entries_table(self, cur) -> None:
+        cur.execute("PRAGMA dbo.table_info(entries)")
+        columns = {row[1] for row in cur.fetchall()}
+        if "row_version" not in columns:
+            cur.execute("ALTER TABLE dbo.entries ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+        self.create_entries_change_tracking(cur)
+
+    def create_entries_change_tracking(self, cur) -> None:
+        # SQLite nie ma typu ROWVERSION - licznik w dbo.entries_clock zwiększany przez wyzwalacze w transakcji zapisu
+        cur.execute("CREATE TABLE IF NOT EXISTS dbo.entries_clock (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)")
+        cur.execute("INSERT OR IGNORE INTO dbo.entries_clock (id, value) VALUES (1, 0)")
+        cur.execute("""
+CREATE TABLE IF NOT EXISTS dbo.entries_deleted (
+    user_id     INTEGER  NOT NULL,
+    id          INTEGER  NOT NULL,
+    row_version INTEGER  NOT NULL,
+    deleted_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, id)
+)
+""")
+        cur.execute("CREATE INDEX IF NOT EXISTS dbo.IX_entries_deleted_user_version ON entries_deleted(user_id, row_version)")
+        for name, event in (
+            ("TR_entries_version_insert", "INSERT"),
+            ("TR_entries_version_update", "UPDATE OF user_id, service, login, password, expire_date"), #bez row_version - brak rekurencji
+        ):
+            cur.execute(f"""
+CREATE TRIGGER IF NOT EXISTS dbo.{name} AFTER {event} ON entries
+BEGIN
+    UPDATE entries_clock SET value = value + 1 WHERE id = 1;
+    UPDATE entries SET row_version = (SELECT value FROM entries_clock WHERE id = 1) WHERE id = NEW.id;
+END
+""")
+        cur.execute("""
+CREATE TRIGGER IF NOT EXISTS dbo.TR_entries_deleted AFTER DELETE ON entries
+BEGIN
+    UPDATE entries_clock SET value = value + 1 WHERE id = 1;
+    INSERT OR REPLACE INTO entries_deleted (user_id, id, row_version)
+    VALUES (OLD.user_id, OLD.id, (SELECT value FROM entries_clock WHERE id = 1));
+END
+""") #również usunięcia kaskadowe z dbo.users
+
+    def row_version_watermark(self, cur) -> int:
+        # zapisy są szeregowane, a licznik zmienia się w transakcji zapisu - odczytana wartość jest zatwierdzona
+        cur.execute("SELECT value FROM dbo.entries_clock WHERE id = 1")
+        return int(cur.fetchone()[0])
+
+    def create_entries_indexes(self, cur) -> None:
+        # rowid (id) jest dołączany na końcu każdego indeksu, więc strona (kolumna, id) to wyszukiwanie w indeksie
+        cur.execute("CREATE INDEX IF NOT EXISTS dbo.IX_entries_user_created ON entries(user_id, created_at DESC, id DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS dbo.IX_entries_user_service ON entries(user_id, service)")
+        cur.execute("CREATE INDEX IF NOT EXISTS dbo.IX_entries_user_login ON entries(user_id, login)")
+        cur.execute("CREATE INDEX IF NOT EXISTS dbo.IX_entries_user_expire ON entries(user_id, expire_date)")
+        # wyszukiwanie po prefiksie (LIKE 'abc%') bez rozróżniania wielkości liter wymaga indeksu NOCASE (tylko litery ASCII)
+        cur.execute("CREATE INDEX IF NOT EXISTS dbo.IX_entries_user_service_nocase ON entries(user_id, service COLLATE NOCASE)")
+        cur.execute("CREATE INDEX IF NOT EXISTS dbo.IX_entries_user_login_nocase ON entries(user_id, login COLLATE NOCASE)")
+        cur.execute("CREATE INDEX IF NOT EXISTS dbo.IX_entries_user_version ON entries(user_id, row_version)") #zmiany od znacznika wersji
+
+    def create_entries_migration_table(self, cur) -> None:
+        cur.execute("""
+CREATE TABLE IF NOT EXISTS dbo.entries_migration (
+    user_id      INTEGER  NOT NULL PRIMARY KEY,
+    source_table TEXT     NOT NULL,
+    last_id      INTEGER  NOT NULL DEFAULT 0,
+    copied_rows  INTEGER  NOT NULL DEFAULT 0,
+    checksum     TEXT     NOT NULL,
+    status       TEXT     NOT NULL,
+    started_at   DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at   DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME NULL
+)
+""")
+
+    def rename_table(self, cur, old_table: str, new_table: str) -> None:
+        cur.execute(f"ALTER TABLE {self.quote_table(old_table)} RENAME TO {_quote_ident(new_table)}")
+
+    def insert_many_returning(
+        self, cur, table_sql: str, columns: tuple[str, ...], rows, key_column: str
+    ) -> list[int]:
+        row_sql = "(" + ", ".join("?" for _ in columns) + ")"
+        cur.execute( #wiersze wstawiane są w kolejności VALUES, więc rosnące klucze odpowiadają kolejności wierszy
+            f"INSERT INTO {table_sql} ({', '.join(columns)}) VALUES {', '.join(row_sql for _ in rows)} RETURNING {key_column}",
+            [value for row in rows for value in row],
+        )
+        return sorted(int(row[0]) for row in cur.fetchall())
+
+    def returning(self, column: str) -> str:
+        return f"RETURNING {column}"
+
+    def limit(self, count: int) -> str:
+        return f"LIMIT {int(count)}"
+
+    def nocase(self, column: str) -> str:
+        return f"{column} COLLATE NOCASE"
+
+
+_ENGINES: dict[str, StorageEngine] = { #dostępne silniki według klucza "engine"
+    MssqlEngine.name: MssqlEngine(),
+    SqliteEngine.name: SqliteEngine(),
+}
+
+
+def get_engine(config: dict) -> StorageEngine: #zwraca silnik wskazany w konfiguracji
+    """Zwraca silnik dla klucza ``engine`` (domyślnie ``mssql``)."""
+    name = str(config.get("engine") or MssqlEngine.name).strip().lower()
+    try:
+        return _ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Nieobsługiwany silnik bazy danych: {name}.") from None
+
+
+if pyodbc is not None:
+    DB_ERRORS = (pyodbc.Error, sqlite3.Error) #dowolny błąd bazy danych
+    DB_INTEGRITY_ERRORS = (pyodbc.IntegrityError, sqlite3.IntegrityError) #naruszenie ograniczeń (np. zajęty login)
+    DB_DISCONNECT_ERRORS = (pyodbc.OperationalError, sqlite3.OperationalError) #połączenie nie nadaje się do dalszego użycia
+else:
+    DB_ERRORS = (sqlite3.Error,)
+    DB_INTEGRITY_ERRORS = (sqlite3.IntegrityError,)
+    DB_DISCONNECT_ERRORS = (sqlite3.OperationalError,)
+
+
+__all__ = [
+    "DB_DISCONNECT_ERRORS",
+    "DB_ERRORS",
+    "DB_INTEGRITY_ERRORS",
+    "MssqlEngine",
+    "SqliteEngine",
+    "StorageEngine",
+    "build_connection_string",
+    "format_server_with_port",
+    "get_engine",
+    "split_server_and_port",
+    "sqlite_database_path",
+]
@@ -1,100 +1,52 @@
-"""Logika tworzenia tabeli przechowywania haseł dla użytkownika.
-Sprawdza istnienie tabeli o nazwie dbo.[{login} entries] dla podanego user_id, a jeśli nie istnieje, tworzy ją.
-Zwraca True, jeśli tabela została utworzona, lub False, jeśli już istniała.   
+"""Logika tworzenia tabeli przechowywania haseł.
+Sprawdza istnienie wspólnej tabeli dbo.entries (wpisy wszystkich użytkowników, klucz (user_id, id)), a jeśli nie istnieje, tworzy ją.
+Zwraca True, jeśli tabela została utworzona, lub False, jeśli już istniała (wtedy dotwarzane są brakujące indeksy sortowania listy
+oraz kolumna row_version, tabela usuniętych wpisów dbo.entries_deleted i wyzwalacze śledzenia zmian). Tabela tworzona jest raz dla całej bazy -
+rejestracja użytkownika nie wykonuje już żadnego DDL.
 
 Składa się kolejno z funkcji:
-- ensure_password_store_for_user: Sprawdza istnienie tabeli przechowywania haseł dla użytkownika i tworzy ją, jeśli nie istnieje.
+- ensure_entries_table: Sprawdza istnienie tabeli dbo.entries i tworzy ją, jeśli nie istnieje.
 
 Dodatkowo używa funkcji z db_connection.py do zarządzania połączeniami z bazą danych oraz funkcji z tableusers_creation.py do zapewnienia istnienia tabeli użytkowników.    
 """
-from .db_connection import connect, disconnect #importowanie funkcji connect i disconnect z pliku db_connection.py
+from .db_connection import get_pool #importowanie puli połączeń z pliku db_connection.py
 from .tableusers_creation import ensure_users_table #importowanie funkcji ensure_users_table z pliku tableusers_creation.py
+from .schema_registry import ENTRIES_TABLE, is_schema_ready, mark_schema_ready, schema_scope #importowanie rejestru stanu schematu
 
 
-def ensure_password_store_for_user( #upewnij się, że tabela przechowywania haseł dla użytkownika istnieje
-    user_id: int,
+def ensure_entries_table( #upewnij się, że wspólna tabela haseł istnieje
     *,
     db_name: str = "password_manager",
     config_path: str = "config/db_config.json",
-    conn=None,
 ) -> bool:
-    """Zapewnia istnienie tabeli dbo.[{login} entries] dla uzytkownika.
+    """Zapewnia istnienie tabeli dbo.entries.
 
-    Zwraca True gdy utworzono, False gdy istniała.
+    Zwraca True gdy utworzono, False gdy istniała (lub została już sprawdzona
+    w tym procesie).
     """
-    if user_id <= 0:
-        raise ValueError("user_id musi być dodatni i liczbą całkowitą.")
-
-    ensure_users_table(db_name=db_name, config_path=config_path)
-
-    own_connection = conn is None #sprawdzenie czy przekazano połączenie
-    if own_connection: #jeżeli nie to nawiąż połączenie
-        conn = connect(config_path)
-    cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
-    try:
-        escaped_db = db_name.replace("]", "]]") #ucieczka nazwy bazy danych
-        cur.execute(f"USE [{escaped_db}]") #przełączenie na odpowiednią bazę danych
-
-        # Pobierz login dla users_id
-        cur.execute("SELECT login FROM dbo.users WHERE users_id = ?", user_id)
-        row = cur.fetchone()
-        if not row or not row[0]:
-            raise ValueError(f"user_id {user_id} not found in dbo.users")
-        login = str(row[0])
-
-        # Zbuduj bezpieczną nazwę tabeli: dbo.[{login} entries]
-        # Uwaga: ']' w nazwie należy podwoić wewnątrz nawiasów kwadratowych.
-        bracketed_login = login.replace("]", "]]")
-        table_bracketed = f"[{bracketed_login} entries]"
-        full_table_name = f"dbo.{table_bracketed}"
-
-        # Sprawdź istnienie tabeli po nazwie i schemacie, bez ucieczki w OBJECT_ID
-        cur.execute(
-            """
-            SELECT 1
-            FROM sys.tables t
-            JOIN sys.schemas s ON s.schema_id = t.schema_id
-            WHERE t.name = ? AND s.name = 'dbo'
-            """,
-            f"{login} entries",
-        )
-        exists_before = cur.fetchone() is not None #sprawdzenie czy tabela już istnieje
-
-        if exists_before: #jeżeli tabela istnieje to zwróć False
+    scope = schema_scope(config_path, db_name) #zakres rejestru dla bieżącej konfiguracji
+    if is_schema_ready(scope, ENTRIES_TABLE): #tabela została już sprawdzona w tym procesie
+        return False
+
+    ensure_users_table(db_name=db_name, config_path=config_path) #klucz obcy wymaga tabeli dbo.users
+
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
+        cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
+        engine.use_database(cur, db_name) #przełączenie na odpowiednią bazę danych
+        if engine.table_exists(cur, "entries"): #jeżeli tabela istnieje to zwróć False
+            engine.upgrade_entries_table(cur) #śledzenie zmian (row_version, dbo.entries_deleted) brakujące w starszych bazach
+            engine.create_entries_indexes(cur) #indeksy sortowania listy brakujące w starszych bazach
+            conn.commit()
             created = False
-        else: 
-            # Utwórz tabelę 1:1 z dokumentacją i FK do users
-            ddl = f"""
-CREATE TABLE {full_table_name} (
-    id BIGINT IDENTITY(1,1) PRIMARY KEY,
-    user_id INT NOT NULL,
-    service NVARCHAR(255) NOT NULL,
-    login NVARCHAR(255) NOT NULL,
-    password VARBINARY(MAX) NOT NULL,
-    created_at DATETIME2(0) NOT NULL DEFAULT (SYSUTCDATETIME()),
-    updated_at DATETIME2(0) NOT NULL DEFAULT (SYSUTCDATETIME()),
-    expire_date DATETIME2(0) NULL,
-    CONSTRAINT FK_{login.replace(' ', '_')}_entries_users
-        FOREIGN KEY (user_id) REFERENCES dbo.users(users_id)
-);
-CREATE INDEX IX_{login.replace(' ', '_')}_entries_user_id ON {full_table_name}(user_id);
-CREATE INDEX IX_{login.replace(' ', '_')}_entries_service ON {full_table_name}(service);
-"""
-            cur.execute(ddl)
+        else:
+            engine.create_entries_table(cur) #tabela dbo.entries z FK do users i indeksami
+            conn.commit()
             created = True
-
-    except Exception: #w przypadku wyjątku zamknij kursor i rozłącz jeżeli to własne połączenie
-        cur.close()
-        if own_connection:
-            conn.rollback()
-            disconnect(conn)
-        raise
-    else: #w przypadku sukcesu zamknij kursor i rozłącz jeżeli to własne połączenie
         cur.close()
-        if own_connection:
-            conn.commit()
-            disconnect(conn)
-        return created #zwrócenie czy tabela została utworzona
+    mark_schema_ready(scope, ENTRIES_TABLE)
+    return created #zwrócenie czy tabela została utworzona
 
 
-__all__ = ["ensure_password_store_for_user"] #eksportowanie funkcji ensure_password_store_for_user
+__all__ = ["ensure_entries_table"] #eksportowanie funkcji ensure_entries_table
@@ -1,45 +1,396 @@
-"""Logika CRUD dla wpisów haseł użytkowników. W tym miejscu dodawane, odczytywane, aktualizowane i usuwane są wpisy haseł w dedykowanych tabelach użytkowników.
+"""Logika CRUD dla wpisów haseł użytkowników. W tym miejscu dodawane, odczytywane, aktualizowane i usuwane są wpisy haseł we wspólnej tabeli dbo.entries.
 
-Zawiera funkcje do tworzenia, odczytu, aktualizacji i usuwania wpisów haseł w dedykowanych tabelach użytkowników. Tworzonych kiedy rejestrowane jest konto
+Zawiera funkcje do tworzenia, odczytu, aktualizacji i usuwania wpisów haseł. Wszystkie zapytania są statyczne i sparametryzowane,
+a wpisy użytkownika wybierane są po kluczu (user_id, id).
 Kolejno:
-- add_password_entry: Dodaje nowe hasło użytkownika do dedykowanej tabeli haseł.
+- add_password_entry: Dodaje nowe hasło użytkownika do tabeli haseł.
+- add_password_entries: Dodaje wiele wpisów w jednej transakcji (szyfrowanie i INSERT partiami).
 - list_password_entries: Wyświetla listę wpisów użytkownika.
+- EntryPage, list_password_entries_page: Strona listy wpisów ze stronicowaniem kursorem (keyset) i wybranym kluczem sortowania.
+- search_password_entries: Wyszukuje wpisy po prefiksie serwisu lub loginu (wyszukiwanie w indeksie, limit wyników).
+- EntryChanges, list_changes_since: Wpisy dodane, zmienione i usunięte od znacznika wersji (row_version i dbo.entries_deleted).
+- latest_entry_version: Najwyższa wersja wpisów użytkownika (tanie sprawdzenie, czy od znacznika coś się zmieniło).
 - update_password_entry: Aktualizuje wpis hasła użytkownika.
 - delete_password_entry: Usuwa wpis hasła użytkownika o podanym ID.
 - get_password_entry: Zwraca pojedynczy wpis użytkownika wraz z zaszyfrowanym hasłem.
 - copy_password_to_clipboard: Kopiuje tekst do schowka systemowego.
-- _get_user_table_name: Pomocnicza funkcja do uzyskania nazwy tabeli haseł użytkownika.
+- _insert_entry, _insert_entries, _select_entries, _select_entries_page, _search_entries, _select_changes, _select_latest_version, _select_entry, _update_entry, _delete_entry: Zapytania SQL na przekazanym kursorze, współdzielone z db/vault_session.py.
+- _count_entries, _iter_entry_chunks: Liczba wpisów i strumieniowy odczyt wpisów z hasłami (fetchmany), używane przez db/vault_backup.py.
 
-Dodatkowo używa funkcji z db_connection.py do zarządzania połączeniami z bazą danych oraz funkcji z tablepassword_creation.py do zapewnienia istnienia tabeli haseł użytkowników. oraz security/decrypt.py do odszyfrowywania haseł.
+Dodatkowo używa funkcji z db_connection.py do zarządzania połączeniami z bazą danych oraz funkcji z tablepassword_creation.py do zapewnienia istnienia tabeli haseł. oraz security/keyring.py do szyfrowania i odszyfrowywania haseł.
 
 Umieszczono tu również menu CLI.
 """
 
+from concurrent.futures import ThreadPoolExecutor #importowanie puli wątków do równoległego szyfrowania partii
 from datetime import datetime #importowanie klasy datetime z modułu datetime
-import pyodbc #importowanie modułu pyodbc do obsługi połączeń z bazą danych
 import importlib #importowanie modułu importlib do dynamicznego ładowania modułów
+from itertools import groupby, islice #importowanie funkcji groupby i islice do dzielenia wpisów na partie
+import os #importowanie modułu os do ustalenia liczby wątków
+import re #importowanie modułu re do ucieczki znaków specjalnych wzorca LIKE
 import threading #importowanie modułu threading do opóźnionego czyszczenia schowka
-from security.decrypt import decrypt_with_user_secret #importowanie funkcji do odszyfrowywania haseł
+from typing import Callable, Iterable, NamedTuple #importowanie typów Callable, Iterable i NamedTuple z modułu typing
+from security.keyring import SessionKeyRing, session_key_ring #importowanie pęku kluczy sesji do szyfrowania i odszyfrowywania haseł
 
-from db.db_connection import connect, disconnect #importowanie funkcji connect i disconnect z pliku db_connection.py
-from db.tablepassword_creation import ensure_password_store_for_user #importowanie funkcji ensure_password_store_for_user z pliku tablepassword_creation.py
+from db.db_connection import get_pool #importowanie puli połączeń z pliku db_connection.py
+from db.storage_engine import DB_ERRORS #importowanie krotki wyjątków bazodanowych niezależnej od silnika
+from db.tablepassword_creation import ensure_entries_table #importowanie funkcji ensure_entries_table z pliku tablepassword_creation.py
 
+ENTRY_INSERT_CHUNK_SIZE = 500 #liczba wpisów wstawianych jednym zapytaniem INSERT
+_ENTRY_INSERT_COLUMNS = ("user_id", "service", "login", "password", "expire_date") #kolumny wielowierszowego INSERT
+ENTRY_PAGE_SIZE = 100 #domyślna liczba wpisów na stronie listy
+ENTRY_SORT_KEYS = ("created_at", "service", "login", "expire_date") #klucze sortowania listy - każdy ma indeks (user_id, kolumna, id)
+ENTRY_SEARCH_LIMIT = 50 #domyślna maksymalna liczba wyników wyszukiwania
+ENTRY_CHANGES_LIMIT = 500 #maksymalna liczba zmian zwracanych przez list_changes_since (więcej - wczytanie listy od nowa)
 
-def _get_user_table_name(cur, user_id: int) -> str: #pomocnicza funkcja do uzyskania nazwy tabeli haseł użytkownika
-    """Zwraca w pełni kwalifikowaną nazwę tabeli haseł dla użytkownika."""
-    cur.execute("SELECT login FROM dbo.users WHERE users_id = ?", user_id) #wykonanie zapytania SQL w celu pobrania loginu użytkownika
+
+class EntryPage(NamedTuple): #strona listy wpisów
+    """Wpisy strony i kursor następnej strony (``None``, gdy to ostatnia strona)."""
+
+    entries: list[tuple[int, str, str, datetime, datetime | None]]
+    next_cursor: tuple | None = None
+
+
+class EntryChanges(NamedTuple): #zmiany wpisów od znacznika wersji
+    """Wpisy dodane lub zmienione, ID usuniętych i znacznik wersji do kolejnego wywołania.
+
+    ``overflow`` oznacza, że zmian było więcej niż limit - listy nie
+    zwrócono i należy ją wczytać od nowa (od ``watermark``).
+    """
+
+    entries: list[tuple[int, str, str, datetime, datetime | None]]
+    deleted_ids: list[int]
+    watermark: int
+    overflow: bool = False
+
+
+def _normalize_password_bytes(password_value) -> bytes: #normalizuje wartość VARBINARY do bytes
+    if isinstance(password_value, memoryview): #jeśli wartość hasła jest typu memoryview
+        return password_value.tobytes() #konwersja na bytes
+    if isinstance(password_value, bytearray): #jeśli wartość hasła jest typu bytearray
+        return bytes(password_value) #konwersja na bytes
+    if isinstance(password_value, str): #jeśli wartość hasła jest typu str
+        return password_value.encode("ascii") #konwersja na bytes
+    return password_value #w przeciwnym razie przypisanie wartości bez zmian
+
+
+def _insert_entry(cur, user_id: int, service, account_login, account_password, expire_date, *, engine) -> int: #wstawia wpis na podanym kursorze
+    cur.execute( #dodanie nowego wpisu hasła do tabeli
+        f"""
+        INSERT INTO dbo.entries (
+            user_id,
+            service,
+            login,
+            password,
+            created_at,
+            updated_at,
+            expire_date
+        )
+        {engine.output_inserted("id")}
+        VALUES (?, ?, ?, ?, SYSUTCDATETIME(), SYSUTCDATETIME(), ?)
+        {engine.returning("id")}
+        """,
+        (
+            user_id, #ID użytkownika
+            service, #nazwa usługi
+            account_login, #login do konta
+            account_password, #zaszyfrowane hasło do konta
+            expire_date, #data wygaśnięcia hasła (opcjonalne
+        ),
+    )
+    return int(cur.fetchone()[0]) #ID nowo dodanego wpisu jako liczba całkowita
+
+
+def _insert_entries(cur, user_id: int, rows, *, engine) -> list[int]: #wstawia partię wpisów na podanym kursorze
+    """Wstawia wpisy ``(service, login, zaszyfrowane_hasło, expire_date[, created_at])`` i zwraca ich ID w tej samej kolejności.
+
+    Wpis z ``created_at`` (np. odtwarzany z kopii) zachowuje datę utworzenia,
+    pozostałe dostają ją z wartości domyślnej kolumny.
+    """
+    new_ids: list[int] = []
+    for keep_created, run in groupby(rows, key=lambda row: len(row) > 4 and row[4] is not None): #kolejne wpisy z datą utworzenia i bez niej
+        run = list(run)
+        columns = _ENTRY_INSERT_COLUMNS + ("created_at",) if keep_created else _ENTRY_INSERT_COLUMNS
+        per_statement = max(1, engine.max_params // len(columns)) #limit parametrów jednego zapytania
+        for start in range(0, len(run), per_statement):
+            new_ids += engine.insert_many_returning(
+                cur,
+                "dbo.entries",
+                columns,
+                [(user_id, *row[:len(columns) - 1]) for row in run[start:start + per_statement]],
+                "id",
+            ) #updated_at (i created_at wpisów bez daty) z wartości domyślnych kolumn
+    return new_ids
+
+
+def _select_entries(cur, user_id: int) -> list[tuple[int, str, str, datetime, datetime | None]]: #pobiera listę wpisów na podanym kursorze
+    cur.execute( #wykonanie zapytania SQL w celu pobrania wpisów hasła użytkownika
+        """
+        SELECT
+            id,
+            service,
+            login,
+            created_at,
+            expire_date
+        FROM dbo.entries
+        WHERE user_id = ?
+        ORDER BY created_at DESC, id DESC
+        """,
+        (user_id,),
+    )
+    rows = cur.fetchall() #pobranie wszystkich wierszy wyniku zapytania
+
+    result: list[tuple[int, str, str, datetime, datetime | None]] = [] #inicjalizacja pustej listy do przechowywania wyników
+    for r in rows: #iteracja po pobranych wierszach
+        result.append( #dodanie wpisu do listy wyników
+            (
+                int(r[0]), #ID wpisu jako liczba całkowita
+                str(r[1]), #nazwa usługi jako string
+                str(r[2]), #login do konta jako string
+                r[3], #data utworzenia wpisu
+                r[4], #data wygaśnięcia wpisu (lub None)
+            )
+        )
+    return result #zwrócenie listy wyników
+
+
+def _sort_expression(sort: str, engine) -> str: #kolumna sortowania; tekst bez rozróżniania wielkości liter jak w kolacji *_CI_AS
+    return engine.nocase(sort) if sort in ("service", "login") else sort
+
+
+def _keyset_condition(sort: str, descending: bool, after, *, engine) -> tuple[str, tuple]: #warunek "za kursorem" dla sortowania (kolumna, id)
+    if after is None: #pierwsza strona
+        return "", ()
+    value, last_id = after
+    column = _sort_expression(sort, engine)
+    op = "<" if descending else ">"
+    if value is None: #NULL (tylko expire_date) jest pierwszy przy ASC i ostatni przy DESC w obu silnikach
+        if descending:
+            return f"AND {sort} IS NULL AND id < ?", (last_id,)
+        return f"AND ({sort} IS NULL AND id > ? OR {sort} IS NOT NULL)", (last_id,)
+    nulls = f" OR {sort} IS NULL" if descending and sort == "expire_date" else ""
+    return f"AND ({column} {op} ? OR {column} = ? AND id {op} ?{nulls})", (value, value, last_id)
+
+
+def _select_entries_page( #pobiera jedną stronę listy wpisów na podanym kursorze
+    cur,
+    user_id: int,
+    *,
+    sort: str = "created_at",
+    descending: bool = True,
+    after: tuple | None = None,
+    limit: int = ENTRY_PAGE_SIZE,
+    engine,
+) -> EntryPage:
+    """Zwraca stronę wpisów posortowaną po ``(sort, id)`` zaczynając za kursorem ``after``.
+
+    Kursor to para ``(wartość sortowania, id)`` ostatniego wpisu poprzedniej
+    strony - zapytanie jest wyszukiwaniem w indeksie sortowania, więc koszt
+    strony nie zależy od jej numeru.
+    """
+    if sort not in ENTRY_SORT_KEYS: #nazwa kolumny trafia do SQL - tylko z listy dozwolonych
+        raise ValueError(f"Nieobsługiwany klucz sortowania: {sort}.")
+    limit = max(1, int(limit))
+    condition, params = _keyset_condition(sort, descending, after, engine=engine)
+    direction = "DESC" if descending else "ASC"
+    cur.execute(
+        f"""
+        SELECT {engine.top(limit + 1)}
+            id,
+            service,
+            login,
+            created_at,
+            expire_date
+        FROM dbo.entries
+        WHERE user_id = ? {condition}
+        ORDER BY {_sort_expression(sort, engine)} {direction}, id {direction}
+        {engine.limit(limit + 1)}
+        """,
+        (user_id, *params),
+    )
+    rows = [(int(r[0]), str(r[1]), str(r[2]), r[3], r[4]) for r in cur.fetchall()] #o jeden wiersz więcej - czy jest następna strona
+    if len(rows) <= limit:
+        return EntryPage(rows)
+    rows = rows[:limit]
+    last = rows[-1]
+    sort_value = {"service": last[1], "login": last[2], "created_at": last[3], "expire_date": last[4]}[sort]
+    return EntryPage(rows, (sort_value, last[0]))
+
+
+def _like_prefix(prefix: str) -> str: #wzorzec LIKE "prefiks%" z ucieczką znaków specjalnych (%, _, [ i \)
+    return re.sub(r"([\\%_\[])", r"\\\1", prefix) + "%"
+
+
+def _search_entries(cur, user_id: int, prefix: str, limit: int, *, engine) -> list[tuple[int, str, str, datetime, datetime | None]]: #wyszukuje wpisy na podanym kursorze
+    """Zwraca wpisy, których serwis, a następnie login zaczyna się od ``prefix`` (bez rozróżniania wielkości liter).
+
+    Każda kolumna to osobne zapytanie ``LIKE 'prefiks%'`` - wyszukiwanie zakresu
+    w indeksie (user_id, kolumna) z wynikami w kolejności indeksu, więc
+    dokładne dopasowanie jest pierwsze, a koszt zależy od limitu, nie od
+    wielkości sejfu.
+    """
+    limit = max(1, int(limit))
+    pattern = _like_prefix(prefix)
+    found: dict[int, tuple[int, str, str, datetime, datetime | None]] = {}
+    for column in ("service", "login"): #nazwy kolumn ze stałej listy
+        if len(found) >= limit:
+            break
+        cur.execute(
+            f"""
+            SELECT {engine.top(limit)}
+                id,
+                service,
+                login,
+                created_at,
+                expire_date
+            FROM dbo.entries
+            WHERE user_id = ? AND {column} LIKE ? ESCAPE '\\'
+            ORDER BY {engine.nocase(column)}, id
+            {engine.limit(limit)}
+            """,
+            (user_id, pattern),
+        )
+        for r in cur.fetchall():
+            found.setdefault(int(r[0]), (int(r[0]), str(r[1]), str(r[2]), r[3], r[4])) #wpis pasujący po serwisie i loginie tylko raz
+    return list(found.values())[:limit]
+
+
+def _select_changes(cur, user_id: int, watermark: int, limit: int, *, engine) -> EntryChanges: #pobiera zmiany na podanym kursorze
+    """Zwraca wpisy i usunięcia z wersją większą niż ``watermark`` (wyszukiwanie w indeksach (user_id, row_version)).
+
+    Nowy znacznik odczytywany jest przed zmianami - zmiana zatwierdzona
+    w międzyczasie wróci w kolejnym wywołaniu, a jej ponowne zastosowanie
+    niczego nie psuje.
+    """
+    limit = max(1, int(limit))
+    new_watermark = engine.row_version_watermark(cur)
+    cur.execute(
+        f"""
+        SELECT {engine.top(limit + 1)}
+            id,
+            service,
+            login,
+            created_at,
+            expire_date
+        FROM dbo.entries
+        WHERE user_id = ? AND {engine.version_after("row_version")}
+        ORDER BY row_version
+        {engine.limit(limit + 1)}
+        """,
+        (user_id, watermark),
+    )
+    entries = [(int(r[0]), str(r[1]), str(r[2]), r[3], r[4]) for r in cur.fetchall()]
+    if len(entries) > limit: #zbyt wiele zmian - taniej wczytać listę od nowa
+        return EntryChanges([], [], new_watermark, True)
+    remaining = limit - len(entries) + 1
+    cur.execute(
+        f"""
+        SELECT {engine.top(remaining)} id
+        FROM dbo.entries_deleted
+        WHERE user_id = ? AND {engine.version_after("row_version")}
+        ORDER BY row_version
+        {engine.limit(remaining)}
+        """,
+        (user_id, watermark),
+    )
+    deleted_ids = [int(r[0]) for r in cur.fetchall()]
+    if len(entries) + len(deleted_ids) > limit:
+        return EntryChanges([], [], new_watermark, True)
+    return EntryChanges(entries, deleted_ids, new_watermark)
+
+
+def _select_latest_version(cur, user_id: int, *, engine) -> int: #najwyższa wersja wpisów użytkownika na podanym kursorze
+    # po jednym odczycie ostatniego klucza indeksów (user_id, row_version) - koszt niezależny od wielkości sejfu
+    cur.execute(
+        f"""
+        SELECT
+            (SELECT {engine.version_value("MAX(row_version)")} FROM dbo.entries WHERE user_id = ?),
+            (SELECT {engine.version_value("MAX(row_version)")} FROM dbo.entries_deleted WHERE user_id = ?)
+        """,
+        (user_id, user_id),
+    )
+    row = cur.fetchone()
+    return max(int(row[0] or 0), int(row[1] or 0))
+
+
+def _select_entry(cur, user_id: int, entry_id: int): #pobiera pojedynczy wpis na podanym kursorze
+    cur.execute( #wykonanie zapytania SQL w celu pobrania wpisu hasła użytkownika o podanym ID
+        """
+        SELECT
+            id,
+            service,
+            login,
+            password,
+            created_at,
+            expire_date
+        FROM dbo.entries
+        WHERE user_id = ? AND id = ?
+        """,
+        (user_id, entry_id),
+    )
     row = cur.fetchone() #pobranie pierwszego wiersza wyniku zapytania
-    if not row or not row[0]: #sprawdzenie, czy wiersz istnieje i czy zawiera login
-        raise ValueError(f"user_id {user_id} not found in dbo.users") #jeśli nie, zgłoszenie wyjątku ValueError
+    if row is None: #jeśli wiersz nie istnieje
+        return None #zwrócenie None
+
+    return ( #zwrócenie wpisu jako krotki
+        int(row[0]), #ID wpisu jako liczba całkowita
+        str(row[1]), #nazwa usługi jako string
+        str(row[2]), #login do konta jako string
+        _normalize_password_bytes(row[3]), #zaszyfrowane hasło do konta jako bytes
+        row[4], #data utworzenia wpisu
+        row[5], #data wygaśnięcia wpisu (lub None)
+    )
 
-    login = str(row[0]) #konwersja loginu na string
 
-    # Ucieczka znaku ']' w nazwie loginu
-    bracketed_login = login.replace("]", "]]")
-    return f"dbo.[{bracketed_login} entries]"
+def _count_entries(cur, user_id: int) -> int: #liczba wpisów użytkownika na podanym kursorze
+    cur.execute("SELECT COUNT(*) FROM dbo.entries WHERE user_id = ?", (user_id,))
+    return int(cur.fetchone()[0])
 
 
-def add_password_entry( #dodaje nowe hasło użytkownika do dedykowanej tabeli haseł
+def _iter_entry_chunks(cur, user_id: int, chunk_size: int): #strumieniowy odczyt wpisów z zaszyfrowanymi hasłami
+    """Zwraca kolejne listy (maks. ``chunk_size``) wpisów ``(id, service, login, password, created_at, expire_date)``."""
+    cur.execute(
+        """
+        SELECT id, service, login, password, created_at, expire_date
+        FROM dbo.entries
+        WHERE user_id = ?
+        ORDER BY id
+        """,
+        (user_id,),
+    )
+    while rows := cur.fetchmany(chunk_size): #w pamięci tylko bieżąca partia
+        yield [
+            (int(r[0]), str(r[1]), str(r[2]), _normalize_password_bytes(r[3]), r[4], r[5])
+            for r in rows
+        ]
+
+
+def _update_entry(cur, user_id: int, entry_id: int, new_service, new_login, new_password, new_expire_date) -> bool: #aktualizuje wpis na podanym kursorze
+    cur.execute( #wykonanie zapytania SQL w celu aktualizacji wpisu hasła użytkownika
+        """
+        UPDATE dbo.entries
+        SET
+            service = COALESCE(?, service),
+            login = COALESCE(?, login),
+            password = COALESCE(?, password),
+            expire_date = COALESCE(?, expire_date),
+            updated_at = SYSUTCDATETIME()
+        WHERE user_id = ? AND id = ?
+        """,
+        (new_service, new_login, new_password, new_expire_date, user_id, entry_id),
+    )
+    return cur.rowcount == 1 #True, jeśli jeden wiersz został zaktualizowany
+
+
+def _delete_entry(cur, user_id: int, entry_id: int) -> bool: #usuwa wpis na podanym kursorze
+    cur.execute(
+        "DELETE FROM dbo.entries WHERE user_id = ? AND id = ?",
+        (user_id, entry_id),
+    )
+    return cur.rowcount == 1
+
+
+def add_password_entry( #dodaje nowe hasło użytkownika do tabeli haseł
     user_id: int, #ID użytkownika
     service: str, #nazwa usługi
     account_login: str, #login do konta
@@ -48,48 +399,64 @@ def add_password_entry( #dodaje nowe hasło użytkownika do dedykowanej tabeli h
     *,
     config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego bazy danych
 ) -> int: 
-    """Dodaje nowe hasło użytkownika do dedykowanej tabeli haseł."""
-    ensure_password_store_for_user( #upewnij się, że tabela przechowywania haseł dla użytkownika istnieje
-        user_id=user_id, #wskazanie ID użytkownika
-        db_name="password_manager", #nazwa bazy danych
-        config_path=config_path, #ścieżka do pliku konfiguracyjnego bazy danych
-    )
+    """Dodaje nowe hasło użytkownika do tabeli haseł."""
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
 
-    conn = connect(config_path) #nawiązanie połączenia z bazą danych
-    try:
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
-        cur.execute("USE [password_manager]") #wybranie bazy danych password_manager
-        table_name = _get_user_table_name(cur, user_id) #get_user_table_name - uzyskanie nazwy tabeli haseł użytkownika
-
-        cur.execute( #dodanie nowego wpisu hasła do tabeli
-            f"""
-            INSERT INTO {table_name} (
-                user_id,
-                service,
-                login,
-                password,
-                created_at,
-                updated_at,
-                expire_date
-            )
-            OUTPUT INSERTED.id
-            VALUES (?, ?, ?, ?, SYSUTCDATETIME(), SYSUTCDATETIME(), ?)
-            """,
-            user_id, #ID użytkownika
-            service, #nazwa usługi
-            account_login, #login do konta
-            account_password, #zaszyfrowane hasło do konta
-            expire_date, #data wygaśnięcia hasła (opcjonalne
+        engine.use_database(cur, "password_manager") #wybranie bazy danych password_manager
+        new_id = _insert_entry(
+            cur, user_id, service, account_login, account_password, expire_date, engine=engine
         )
-        new_id = cur.fetchone()[0] #pobranie ID nowo dodanego wpisu
         conn.commit() #zatwierdzenie transakcji
         cur.close() #zamknięcie kursora
-        return int(new_id) #zwrócenie ID nowo dodanego wpisu jako liczba całkowita
-    except Exception: #w przypadku wystąpienia wyjątku
-        conn.rollback() #wycofanie transakcji
-        raise #ponowne zgłoszenie wyjątku
-    finally: #na koniec
-        disconnect(conn) #rozłączenie z bazą danych
+        return new_id #zwrócenie ID nowo dodanego wpisu
+
+
+def add_password_entries( #dodaje wiele wpisów użytkownika w jednej transakcji
+    user_id: int, #ID użytkownika
+    entries: Iterable[tuple], #wpisy (service, login, hasło, expire_date[, created_at])
+    *,
+    user_secret: SessionKeyRing | str | bytes | None = None, #pęk kluczy sesji lub klucz danych - gdy podany, hasła są jawne i szyfrowane tutaj
+    chunk_size: int = ENTRY_INSERT_CHUNK_SIZE, #liczba wpisów w jednej partii
+    progress: Callable[[int], None] | None = None, #otrzymuje liczbę dotąd wstawionych wpisów
+    config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego bazy danych
+) -> list[int]:
+    """Dodaje wpisy partiami w jednej transakcji i zwraca ich ID w kolejności wejścia.
+
+    ``entries`` może być dowolnym iterowalnym (np. generatorem) - w pamięci
+    trzymana jest tylko bieżąca partia. Bez ``user_secret`` hasła muszą być
+    już zaszyfrowane (jak w :func:`add_password_entry`). Błąd dowolnej partii
+    wycofuje cały import.
+    """
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
+
+    chunk_size = max(1, chunk_size)
+    iterator = iter(entries)
+    workers = min(8, os.cpu_count() or 1)
+    keyring = session_key_ring(user_secret) if user_secret is not None else None #klucz wyprowadzany raz na cały import
+
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    new_ids: list[int] = []
+    with pool.connection() as conn, ThreadPoolExecutor(max_workers=workers) as executor: #jedno połączenie na cały import
+        cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
+        engine.use_database(cur, "password_manager") #wybranie bazy danych password_manager
+        while chunk := [tuple(entry) for entry in islice(iterator, chunk_size)]:
+            if keyring is not None: #AES z pycryptodome działa poza GIL - partia szyfrowana w puli wątków
+                tokens = keyring.encrypt_many((entry[2] for entry in chunk), executor=executor)
+                chunk = [
+                    (service, account_login, token.encode("ascii"), *rest)
+                    for (service, account_login, _, *rest), token in zip(chunk, tokens)
+                ]
+            new_ids += _insert_entries(cur, user_id, chunk, engine=engine)
+            if progress is not None:
+                progress(len(new_ids))
+        conn.commit() #zatwierdzenie całego importu (przy błędzie pula wycofuje transakcję)
+        cur.close() #zamknięcie kursora
+    return new_ids #zwrócenie ID nowo dodanych wpisów
 
 
 def list_password_entries( #wyświetla listę wpisów użytkownika
@@ -98,49 +465,114 @@ def list_password_entries( #wyświetla listę wpisów użytkownika
     config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego bazy danych
 ):
     """Zwraca listę wpisów użytkownika (id, service, login, created_at, expire_date)."""
-    ensure_password_store_for_user( #upewnij się, że tabela przechowywania haseł dla użytkownika istnieje
-        user_id=user_id, #wskazanie ID użytkownika
-        db_name="password_manager", #nazwa bazy danych
-        config_path=config_path, #ścieżka do pliku konfiguracyjnego bazy danych
-    )
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
 
-    conn = connect(config_path) #nawiązanie połączenia z bazą danych
-    try: #na początku bloku try
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
-        cur.execute("USE [password_manager]") #wybranie bazy danych password_manager
-        table_name = _get_user_table_name(cur, user_id) #get_user_table_name - uzyskanie nazwy tabeli haseł użytkownika
+        engine.use_database(cur, "password_manager") #wybranie bazy danych password_manager
+        result = _select_entries(cur, user_id)
+        cur.close() #zamknięcie kursora
+        return result #zwrócenie listy wyników
 
-        cur.execute( #wykonanie zapytania SQL w celu pobrania wpisów hasła użytkownika
-            f"""
-            SELECT
-                id,
-                service,
-                login,
-                created_at,
-                expire_date
-            FROM {table_name}
-            WHERE user_id = ?
-            ORDER BY created_at DESC, id DESC
-            """,
-            user_id,
+
+def list_password_entries_page( #zwraca jedną stronę listy wpisów użytkownika
+    user_id: int, #ID użytkownika
+    *, #argumenty nazwane
+    sort: str = "created_at", #klucz sortowania (ENTRY_SORT_KEYS)
+    descending: bool = True, #kierunek sortowania
+    after: tuple | None = None, #kursor z EntryPage.next_cursor poprzedniej strony
+    page_size: int = ENTRY_PAGE_SIZE, #liczba wpisów na stronie
+    config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego bazy danych
+) -> EntryPage:
+    """Zwraca stronę wpisów (id, service, login, created_at, expire_date) i kursor następnej strony."""
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
+
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
+        cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
+        engine.use_database(cur, "password_manager") #wybranie bazy danych password_manager
+        page = _select_entries_page(
+            cur, user_id, sort=sort, descending=descending, after=after, limit=page_size, engine=engine
         )
-        rows = cur.fetchall() #pobranie wszystkich wierszy wyniku zapytania
         cur.close() #zamknięcie kursora
+        return page
 
-        result: list[tuple[int, str, str, datetime, datetime | None]] = [] #inicjalizacja pustej listy do przechowywania wyników
-        for r in rows: #iteracja po pobranych wierszach
-            result.append( #dodanie wpisu do listy wyników
-                (
-                    int(r.id), #ID wpisu jako liczba całkowita
-                    str(r.service), #nazwa usługi jako string
-                    str(r.login), #login do konta jako string
-                    r.created_at, #data utworzenia wpisu
-                    r.expire_date, #data wygaśnięcia wpisu (lub None)
-                )
-            )
-        return result #zwrócenie listy wyników
-    finally: #na koniec
-        disconnect(conn) #rozłączenie z bazą danych
+
+def search_password_entries( #wyszukuje wpisy użytkownika po prefiksie serwisu lub loginu
+    user_id: int, #ID użytkownika
+    prefix: str, #początek nazwy serwisu lub loginu
+    limit: int = ENTRY_SEARCH_LIMIT, #maksymalna liczba wyników
+    *, #argumenty nazwane
+    config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego bazy danych
+) -> list[tuple[int, str, str, datetime, datetime | None]]:
+    """Zwraca do ``limit`` wpisów (id, service, login, created_at, expire_date) zaczynających się od ``prefix``.
+
+    Najpierw dopasowania po serwisie, potem po loginie. Wielkość liter nie ma
+    znaczenia (SQL Server: kolacja *_CI kolumn, SQLite: indeksy NOCASE - tylko
+    litery ASCII). Pusty prefiks zwraca pustą listę.
+    """
+    prefix = prefix.strip()
+    if not prefix:
+        return []
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
+
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
+        cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
+        engine.use_database(cur, "password_manager") #wybranie bazy danych password_manager
+        result = _search_entries(cur, user_id, prefix, limit, engine=engine)
+        cur.close() #zamknięcie kursora
+        return result
+
+
+def list_changes_since( #zwraca zmiany wpisów użytkownika od znacznika wersji
+    user_id: int, #ID użytkownika
+    watermark: int, #znacznik z poprzedniego EntryChanges (lub z chwili wczytania listy)
+    limit: int = ENTRY_CHANGES_LIMIT, #maksymalna liczba zmian
+    *, #argumenty nazwane
+    config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego bazy danych
+) -> EntryChanges:
+    """Zwraca wpisy dodane lub zmienione i ID usuniętych od ``watermark``.
+
+    Koszt zależy od liczby zmian, nie od wielkości sejfu. Po przekroczeniu
+    ``limit`` zwracane jest ``EntryChanges(overflow=True)``.
+    """
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
+
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
+        cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
+        engine.use_database(cur, "password_manager") #wybranie bazy danych password_manager
+        changes = _select_changes(cur, user_id, watermark, limit, engine=engine)
+        cur.close() #zamknięcie kursora
+        return changes
+
+
+def latest_entry_version( #zwraca najwyższą wersję wpisów użytkownika
+    user_id: int, #ID użytkownika
+    *, #argumenty nazwane
+    config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego bazy danych
+) -> int:
+    """Zwraca najwyższą wersję wpisu lub usunięcia użytkownika (0, gdy brak).
+
+    Wartość większa od znacznika z :func:`list_changes_since` oznacza zmiany
+    do pobrania.
+    """
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
+
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
+        cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
+        engine.use_database(cur, "password_manager") #wybranie bazy danych password_manager
+        version = _select_latest_version(cur, user_id, engine=engine)
+        cur.close() #zamknięcie kursora
+        return version
 
 
 def update_password_entry( #aktualizuje wpis hasła użytkownika
@@ -154,45 +586,19 @@ def update_password_entry( #aktualizuje wpis hasła użytkownika
     config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego bazy danych
 ) -> bool: 
     """Aktualizuje wskazany wpis użytkownika."""
-    ensure_password_store_for_user( #upewnij się, że tabela przechowywania haseł dla użytkownika istnieje
-        user_id=user_id, #wskazanie ID użytkownika
-        db_name="password_manager", #nazwa bazy danych
-        config_path=config_path, #ścieżka do pliku konfiguracyjnego bazy danych
-    )
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
 
-    conn = connect(config_path) #nawiązanie połączenia z bazą danych
-    try: #na początku bloku try
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
-        cur.execute("USE [password_manager]") #wybranie bazy danych password_manager
-        table_name = _get_user_table_name(cur, user_id) #get_user_table_name - uzyskanie nazwy tabeli haseł użytkownika
-
-        cur.execute( #wykonanie zapytania SQL w celu aktualizacji wpisu hasła użytkownika
-            f"""
-            UPDATE {table_name}
-            SET
-                service = COALESCE(?, service),
-                login = COALESCE(?, login),
-                password = COALESCE(?, password),
-                expire_date = COALESCE(?, expire_date),
-                updated_at = SYSUTCDATETIME()
-            WHERE id = ? AND user_id = ?
-            """,
-            new_service,
-            new_login,
-            new_password,
-            new_expire_date,
-            entry_id,
-            user_id,
+        engine.use_database(cur, "password_manager") #wybranie bazy danych password_manager
+        updated = _update_entry(
+            cur, user_id, entry_id, new_service, new_login, new_password, new_expire_date
         )
-        affected = cur.rowcount #pobranie liczby zmodyfikowanych wierszy
         conn.commit() #zatwierdzenie transakcji
         cur.close() #zamknięcie kursora
-        return affected == 1 #zwrócenie True, jeśli jeden wiersz został zaktualizowany
-    except Exception: #w przypadku wystąpienia wyjątku
-        conn.rollback() #wycofanie transakcji
-        raise #ponowne zgłoszenie wyjątku
-    finally: #na koniec
-        disconnect(conn) #rozłączenie z bazą danych
+        return updated #zwrócenie True, jeśli jeden wiersz został zaktualizowany
 
 
 def delete_password_entry( #usuwa wpis hasła użytkownika o podanym ID
@@ -202,32 +608,17 @@ def delete_password_entry( #usuwa wpis hasła użytkownika o podanym ID
     config_path: str = "config/db_config.json",
 ) -> bool:
     """Usuwa wpis użytkownika o podanym ID."""
-    ensure_password_store_for_user(
-        user_id=user_id,
-        db_name="password_manager",
-        config_path=config_path,
-    )
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
 
-    conn = connect(config_path)
-    try:
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor()
-        cur.execute("USE [password_manager]")
-        table_name = _get_user_table_name(cur, user_id)
-
-        cur.execute(
-            f"DELETE FROM {table_name} WHERE id = ? AND user_id = ?",
-            entry_id,
-            user_id,
-        )
-        affected = cur.rowcount
+        engine.use_database(cur, "password_manager")
+        deleted = _delete_entry(cur, user_id, entry_id)
         conn.commit()
         cur.close()
-        return affected == 1
-    except Exception:
-        conn.rollback() 
-        raise
-    finally:
-        disconnect(conn) #rozłączenie z bazą danych
+        return deleted
 
 def get_password_entry( # pobiera pojedynczy wpis hasla
     user_id: int,
@@ -237,59 +628,16 @@ def get_password_entry( # pobiera pojedynczy wpis hasla
 ):
     """Zwraca pojedynczy wpis użytkownika wraz z zaszyfrowanym hasłem."""
 
-    ensure_password_store_for_user( #upewnij się, że tabela przechowywania haseł dla użytkownika istnieje
-        user_id=user_id,
-        db_name="password_manager",
-        config_path=config_path,
-    )
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
 
-    conn = connect(config_path) #nawiązanie połączenia z bazą danych
-    try: #na początku bloku try
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
-        cur.execute("USE [password_manager]") #wybranie bazy danych password_manager
-        table_name = _get_user_table_name(cur, user_id) #get_user_table_name - uzyskanie nazwy tabeli haseł użytkownika
-
-        cur.execute( #wykonanie zapytania SQL w celu pobrania wpisu hasła użytkownika o podanym ID
-            f"""
-            SELECT
-                id,
-                service,
-                login,
-                password,
-                created_at,
-                expire_date
-            FROM {table_name}
-            WHERE id = ? AND user_id = ?
-            """,
-            entry_id,
-            user_id,
-        )
-        row = cur.fetchone() #pobranie pierwszego wiersza wyniku zapytania
+        engine.use_database(cur, "password_manager") #wybranie bazy danych password_manager
+        entry = _select_entry(cur, user_id, entry_id)
         cur.close() #zamknięcie kursora
-
-        if row is None: #jeśli wiersz nie istnieje
-            return None #zwrócenie None
-
-        password_value = row.password #pobranie wartości hasła z wiersza
-        if isinstance(password_value, memoryview): #jeśli wartość hasła jest typu memoryview
-            password_bytes = password_value.tobytes() #konwersja na bytes
-        elif isinstance(password_value, bytearray): #jeśli wartość hasła jest typu bytearray
-            password_bytes = bytes(password_value) #konwersja na bytes
-        elif isinstance(password_value, str): #jeśli wartość hasła jest typu str
-            password_bytes = password_value.encode("ascii") #konwersja na bytes
-        else: #w przeciwnym razie
-            password_bytes = password_value #przypisanie wartości bez zmian
-
-        return ( #zwrócenie wpisu jako krotki
-            int(row.id), #ID wpisu jako liczba całkowita
-            str(row.service), #nazwa usługi jako string
-            str(row.login), #login do konta jako string
-            password_bytes, #zaszyfrowane hasło do konta jako bytes
-            row.created_at, #data utworzenia wpisu
-            row.expire_date, #data wygaśnięcia wpisu (lub None)
-        )
-    finally: #na koniec
-        disconnect(conn) #rozłączenie z bazą danych
+        return entry
 
 
 def copy_password_to_clipboard(text: str) -> tuple[bool, str]: #kopiuje tekst do schowka systemowego
@@ -344,7 +692,7 @@ def copy_password_to_clipboard(text: str) -> tuple[bool, str]: #kopiuje tekst do
 
 
 def decrypt_password( # odszyfrowuje haslo uzytkownika
-    encrypted_password: bytes | bytearray | memoryview | str, user_secret: str
+    encrypted_password: bytes | bytearray | memoryview | str, user_secret: SessionKeyRing | str | bytes
 ) -> str:
     if isinstance(encrypted_password, memoryview):
         encrypted_bytes = encrypted_password.tobytes()
@@ -355,20 +703,24 @@ def decrypt_password( # odszyfrowuje haslo uzytkownika
     else:
         encrypted_bytes = str(encrypted_password).encode("ascii")
     encrypted_token = encrypted_bytes.decode("ascii")
-    return decrypt_with_user_secret(encrypted_token, user_secret).decode("utf-8")
+    return session_key_ring(user_secret).decrypt(encrypted_token).decode("utf-8")
 
 
 def view_or_copy_password( # pozwala na podgląd lub skopiowanie wybranego hasła użytkownika
     user_id: int, #ID użytkownika
-    user_secret: str, #sekretny klucz użytkownika do odszyfrowywania haseł
+    user_secret: SessionKeyRing | str | bytes, #pęk kluczy sesji (lub klucz danych) do odszyfrowywania haseł
     *,
     config_path: str = "config/db_config.json", #ścieżka do pliku konfiguracyjnego bazy danych
+    vault=None, #opcjonalna sesja sejfu (VaultSession) zalogowanego użytkownika
 ) -> None:
     """Pozwala na podgląd lub skopiowanie wybranego hasła użytkownika."""
 
     try: #próba pobrania listy wpisów hasła użytkownika
-        entries = list_password_entries(user_id=user_id, config_path=config_path) #pobranie listy wpisów hasła użytkownika
-    except pyodbc.Error as exc: #w przypadku wystąpienia wyjątku pyodbc.Error
+        if vault is not None: #sesja sejfu ma już połączenie
+            entries = vault.list()
+        else:
+            entries = list_password_entries(user_id=user_id, config_path=config_path) #pobranie listy wpisów hasła użytkownika
+    except DB_ERRORS as exc: #w przypadku wystąpienia błędu bazy danych
         print(f"\n[!] Błąd podczas pobierania haseł: {exc}.\n") #wyświetlenie informacji o błędzie
         return #zakończenie funkcji
 
@@ -393,12 +745,15 @@ def view_or_copy_password( # pozwala na podgląd lub skopiowanie wybranego hasł
     entry_id = int(entry_raw) #konwersja podanego ID na liczbę całkowitą
 
     try: #próba pobrania wpisu hasła użytkownika o podanym ID
-        entry = get_password_entry( # pobranie wpisu hasła użytkownika o podanym ID
-            user_id=user_id, #ID użytkownika
-            entry_id=entry_id, #ID wpisu hasła
-            config_path=config_path, #ścieżka do pliku konfiguracyjnego bazy danych
-        )
-    except pyodbc.Error as exc: #w przypadku wystąpienia wyjątku pyodbc.Error
+        if vault is not None:
+            entry = vault.get(entry_id)
+        else:
+            entry = get_password_entry( # pobranie wpisu hasła użytkownika o podanym ID
+                user_id=user_id, #ID użytkownika
+                entry_id=entry_id, #ID wpisu hasła
+                config_path=config_path, #ścieżka do pliku konfiguracyjnego bazy danych
+            )
+    except DB_ERRORS as exc: #w przypadku wystąpienia błędu bazy danych
         print(f"\n[!] Błąd podczas pobierania hasła: {exc}.\n") #wyświetlenie informacji o błędzie
         return #zakończenie funkcji
 
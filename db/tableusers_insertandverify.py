@@ -2,23 +2,30 @@
 
 Zawiera funkcje kolejno:
 - create_user: Tworzy nowego użytkownika w dbo.users i zwraca jego users_id.
-- verify_user: Weryfikuje użytkownika po loginie i haśle w postaci jawnej.
+- verify_user: Weryfikuje użytkownika po loginie i haśle w postaci jawnej i odpakowuje jego klucz danych.
+- complete_mfa_login: Kończy dwuetapowe logowanie z MFA na podstawie biletu pre-auth i kodu TOTP.
 - update_user_credentials: Aktualizuje login i/lub hasło głównego zalogowanego użytkownika.
 - VerificationResult: Klasa opisująca wynik próby logowania.
 
+Wpisy sejfu i sekret MFA szyfrowane są kluczem danych użytkownika (security/data_key.py), opakowanym hasłem głównym
+w kolumnie dbo.users.data_key. Konta sprzed tej zmiany są migrowane jednorazowo przy pierwszym poprawnym logowaniu, a klucz
+opakowany starszym KDF (sha256) lub z nieaktualnym kosztem scrypt jest wtedy opakowywany ponownie (security/kdf.py).
+Przy logowaniu przenoszone są też wpisy konta, które ma jeszcze tabelę dbo.[{login} entries] (entries_migration.py).
 
-Dodatkowo używa funkcji z db_connection.py do zarządzania połączeniami z bazą danych, z tableusers_creation.py do zapewnienia istnienia tabeli użytkowników oraz funkcji z tablepassword_creation.py do zapewnienia istnienia tabeli przechowywania haseł dla użytkownika.
+
+Dodatkowo używa funkcji z db_connection.py do zarządzania połączeniami z bazą danych, z tableusers_creation.py do zapewnienia istnienia tabeli użytkowników oraz funkcji z tablepassword_creation.py do zapewnienia istnienia wspólnej tabeli wpisów dbo.entries.
 oraz security dla operacji związanych z bezpieczeństwem, takich jak szyfrowanie, odszyfrowywanie, haszowanie i weryfikacja haseł oraz obsługa wieloskładnikowego uwierzytelniania (MFA).
 """
 
+import os #importowanie modułu os do ustalenia liczby wątków
+from concurrent.futures import ThreadPoolExecutor #importowanie puli wątków do równoległego szyfrowania
 from datetime import datetime #importowanie klasy datetime z modułu datetime
-from typing import Literal, NamedTuple #importowanie klas Literal i NamedTuple z modułu typing
-
-import pyodbc #importowanie modułu pyodbc do obsługi połączeń z bazą danych
+from typing import Callable, Literal, NamedTuple #importowanie klas Callable, Literal i NamedTuple z modułu typing
 
-from .db_connection import connect, disconnect #importowanie funkcji connect i disconnect z pliku db_connection.py
+from .db_connection import get_pool #importowanie puli połączeń z pliku db_connection.py
 from .tableusers_creation import ensure_users_table #importowanie funkcji ensure_users_table z pliku tableusers_creation.py
-from .tablepassword_creation import ensure_password_store_for_user #importowanie funkcji ensure_password_store_for_user z pliku tablepassword_creation.py
+from .tablepassword_creation import ensure_entries_table #importowanie funkcji ensure_entries_table z pliku tablepassword_creation.py
+from .entries_migration import migrate_user_entries #przeniesienie wpisów z tabeli per użytkownik (stary układ)
 from security.MFA import ( # obsługa wieloskładnikowego uwierzytelniania
     build_provisioning_uri, 
     decrypt_mfa_secret,
@@ -26,19 +33,31 @@ from security.MFA import ( # obsługa wieloskładnikowego uwierzytelniania
     generate_mfa_secret,
     verify_mfa_code,
 )
-from security.decrypt import decrypt_with_user_secret # importowanie funkcji odszyfrowujących
-from security.encrypt import encrypt_with_user_secret # importowanie funkcji szyfrujących
+from security.data_key import generate_data_key, unwrap_data_key, unwrap_data_key_and_upgrade, wrap_data_key # klucz danych użytkownika
+from security.keyring import SessionKeyRing, session_key_ring # pęk kluczy sesji (klucz wyprowadzany raz)
 from security.hashing import hash_password # importowanie funkcji haszujących
-from security.veryfyhash import verify_password # importowanie funkcji weryfikujących hasła
+from security.preauth import ( # bilety pre-auth dla dwuetapowego logowania z MFA
+    consume_preauth_ticket,
+    discard_preauth_ticket,
+    issue_preauth_ticket,
+    peek_preauth_ticket,
+    record_preauth_failure,
+)
+from security.veryfyhash import verify_password, verify_password_and_upgrade # importowanie funkcji weryfikujących hasła
+
+
+REENCRYPT_BATCH_SIZE = 500 #liczba wpisów przeszyfrowywanych i zapisywanych w jednej partii
 
 
 class VerificationResult(NamedTuple): #klasa opisująca wynik próby logowania
     """Opisuje wynik próby logowania."""
 
-    status: Literal["ok", "locked", "invalid", "mfa_required", "mfa_invalid"]
+    status: Literal["ok", "locked", "invalid", "mfa_required", "mfa_invalid", "expired", "migration_pending"]
     user_id: int | None
     login: str | None
     check_mfa: bool
+    ticket: str | None = None # bilet pre-auth dla statusu "mfa_required" (oraz "mfa_invalid", dopóki bilet jest ważny)
+    data_key: bytes | None = None # klucz danych użytkownika (tylko w statusie "ok") - sekret do szyfrowania wpisów
 
 
 def create_user( #tworzy nowego użytkownika w dbo.users i zwraca jego users_id
@@ -65,14 +84,15 @@ def create_user( #tworzy nowego użytkownika w dbo.users i zwraca jego users_id
         Identyfikator nowego użytkownika (users_id).
     """
     ensure_users_table(config_path=config_path) #upewnij się, że tabela użytkowników istnieje
-    conn = connect(config_path) #nawiązanie połączenia z bazą danych
-    try: 
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor()
-        cur.execute("USE [password_manager]")
+        engine.use_database(cur, "password_manager")
 
         # wstawienie użytkownika z domyślnymi flagami bezpieczeństwa
         cur.execute(
-            """
+            f"""
             INSERT INTO dbo.users (
                 login,
                 secured_pwd,
@@ -83,10 +103,10 @@ def create_user( #tworzy nowego użytkownika w dbo.users i zwraca jego users_id
                 created_at,
                 updated_at
             )
-            OUTPUT INSERTED.users_id
+            {engine.output_inserted("users_id")}
             VALUES (
                 ?,
-                CAST(? AS varbinary(60)),
+                {engine.binary_param},
                 0,
                 NULL,
                 0,
@@ -94,29 +114,15 @@ def create_user( #tworzy nowego użytkownika w dbo.users i zwraca jego users_id
                 SYSUTCDATETIME(),
                 SYSUTCDATETIME()
             )
+            {engine.returning("users_id")}
             """,
-            login,
-            secured_pwd,
+            (login, secured_pwd),
         )
-        new_user_id = cur.fetchone()[0]
-
-        # gwarancja istnienia wspólnej tabeli dbo.entries
-        ensure_password_store_for_user(
-            user_id=new_user_id,
-            conn=conn,
-            db_name="password_manager",
-            config_path=config_path,
-        )
+        new_user_id = cur.fetchone()[0] #wpisy trafiają do wspólnej dbo.entries - rejestracja nie wykonuje DDL
 
         conn.commit() 
         cur.close()
         return int(new_user_id)
-    except Exception:
-        # nic nie commitujemy, ale dla spójności rollback i ponowne zgłoszenie
-        conn.rollback()
-        raise
-    finally:
-        disconnect(conn)
 
 
 def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
@@ -124,6 +130,7 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
     password: str,
     mfa_code: str | None = None,
     config_path: str = "config/db_config.json",
+    progress: Callable[[float], None] | None = None,
 ) -> VerificationResult:
     """
     Weryfikuje użytkownika po loginie i haśle w postaci jawnej.
@@ -137,6 +144,8 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
         wartości zapisanej w bazie.
     config_path:
         ścieżka do pliku konfiguracyjnego z parametrami połączenia.
+    progress:
+        Opcjonalny callback postępu (0.0-1.0) jednorazowej migracji sejfu do klucza danych.
 
     Zwraca
     -------
@@ -146,21 +155,27 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
             - ``"locked"`` gdy konto jest zablokowane,
             - ``"mfa_required"`` gdy potrzebny jest kod jednorazowy,
             - ``"mfa_invalid"`` dla błędnego kodu,
+            - ``"migration_pending"`` gdy przeniesienie wpisów ze starego układu nie zostało
+              zweryfikowane (ponowna próba przy kolejnym logowaniu),
             - ``"invalid"`` w pozostałych przypadkach.
-        user_id/login są dostępne tylko w statusie ``"ok"``.
+        user_id/login są dostępne tylko w statusie ``"ok"``, podobnie jak ``data_key`` -
+        klucz, którym należy szyfrować i odszyfrowywać wpisy użytkownika.
+        Przy ``"mfa_required"`` pole ``ticket`` zawiera bilet pre-auth, który należy
+        przekazać do :func:`complete_mfa_login` zamiast ponownie wywoływać ``verify_user``.
     """
-    ensure_users_table(config_path=config_path)
-    conn = connect(config_path)
-    try:
+    ensure_entries_table(config_path=config_path) #tabela wpisów (i użytkowników) - potrzebna przy migracji sejfu
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor()
-        cur.execute("USE [password_manager]")
+        engine.use_database(cur, "password_manager")
         cur.execute(
             """
-            SELECT users_id, login, secured_pwd, is_locked, failed_attempts, check_mfa, mfa_secret
+            SELECT users_id, login, secured_pwd, is_locked, failed_attempts, check_mfa, mfa_secret, data_key
             FROM dbo.users
             WHERE login = ?
             """,
-            login,
+            (login,),
         )
         row = cur.fetchone()
         if row is None:
@@ -174,6 +189,7 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
         failed_attempts = int(row[4])
         check_mfa = bool(row[5])
         stored_mfa_secret = row[6]
+        wrapped_data_key = row[7]
 
         if is_locked:
             cur.close()
@@ -186,7 +202,8 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
             return VerificationResult(status="invalid", user_id=None, login=None, check_mfa=False)
 
         stored_hash = _ensure_bytes(stored_encrypted)
-        if not verify_password(password, stored_hash):
+        password_ok, upgraded_hash = verify_password_and_upgrade(password, stored_hash)
+        if not password_ok:
             new_failed_attempts = failed_attempts + 1
             lock_account = new_failed_attempts > 5
             cur.execute(
@@ -195,14 +212,36 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
                 SET failed_attempts = ?, is_locked = ?, updated_at = SYSUTCDATETIME()
                 WHERE users_id = ?
                 """,
-                new_failed_attempts,
-                int(lock_account),
-                user_id,
+                (new_failed_attempts, int(lock_account), user_id),
             )
             conn.commit()
             cur.close()
             return VerificationResult(status="invalid", user_id=None, login=None, check_mfa=check_mfa)
 
+        if upgraded_hash is not None: # skrót w starszym formacie - zapis w kopercie $pm1$ po poprawnym haśle
+            cur.execute(
+                f"""
+                UPDATE dbo.users
+                SET secured_pwd = {engine.binary_param}, updated_at = SYSUTCDATETIME()
+                WHERE users_id = ?
+                """,
+                (upgraded_hash, user_id),
+            )
+            conn.commit()
+
+        migration = migrate_user_entries( #konto z tabelą w starym układzie - przeniesienie wpisów przed otwarciem klucza danych
+            conn, engine, user_id, user_login, config_path=config_path, progress=progress
+        )
+        if migration is not None and migration.status != "done": #kopia niezweryfikowana - bez logowania i migracji klucza danych
+            cur.close()
+            return VerificationResult(
+                status="migration_pending", user_id=None, login=None, check_mfa=check_mfa
+            )
+        data_key, stored_mfa_secret = _open_data_key( #klucz danych (przy pierwszym logowaniu - migracja sejfu)
+            cur, engine, user_id, password, wrapped_data_key, stored_mfa_secret, progress=progress
+        )
+        conn.commit() #migracja sejfu lub ponowne opakowanie klucza danych (bez zmian - pusta transakcja)
+
         normalized_mfa_code = mfa_code.strip() if mfa_code else ""
         if check_mfa:
             if stored_mfa_secret is None:
@@ -213,12 +252,12 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
                     SET check_mfa = 0, mfa_secret = NULL, updated_at = SYSUTCDATETIME()
                     WHERE users_id = ?
                     """,
-                    user_id,
+                    (user_id,),
                 )
                 conn.commit()
                 check_mfa = False
             else:
-                secret = decrypt_mfa_secret(_extract_ascii_text(stored_mfa_secret), password)
+                secret = decrypt_mfa_secret(_extract_ascii_text(stored_mfa_secret), data_key)
                 if not normalized_mfa_code:
                     cur.close()
                     return VerificationResult(
@@ -226,6 +265,7 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
                         user_id=user_id,
                         login=user_login,
                         check_mfa=True,
+                        ticket=issue_preauth_ticket(user_id, user_login, secret, data_key), # drugi krok bez ponownego bcrypt
                     )
                 if not verify_mfa_code(secret, normalized_mfa_code):
                     new_failed_attempts = failed_attempts + 1
@@ -236,9 +276,7 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
                         SET failed_attempts = ?, is_locked = ?, updated_at = SYSUTCDATETIME()
                         WHERE users_id = ?
                         """,
-                        new_failed_attempts,
-                        int(lock_account),
-                        user_id,
+                        (new_failed_attempts, int(lock_account), user_id),
                     )
                     conn.commit()
                     cur.close()
@@ -256,7 +294,7 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
                 SET failed_attempts = 0, updated_at = SYSUTCDATETIME()
                 WHERE users_id = ?
                 """,
-                user_id,
+                (user_id,),
             )
             conn.commit()
         else:
@@ -264,10 +302,104 @@ def verify_user( #weryfikuje użytkownika po loginie i haśle w postaci jawnej
 
         cur.close()
         return VerificationResult(
-            status="ok", user_id=user_id, login=user_login, check_mfa=check_mfa
-        ) # zwrócenie identyfikatora użytkownika i loginu
-    finally:
-        disconnect(conn) #rozłączenie z bazą danych
+            status="ok", user_id=user_id, login=user_login, check_mfa=check_mfa, data_key=data_key
+        ) # zwrócenie identyfikatora użytkownika, loginu i klucza danych
+
+
+def complete_mfa_login( #kończy logowanie z MFA na podstawie biletu pre-auth
+    ticket: str,
+    mfa_code: str,
+    config_path: str = "config/db_config.json",
+) -> VerificationResult:
+    """
+    Drugi krok logowania z MFA - weryfikuje wyłącznie kod TOTP.
+
+    Hasło zostało już sprawdzone przez :func:`verify_user`, który wydał bilet
+    ``ticket``. Bilet jest jednorazowy i krótkotrwały; po kilku błędnych kodach
+    zostaje unieważniony. Błędne kody zwiększają licznik ``failed_attempts``
+    tak samo jak w :func:`verify_user`.
+
+    Zwraca
+    -------
+    VerificationResult
+        status:
+            - ``"ok"`` gdy kod jest poprawny,
+            - ``"mfa_invalid"`` dla błędnego kodu (``ticket`` jest ustawiony, jeśli można spróbować ponownie),
+            - ``"locked"`` gdy konto jest zablokowane,
+            - ``"expired"`` gdy bilet jest nieważny, wygasł lub został już użyty,
+            - ``"invalid"`` gdy użytkownik nie istnieje.
+    """
+    pending = peek_preauth_ticket(ticket)
+    if pending is None:
+        return VerificationResult(status="expired", user_id=None, login=None, check_mfa=True)
+
+    normalized_mfa_code = mfa_code.strip() if mfa_code else ""
+    code_valid = bool(normalized_mfa_code) and verify_mfa_code(pending.mfa_secret, normalized_mfa_code)
+    if code_valid and consume_preauth_ticket(ticket) is None: # bilet zużyty równolegle przez inne wywołanie
+        return VerificationResult(status="expired", user_id=None, login=None, check_mfa=True)
+
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
+        cur = conn.cursor()
+        engine.use_database(cur, "password_manager")
+        cur.execute(
+            "SELECT is_locked, failed_attempts FROM dbo.users WHERE users_id = ?",
+            (pending.user_id,),
+        )
+        row = cur.fetchone()
+        if row is None:
+            cur.close()
+            discard_preauth_ticket(ticket)
+            return VerificationResult(status="invalid", user_id=None, login=None, check_mfa=False)
+
+        is_locked = bool(row[0])
+        failed_attempts = int(row[1])
+        if is_locked: # konto zablokowane w międzyczasie
+            cur.close()
+            discard_preauth_ticket(ticket)
+            return VerificationResult(
+                status="locked", user_id=pending.user_id, login=pending.login, check_mfa=True
+            )
+
+        if not code_valid:
+            new_failed_attempts = failed_attempts + 1
+            lock_account = new_failed_attempts > 5
+            cur.execute(
+                """
+                UPDATE dbo.users
+                SET failed_attempts = ?, is_locked = ?, updated_at = SYSUTCDATETIME()
+                WHERE users_id = ?
+                """,
+                (new_failed_attempts, int(lock_account), pending.user_id),
+            )
+            conn.commit()
+            cur.close()
+            still_valid = not lock_account and record_preauth_failure(ticket)
+            if not still_valid:
+                discard_preauth_ticket(ticket)
+            return VerificationResult(
+                status="mfa_invalid",
+                user_id=None,
+                login=None,
+                check_mfa=True,
+                ticket=ticket if still_valid else None,
+            )
+
+        if failed_attempts != 0:
+            cur.execute(
+                """
+                UPDATE dbo.users
+                SET failed_attempts = 0, updated_at = SYSUTCDATETIME()
+                WHERE users_id = ?
+                """,
+                (pending.user_id,),
+            )
+        conn.commit()
+        cur.close()
+        return VerificationResult(
+            status="ok", user_id=pending.user_id, login=pending.login, check_mfa=True, data_key=pending.data_key
+        )
 
 
 def _extract_ascii_text(raw_value) -> str: # konwertuje wartosc na tekst ASCII
@@ -283,6 +415,101 @@ def _extract_ascii_text(raw_value) -> str: # konwertuje wartosc na tekst ASCII
     return str(raw_value)
 
 
+def _open_data_key( # zwraca klucz danych uzytkownika, w razie potrzeby migrujac sejf
+    cur,
+    engine,
+    user_id: int,
+    password: str,
+    wrapped_data_key,
+    stored_mfa_secret,
+    *,
+    progress: Callable[[float], None] | None = None,
+    upgrade: bool = True,
+):
+    """Zwraca ``(klucz_danych, sekret_MFA)`` dla użytkownika o poprawnie sprawdzonym haśle.
+
+    Jeżeli konto nie ma jeszcze klucza danych (starszy format - wpisy i sekret
+    MFA zaszyfrowane bezpośrednio hasłem), generuje klucz, przeszyfrowuje nim
+    wpisy i sekret MFA oraz zapisuje opakowany klucz w ``dbo.users``.
+    Klucz opakowany starszym KDF lub z innym kosztem niż bieżąca polityka jest
+    przy ``upgrade`` opakowywany ponownie (bez zmiany wpisów).
+    Zmiany wykonywane są na przekazanym kursorze - zatwierdza je wywołujący.
+    """
+
+    if wrapped_data_key is not None:
+        if not upgrade: #wywołujący i tak opakuje klucz na nowo (zmiana hasła)
+            return unwrap_data_key(_ensure_bytes(wrapped_data_key), password), stored_mfa_secret
+        data_key, rewrapped = unwrap_data_key_and_upgrade(_ensure_bytes(wrapped_data_key), password)
+        if rewrapped is not None:
+            cur.execute(
+                f"""
+                UPDATE dbo.users
+                SET data_key = {engine.binary_param}, updated_at = SYSUTCDATETIME()
+                WHERE users_id = ?
+                """,
+                (rewrapped, user_id),
+            )
+        return data_key, stored_mfa_secret
+
+    data_key = generate_data_key()
+    _reencrypt_entries(cur, engine, user_id, password, data_key, progress=progress)
+
+    new_mfa_secret = None
+    if stored_mfa_secret is not None:
+        new_mfa_secret = encrypt_mfa_secret(
+            decrypt_mfa_secret(_extract_ascii_text(stored_mfa_secret), password), data_key
+        )
+
+    cur.execute(
+        f"""
+        UPDATE dbo.users
+        SET data_key = {engine.binary_param}, mfa_secret = {engine.binary_param}, updated_at = SYSUTCDATETIME()
+        WHERE users_id = ?
+        """,
+        (wrap_data_key(data_key, password), new_mfa_secret, user_id),
+    )
+    return data_key, new_mfa_secret
+
+
+def _reencrypt_entries( # przeszyfrowuje wszystkie wpisy uzytkownika partiami
+    cur,
+    engine,
+    user_id: int,
+    old_secret: str | bytes,
+    new_secret: str | bytes,
+    *,
+    progress: Callable[[float], None] | None = None,
+    batch_size: int = REENCRYPT_BATCH_SIZE,
+) -> int:
+    """Przeszyfrowuje hasła wszystkich wpisów użytkownika; zwraca liczbę wpisów.
+
+    Odszyfrowanie i szyfrowanie partii wykonywane jest w puli wątków (AES
+    z pycryptodome działa poza GIL), a zapis - jednym wsadowym ``UPDATE``
+    na partię (``executemany``, w MSSQL z ``fast_executemany``). Zmiany nie
+    są zatwierdzane - całość commituje lub wycofuje wywołujący.
+    """
+
+    cur.execute("SELECT id, password FROM dbo.entries WHERE user_id = ?", (user_id,))
+    rows = [(int(entry_row[0]), _extract_ascii_text(entry_row[1])) for entry_row in cur.fetchall()]
+    total = len(rows)
+    if not total:
+        return 0
+
+    old_keyring, new_keyring = session_key_ring(old_secret), session_key_ring(new_secret) #klucze wyprowadzane raz na migrację
+    update_sql = "UPDATE dbo.entries SET password = ? WHERE user_id = ? AND id = ?"
+    workers = min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, total, batch_size):
+            batch = rows[start:start + batch_size]
+            plain = old_keyring.decrypt_many((token for _, token in batch), executor=executor)
+            tokens = new_keyring.encrypt_many(plain, executor=executor)
+            params = [(token.encode("ascii"), user_id, entry_id) for (entry_id, _), token in zip(batch, tokens)]
+            engine.executemany(cur, update_sql, params)
+            if progress is not None:
+                progress(min(start + batch_size, total) / total)
+    return total
+
+
 def _ensure_bytes(value) -> bytes: # normalizuje wartosc do bytes
     """Zapewnia, że przekazana wartość jest typu ``bytes``."""
 
@@ -302,23 +529,29 @@ def update_user_credentials( # aktualizuje login i/lub haslo uzytkownika
     new_login: str | None = None,
     new_password: str | None = None,
     config_path: str = "config/db_config.json",
+    progress: Callable[[float], None] | None = None,
 ) -> tuple[str, bool, bool]:
     """Aktualizuje login i/lub hasło główne zalogowanego użytkownika.
 
+    Zmiana hasła opakowuje na nowo jedynie klucz danych użytkownika - wpisy
+    sejfu i sekret MFA pozostają bez zmian. Wpisy przeszyfrowywane są tylko przy
+    migracji konta bez klucza danych; ``progress`` otrzymuje wtedy jej postęp.
+
     Zwraca krotkę (nowy_login, czy_hasło_zmienione, czy_login_zmieniony).
     """
 
     if not old_password:
         raise ValueError("Podaj bieżące hasło.")
 
-    ensure_users_table(config_path=config_path)
-    conn = connect(config_path)
-    try:
+    ensure_entries_table(config_path=config_path) #tabela wpisów (i użytkowników) - potrzebna przy migracji sejfu
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor()
-        cur.execute("USE [password_manager]")
+        engine.use_database(cur, "password_manager")
         cur.execute(
-            "SELECT login, secured_pwd, check_mfa, mfa_secret FROM dbo.users WHERE users_id = ?",
-            user_id,
+            "SELECT login, secured_pwd, check_mfa, mfa_secret, data_key FROM dbo.users WHERE users_id = ?",
+            (user_id,),
         )
         row = cur.fetchone()
         if row is None:
@@ -340,117 +573,50 @@ def update_user_credentials( # aktualizuje login i/lub haslo uzytkownika
         if not login_changed and not password_changed:
             return current_login, False, False
 
-        # upewnij się, że tabela haseł istnieje przed ewentualnym przeniesieniem
-        ensure_password_store_for_user(
-            user_id=user_id,
-            conn=conn,
-            config_path=config_path,
+        migration = migrate_user_entries( #nazwa tabeli w starym układzie zależy od loginu - przeniesienie przed zmianą
+            conn, engine, user_id, current_login, config_path=config_path, progress=progress
         )
-
-        safe_old_login = current_login.replace("]", "]]")
-        safe_new_login = target_login.replace("]", "]]")
-        old_table_name = f"dbo.[{safe_old_login} entries]"
-        new_table_name = f"dbo.[{safe_new_login} entries]"
-        new_table_plain = f"{target_login} entries"
-        escaped_old_for_rename = old_table_name.replace("'", "''")
-        escaped_new_for_rename = new_table_plain.replace("'", "''")
+        if migration is not None and migration.status != "done":
+            raise ValueError("Przenoszenie wpisów konta nie zostało zakończone. Spróbuj ponownie.")
 
         if login_changed:
             cur.execute(
                 "SELECT 1 FROM dbo.users WHERE login = ? AND users_id <> ?",
-                target_login,
-                user_id,
+                (target_login, user_id),
             )
             if cur.fetchone():
-                raise ValueError("Użytkownik o podanym loginie już istnieje.")
-
-            # sprawdź czy docelowa tabela już nie istnieje
-            cur.execute(
-                """
-                SELECT 1
-                FROM sys.tables t
-                JOIN sys.schemas s ON s.schema_id = t.schema_id
-                WHERE s.name = 'dbo' AND t.name = ?
-                """,
-                f"{target_login} entries",
-            )
-            if cur.fetchone():
-                raise ValueError(
-                    "Tabela haseł dla nowego loginu już istnieje. Wybierz inny login."
-                )
-
-            cur.execute(
-                f"EXEC sp_rename '{escaped_old_for_rename}', '{escaped_new_for_rename}', 'OBJECT'"
-            )
-
-        table_to_use = new_table_name if login_changed else old_table_name
+                raise ValueError("Użytkownik o podanym loginie już istnieje.") #wpisy są powiązane z user_id - zmiana loginu nie przenosi tabel
 
         if password_changed:
             normalized_new_pwd = new_password.strip()
-            cur.execute(
-                f"SELECT id, password FROM {table_to_use} WHERE user_id = ?",
-                user_id,
+            data_key, new_mfa_secret = _open_data_key( #konto bez klucza danych jest najpierw migrowane
+                cur, engine, user_id, old_password, row[4], stored_mfa_secret, progress=progress, upgrade=False
             )
-            rows = cur.fetchall()
-            for entry_row in rows:
-                encrypted_value = _extract_ascii_text(entry_row[1])
-                decrypted_value = decrypt_with_user_secret(
-                    encrypted_value, old_password
-                ).decode("utf-8")
-                new_encrypted = encrypt_with_user_secret(
-                    decrypted_value, normalized_new_pwd
-                ).encode("ascii")
-                cur.execute(
-                    f"""
-                    UPDATE {table_to_use}
-                    SET password = ?, updated_at = SYSUTCDATETIME()
-                    WHERE id = ? AND user_id = ?
-                    """,
-                    new_encrypted,
-                    int(entry_row[0]),
-                    user_id,
-                )
-
-            if stored_mfa_secret is not None:
-                decrypted_mfa_secret = decrypt_mfa_secret(
-                    _extract_ascii_text(stored_mfa_secret), old_password
-                )
-                new_mfa_secret = encrypt_mfa_secret(
-                    decrypted_mfa_secret, normalized_new_pwd
-                )
-            else:
-                new_mfa_secret = None
-
+            new_data_key = wrap_data_key(data_key, normalized_new_pwd) #jeden klucz zamiast wszystkich wpisów
             new_secured_pwd = hash_password(normalized_new_pwd)
         else:
             new_secured_pwd = _ensure_bytes(row[1])
             new_mfa_secret = stored_mfa_secret
+            new_data_key = _ensure_bytes(row[4]) if row[4] is not None else None
 
         cur.execute(
-            """
+            f"""
             UPDATE dbo.users
-            SET login = ?, secured_pwd = CAST(? AS varbinary(60)), mfa_secret = CAST(? AS varbinary(max)), updated_at = SYSUTCDATETIME()
+            SET login = ?, secured_pwd = {engine.binary_param}, mfa_secret = {engine.binary_param},
+                data_key = {engine.binary_param}, updated_at = SYSUTCDATETIME()
             WHERE users_id = ?
             """,
-            target_login,
-            new_secured_pwd,
-            new_mfa_secret,
-            user_id,
+            (target_login, new_secured_pwd, new_mfa_secret, new_data_key, user_id),
         )
 
         conn.commit()
         cur.close()
-        return target_login, password_changed, login_changed
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        disconnect(conn)
+    return target_login, password_changed, login_changed
 
 
 def ensure_user_mfa_state( # zarzadza stanem MFA uzytkownika
     user_id: int,
-    user_secret: str,
+    user_secret: SessionKeyRing | str | bytes,
     mfa_code: str | None = None,
     *,
     config_path: str = "config/db_config.json",
@@ -464,13 +630,14 @@ def ensure_user_mfa_state( # zarzadza stanem MFA uzytkownika
     """
 
     ensure_users_table(config_path=config_path)
-    conn = connect(config_path)
-    try:
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor()
-        cur.execute("USE [password_manager]")
+        engine.use_database(cur, "password_manager")
         cur.execute(
             "SELECT login, check_mfa, mfa_secret FROM dbo.users WHERE users_id = ?",
-            user_id,
+            (user_id,),
         )
         row = cur.fetchone()
         if row is None:
@@ -485,13 +652,12 @@ def ensure_user_mfa_state( # zarzadza stanem MFA uzytkownika
             new_secret = generate_mfa_secret()
             encrypted_secret = encrypt_mfa_secret(new_secret, user_secret)
             cur.execute(
-                """
+                f"""
                 UPDATE dbo.users
-                SET mfa_secret = CAST(? AS varbinary(max)), updated_at = SYSUTCDATETIME()
+                SET mfa_secret = {engine.binary_param}, updated_at = SYSUTCDATETIME()
                 WHERE users_id = ?
                 """,
-                encrypted_secret,
-                user_id,
+                (encrypted_secret, user_id),
             )
             conn.commit()
             uri = build_provisioning_uri(login, new_secret)
@@ -521,7 +687,7 @@ def ensure_user_mfa_state( # zarzadza stanem MFA uzytkownika
                 SET check_mfa = 0, mfa_secret = NULL, updated_at = SYSUTCDATETIME()
                 WHERE users_id = ?
                 """,
-                user_id,
+                (user_id,),
             )
             conn.commit()
             return True, "[+] Wyłączono MFA dla konta."
@@ -532,16 +698,14 @@ def ensure_user_mfa_state( # zarzadza stanem MFA uzytkownika
             SET check_mfa = 1, updated_at = SYSUTCDATETIME()
             WHERE users_id = ?
             """,
-            user_id,
+            (user_id,),
         )
         conn.commit()
         return True, "[+] Włączono MFA dla konta."
-    finally:
-        disconnect(conn)
 
 
 def get_user_mfa_provisioning( # zwraca dane provisioning MFA
-    user_id: int, user_secret: str, *, config_path: str = "config/db_config.json"
+    user_id: int, user_secret: SessionKeyRing | str | bytes, *, config_path: str = "config/db_config.json"
 ) -> tuple[str, str, bool]:
     """
     Zwraca aktualny sekret MFA, URI provisioning oraz flagę aktywacji.
@@ -550,13 +714,14 @@ def get_user_mfa_provisioning( # zwraca dane provisioning MFA
     """
 
     ensure_users_table(config_path=config_path) #upewnij się, że tabela użytkowników istnieje
-    conn = connect(config_path) #nawiązanie połączenia z bazą danych
-    try: #logika pobierania sekretu MFA i URI provisioning
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    with pool.connection() as conn: #wypożyczenie połączenia z puli
         cur = conn.cursor() #utworzenie kursora do wykonywania zapytań SQL
-        cur.execute("USE [password_manager]") #przełączenie na odpowiednią bazę danych
+        engine.use_database(cur, "password_manager") #przełączenie na odpowiednią bazę danych
         cur.execute( 
             "SELECT login, check_mfa, mfa_secret FROM dbo.users WHERE users_id = ?",
-            user_id,
+            (user_id,),
         )
         row = cur.fetchone() #pobranie wyniku zapytania
         if row is None: 
@@ -570,13 +735,12 @@ def get_user_mfa_provisioning( # zwraca dane provisioning MFA
             secret = generate_mfa_secret() #generowanie sekretu MFA
             encrypted_secret = encrypt_mfa_secret(secret, user_secret) #szyfrowanie sekretu MFA
             cur.execute(
-                """
+                f"""
                 UPDATE dbo.users
-                SET mfa_secret = CAST(? AS varbinary(max)), updated_at = SYSUTCDATETIME()
+                SET mfa_secret = {engine.binary_param}, updated_at = SYSUTCDATETIME()
                 WHERE users_id = ?
                 """,
-                encrypted_secret,
-                user_id,
+                (encrypted_secret, user_id),
             )
             conn.commit() #zatwierdzenie zmian w bazie danych
         else: #jeżeli sekret istnieje to odszyfruj go
@@ -584,8 +748,4 @@ def get_user_mfa_provisioning( # zwraca dane provisioning MFA
 
         uri = build_provisioning_uri(login, secret) #budowanie URI provisioning
         return secret, uri, check_mfa #zwrócenie sekretu, URI i flagi aktywacji MFA
-    except Exception: #jeżeli wystąpi błąd to wycofaj zmiany
-        conn.rollback() #rozłączenie z bazą danych
-        raise #ponowne zgłoszenie wyjątku
-    finally: 
-        disconnect(conn) #rozłączenie z bazą danych
+
@@ -0,0 +1,234 @@
+"""Kopia zapasowa sejfu użytkownika - eksport do jednego pliku i odtwarzanie.
+Wpisy odczytywane są z bazy partiami (fetchmany), kompresowane (zlib) i zapisywane w ramkach szyfrowanych AES-EAX,
+więc eksport i odtwarzanie działają w stałej pamięci niezależnie od wielkości sejfu.
+
+Format pliku:
+- nagłówek: "PMVAULT1", długość i treść nagłówka JSON (wersja, data, losowa sól, klucz pliku opakowany kluczem danych użytkownika),
+- ramki: długość szyfrogramu, flagi, tag EAX i szyfrogram skompresowanej partii wpisów. Nonce ramki zawiera jej numer,
+  a nagłówek i flagi są danymi uwierzytelnianymi - zamiana, usunięcie lub przestawienie ramek jest wykrywane,
+- ramka końcowa (flaga LAST) z liczbą wpisów - brak ramki końcowej oznacza ucięty plik.
+Hasła pozostają w ramkach zaszyfrowane kluczem danych użytkownika (jak w dbo.entries), a klucz pliku da się odpakować
+tylko kluczem danych - kopię odtwarza więc to samo konto (również po zmianie hasła głównego).
+
+Zawiera funkcje kolejno:
+- export_vault: Zapisuje wszystkie wpisy użytkownika do pliku kopii.
+- restore_vault: Weryfikuje ramki pliku kopii i wstawia wpisy partiami w jednej transakcji.
+
+Dodatkowo używa funkcji z tablepassword_crud.py (odczyt strumieniowy i wstawianie partiami) oraz security/keyring.py.
+"""
+
+import base64 #importowanie modułu base64 do zapisu danych binarnych w JSON
+import binascii #importowanie modułu binascii do rozpoznania uszkodzonej soli w nagłówku
+import json #importowanie modułu json do serializacji nagłówka i partii wpisów
+import os #importowanie modułu os do atomowej podmiany pliku
+import secrets #importowanie modułu secrets do losowania klucza pliku i soli
+import struct #importowanie modułu struct do zapisu długości ramek
+import zlib #importowanie modułu zlib do kompresji partii wpisów
+from datetime import datetime, timezone #importowanie klas datetime i timezone z modułu datetime
+from pathlib import Path #importowanie modułu Path do obsługi ścieżek
+from typing import Callable, Iterator #importowanie typów Callable i Iterator z modułu typing
+
+from Crypto.Cipher import AES #importowanie klasy AES do szyfrowania ramek (EAX z danymi uwierzytelnianymi)
+
+from security.keyring import SessionKeyRing, session_key_ring #importowanie pęku kluczy sesji do opakowania klucza pliku
+from .db_connection import get_pool #importowanie puli połączeń z pliku db_connection.py
+from .tablepassword_creation import ensure_entries_table #importowanie funkcji ensure_entries_table z pliku tablepassword_creation.py
+from .tablepassword_crud import _count_entries, _iter_entry_chunks, add_password_entries #importowanie odczytu strumieniowego i wstawiania partiami
+
+BACKUP_MAGIC = b"PMVAULT1" #sygnatura pliku kopii
+BACKUP_VERSION = 1 #wersja formatu
+BACKUP_CHUNK_SIZE = 500 #liczba wpisów w jednej ramce
+_FLAG_LAST = 0x01 #ramka końcowa
+_LENGTH = struct.Struct(">I") #długość nagłówka
+_FRAME = struct.Struct(">IB") #długość szyfrogramu ramki i flagi
+_TAG_SIZE = 16 #długość tagu EAX
+_MAX_FRAME_SIZE = 64 * 1024 * 1024 #górny limit ramki przy odczycie (ochrona przed uszkodzonym plikiem)
+
+
+def _frame_cipher(file_key: bytes, salt: bytes, header: bytes, index: int, flags: int): #szyfr ramki o podanym numerze
+    cipher = AES.new(file_key, AES.MODE_EAX, nonce=salt + index.to_bytes(8, "big"))
+    cipher.update(header + bytes([flags])) #nagłówek i flagi uwierzytelniane razem z ramką
+    return cipher
+
+
+def _write_frame(out, file_key: bytes, salt: bytes, header: bytes, index: int, flags: int, payload: dict | list) -> None: #zapisuje jedną ramkę
+    cipher = _frame_cipher(file_key, salt, header, index, flags)
+    ciphertext, tag = cipher.encrypt_and_digest(zlib.compress(json.dumps(payload).encode("utf-8")))
+    out.write(_FRAME.pack(len(ciphertext), flags))
+    out.write(tag)
+    out.write(ciphertext)
+
+
+def _read_exact(stream, size: int) -> bytes: #odczyt dokładnie ``size`` bajtów
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Plik kopii jest ucięty lub uszkodzony.")
+    return data
+
+
+def _datetime_text(value) -> str | None: #zapis daty w ramce
+    if value is None:
+        return None
+    return value.isoformat(" ", timespec="seconds") if isinstance(value, datetime) else str(value)
+
+
+def export_vault( #zapisuje wszystkie wpisy użytkownika do pliku kopii
+    user_id: int,
+    user_secret: SessionKeyRing | bytes,
+    out_path: str | os.PathLike,
+    *,
+    chunk_size: int = BACKUP_CHUNK_SIZE,
+    progress: Callable[[float], None] | None = None,
+    config_path: str = "config/db_config.json",
+) -> int:
+    """Eksportuje sejf do ``out_path`` i zwraca liczbę wpisów.
+
+    Plik zapisywany jest obok docelowego i podmieniany dopiero po zapisaniu
+    ramki końcowej, więc przerwany eksport nie nadpisuje poprzedniej kopii.
+    """
+    ensure_entries_table(config_path=config_path) #upewnij się, że tabela haseł istnieje (raz na proces)
+
+    file_key = secrets.token_bytes(32)
+    salt = secrets.token_bytes(8) #nonce ramki = sól (8 B) + numer ramki (8 B)
+    header = json.dumps(
+        {
+            "version": BACKUP_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "salt": base64.b64encode(salt).decode("ascii"),
+            "file_key": session_key_ring(user_secret).encrypt(file_key), #klucz pliku opakowany kluczem danych
+        },
+        sort_keys=True,
+    ).encode("utf-8")
+
+    target = Path(out_path)
+    partial = target.with_name(target.name + ".partial")
+    exported = 0
+    pool = get_pool(config_path)
+    engine = pool.engine #silnik składowania dla bieżącej konfiguracji
+    try:
+        with pool.connection() as conn, open(partial, "wb") as out: #wypożyczenie połączenia z puli
+            cur = conn.cursor()
+            engine.use_database(cur, "password_manager")
+            total = _count_entries(cur, user_id)
+            out.write(BACKUP_MAGIC)
+            out.write(_LENGTH.pack(len(header)))
+            out.write(header)
+            index = 0
+            for chunk in _iter_entry_chunks(cur, user_id, max(1, chunk_size)):
+                payload = [
+                    [service, account_login, base64.b64encode(password).decode("ascii"),
+                     _datetime_text(created_at), _datetime_text(expire_date)]
+                    for _, service, account_login, password, created_at, expire_date in chunk
+                ]
+                _write_frame(out, file_key, salt, header, index, 0, payload)
+                index += 1
+                exported += len(chunk)
+                if progress is not None and total:
+                    progress(min(exported / total, 1.0))
+            _write_frame(out, file_key, salt, header, index, _FLAG_LAST, {"entries": exported}) #ramka końcowa
+            cur.close()
+        os.replace(partial, target) #atomowa podmiana pliku kopii
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    if progress is not None:
+        progress(1.0)
+    return exported
+
+
+def _read_entries( #weryfikuje kolejne ramki i zwraca wpisy do wstawienia
+    stream,
+    user_secret: SessionKeyRing | bytes,
+    total_bytes: int,
+    progress: Callable[[float], None] | None,
+) -> Iterator[tuple[str, str, bytes, datetime | None, datetime | None]]:
+    if _read_exact(stream, len(BACKUP_MAGIC)) != BACKUP_MAGIC:
+        raise ValueError("Plik nie jest kopią sejfu menedżera haseł.")
+    (header_length,) = _LENGTH.unpack(_read_exact(stream, _LENGTH.size))
+    header = _read_exact(stream, min(header_length, _MAX_FRAME_SIZE))
+    try:
+        meta = json.loads(header)
+        version = meta.get("version")
+    except (AttributeError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("Nagłówek pliku kopii jest uszkodzony.") from exc
+    if version != BACKUP_VERSION:
+        raise ValueError(f"Nieobsługiwana wersja kopii: {version}.")
+    try:
+        salt = base64.b64decode(meta["salt"], validate=True)
+        wrapped_key = meta["file_key"]
+    except (KeyError, TypeError, binascii.Error) as exc:
+        raise ValueError("Nagłówek pliku kopii jest uszkodzony.") from exc
+    if len(salt) != 8 or not isinstance(wrapped_key, str): #nonce ramki = sól (8 B) + numer ramki (8 B)
+        raise ValueError("Nagłówek pliku kopii jest uszkodzony.")
+    try: #tylko odpakowanie klucza pliku zależy od konta
+        file_key = session_key_ring(user_secret).decrypt(wrapped_key)
+    except ValueError as exc:
+        raise ValueError("Kopia została utworzona dla innego konta (nie pasuje klucz danych).") from exc
+
+    index = 0
+    restored = 0
+    while True:
+        length, flags = _FRAME.unpack(_read_exact(stream, _FRAME.size))
+        if length > _MAX_FRAME_SIZE:
+            raise ValueError("Plik kopii jest uszkodzony (nieprawidłowa długość ramki).")
+        tag = _read_exact(stream, _TAG_SIZE)
+        ciphertext = _read_exact(stream, length)
+        try: #weryfikacja tagu przed użyciem zawartości ramki
+            payload = json.loads(zlib.decompress(
+                _frame_cipher(file_key, salt, header, index, flags).decrypt_and_verify(ciphertext, tag)
+            ))
+        except ValueError as exc:
+            raise ValueError(f"Ramka {index} pliku kopii nie przeszła weryfikacji.") from exc
+        index += 1
+
+        if flags & _FLAG_LAST:
+            if payload.get("entries") != restored:
+                raise ValueError("Liczba wpisów w kopii nie zgadza się z ramką końcową.")
+            if stream.read(1):
+                raise ValueError("Plik kopii zawiera dane za ramką końcową.")
+            return
+
+        for service, account_login, password, created_at, expire_date in payload:
+            yield (
+                service,
+                account_login,
+                base64.b64decode(password),
+                datetime.fromisoformat(expire_date) if expire_date else None,
+                datetime.fromisoformat(created_at) if created_at else None, #data utworzenia zachowana z kopii
+            )
+        restored += len(payload)
+        if progress is not None:
+            progress(min(stream.tell() / total_bytes, 1.0))
+
+
+def restore_vault( #odtwarza wpisy z pliku kopii
+    user_id: int,
+    user_secret: SessionKeyRing | bytes,
+    in_path: str | os.PathLike,
+    *,
+    progress: Callable[[float], None] | None = None,
+    config_path: str = "config/db_config.json",
+) -> int:
+    """Dodaje do sejfu wpisy z pliku kopii (z ich datami utworzenia) i zwraca ich liczbę.
+
+    Każda ramka jest weryfikowana przed wstawieniem jej wpisów; uszkodzona
+    ramka, ucięty plik lub niezgodna liczba wpisów wycofują całe odtwarzanie.
+    """
+    path = Path(in_path)
+    total_bytes = max(1, os.path.getsize(path))
+    with open(path, "rb") as stream:
+        new_ids = add_password_entries( #hasła są już zaszyfrowane kluczem danych - bez ponownego szyfrowania
+            user_id,
+            _read_entries(stream, user_secret, total_bytes, progress),
+            config_path=config_path,
+        )
+    if progress is not None:
+        progress(1.0)
+    return len(new_ids)
+
+
+__all__ = [
+    "BACKUP_CHUNK_SIZE",
+    "export_vault",
+    "restore_vault",
+]
@@ -0,0 +1,217 @@
+"""Sesja sejfu zalogowanego użytkownika. Przechowuje jedno dedykowane połączenie z puli,
+dzięki czemu każda operacja na wpisach to pojedyncze, statyczne zapytanie na dbo.entries - bez ponownego USE i sprawdzania schematu.
+
+Tworzona raz po poprawnym logowaniu (GUI: Backend.loginUser, CLI: main_cli.login_user) i zamykana przy wylogowaniu
+lub wygaśnięciu sesji - połączenie wraca wtedy do puli.
+
+Wpisy pobrane przez get (z zaszyfrowanym hasłem) trafiają do pamięci podręcznej sesji (entry_cache.py), więc ponowny
+podgląd, kopiowanie lub edycja wpisu nie odpytuje bazy. update i delete usuwają rekord wpisu, a close czyści pamięć.
+
+Zawiera klasę:
+- VaultSession: Repozytorium wpisów haseł użytkownika z metodami add, list, page, search, get, update, delete, watermark,
+  latest_version, changes_since oraz close.
+
+Korzysta z db_connection.py (pula połączeń), tablepassword_creation.py (jednorazowe zapewnienie tabeli dbo.entries),
+tablepassword_crud.py (wspólne zapytania SQL na wpisach) oraz entry_cache.py (pamięć podręczna wpisów).
+"""
+
+import threading #importowanie modułu threading do serializacji dostępu do połączenia
+
+from db.db_connection import get_pool #importowanie funkcji get_pool z pliku db_connection.py
+from db.entry_cache import EntryCache #importowanie pamięci podręcznej wpisów sesji
+from db.storage_engine import DB_DISCONNECT_ERRORS, DB_ERRORS #importowanie krotek wyjątków niezależnych od silnika
+from db.tablepassword_creation import ensure_entries_table #importowanie funkcji zapewniającej tabelę haseł
+from db.tablepassword_crud import ( #importowanie zapytań SQL współdzielonych z bezstanowymi funkcjami CRUD
+    _delete_entry,
+    _insert_entry,
+    ENTRY_CHANGES_LIMIT,
+    ENTRY_PAGE_SIZE,
+    ENTRY_SEARCH_LIMIT,
+    _select_entries,
+    _search_entries,
+    _select_changes,
+    _select_latest_version,
+    _select_entries_page,
+    _select_entry,
+    _update_entry,
+)
+
+
+class VaultSession: #sesja sejfu użytkownika z dedykowanym połączeniem
+    """Repozytorium wpisów haseł jednego użytkownika na czas sesji.
+
+    Połączenie jest wypożyczane z puli przy otwarciu i oddawane przy
+    :meth:`close`. Po zerwaniu połączenia zostaje ono odrzucone, a kolejna
+    operacja wypożycza nowe.
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        *,
+        db_name: str = "password_manager",
+        config_path: str = "config/db_config.json",
+    ) -> None:
+        ensure_entries_table(db_name=db_name, config_path=config_path) #jednorazowe zapewnienie tabeli haseł
+        self.user_id = user_id
+        self._db_name = db_name
+        self._pool = get_pool(config_path) #pula, z której pochodzi połączenie sesji
+        self._engine = self._pool.engine #silnik składowania puli
+        self._conn = None
+        self._lock = threading.RLock()
+        self._closed = False
+        self._cache = EntryCache() #rekordy wpisów z zaszyfrowanym hasłem (podgląd, kopiowanie, edycja bez zapytania)
+        with self._lock:
+            self._ensure_connection()
+
+    def _ensure_connection(self): #zwraca połączenie sesji, w razie potrzeby wypożyczając nowe
+        if self._closed:
+            raise RuntimeError("Sesja sejfu została zamknięta.")
+        if self._conn is None:
+            conn = self._pool.acquire()
+            try:
+                cur = conn.cursor()
+                self._engine.use_database(cur, self._db_name) #kontekst bazy ustawiany raz na połączenie
+                cur.close()
+                conn.commit()
+            except BaseException:
+                self._pool.release(conn, discard=True)
+                raise
+            self._conn = conn
+        return self._conn
+
+    def _run(self, operation, *, commit: bool = False): #wykonuje operację na kursorze sesji
+        with self._lock:
+            conn = self._ensure_connection()
+            cur = conn.cursor()
+            try:
+                result = operation(cur)
+                if commit:
+                    conn.commit()
+                return result
+            except DB_DISCONNECT_ERRORS: #zerwane połączenie - odrzuć je, następna operacja wypożyczy nowe
+                self._pool.release(conn, discard=True)
+                self._conn = None
+                raise
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                try:
+                    cur.close()
+                except DB_ERRORS:
+                    pass
+
+    def add(self, service: str, account_login: str, account_password: bytes, expire_date=None) -> int: #dodaje wpis
+        """Dodaje wpis i zwraca jego ID."""
+        return self._run(
+            lambda cur: _insert_entry(
+                cur, self.user_id, service, account_login, account_password, expire_date, engine=self._engine
+            ),
+            commit=True,
+        )
+
+    def list(self): #zwraca listę wpisów (id, service, login, created_at, expire_date)
+        """Zwraca listę wpisów użytkownika (id, service, login, created_at, expire_date)."""
+        return self._run(lambda cur: _select_entries(cur, self.user_id))
+
+    def page( #zwraca stronę listy wpisów
+        self,
+        *,
+        sort: str = "created_at",
+        descending: bool = True,
+        after: tuple | None = None,
+        page_size: int = ENTRY_PAGE_SIZE,
+    ):
+        """Zwraca :class:`~db.tablepassword_crud.EntryPage` - stronę wpisów i kursor następnej strony."""
+        return self._run(
+            lambda cur: _select_entries_page(
+                cur, self.user_id, sort=sort, descending=descending, after=after, limit=page_size, engine=self._engine
+            )
+        )
+
+    def search(self, prefix: str, limit: int = ENTRY_SEARCH_LIMIT): #wyszukuje wpisy po prefiksie serwisu lub loginu
+        """Zwraca wpisy (id, service, login, created_at, expire_date) zaczynające się od ``prefix``."""
+        prefix = prefix.strip()
+        if not prefix:
+            return []
+        return self._run(lambda cur: _search_entries(cur, self.user_id, prefix, limit, engine=self._engine))
+
+    def get(self, entry_id: int): #zwraca pojedynczy wpis z zaszyfrowanym hasłem
+        """Zwraca pojedynczy wpis wraz z zaszyfrowanym hasłem lub None (z pamięci podręcznej, jeśli jest ważny)."""
+        entry = self._cache.get(entry_id)
+        if entry is not None:
+            return entry
+        with self._lock: #odczyt i zapamiętanie razem - równoległa zmiana wpisu nie zostawi starego rekordu
+            entry = self._run(lambda cur: _select_entry(cur, self.user_id, entry_id))
+            if entry is not None:
+                self._cache.put(entry_id, entry)
+        return entry
+
+    def update( #aktualizuje wpis
+        self,
+        entry_id: int,
+        *,
+        new_service=None,
+        new_login=None,
+        new_password=None,
+        new_expire_date=None,
+    ) -> bool:
+        """Aktualizuje wpis; zwraca True, jeśli wiersz istniał."""
+        with self._lock:
+            try:
+                return self._run(
+                    lambda cur: _update_entry(
+                        cur, self.user_id, entry_id, new_service, new_login, new_password, new_expire_date
+                    ),
+                    commit=True,
+                )
+            finally:
+                self._cache.discard(entry_id) #rekord nieaktualny niezależnie od wyniku
+
+    def delete(self, entry_id: int) -> bool: #usuwa wpis
+        """Usuwa wpis; zwraca True, jeśli wiersz istniał."""
+        with self._lock:
+            try:
+                return self._run(
+                    lambda cur: _delete_entry(cur, self.user_id, entry_id),
+                    commit=True,
+                )
+            finally:
+                self._cache.discard(entry_id)
+
+    def watermark(self) -> int: #zwraca bieżący znacznik wersji wpisów
+        """Zwraca znacznik do :meth:`changes_since` - odczytany przed listą obejmuje wszystkie zmiany po niej."""
+        return self._run(self._engine.row_version_watermark)
+
+    def latest_version(self) -> int: #zwraca najwyższą wersję wpisów użytkownika
+        """Zwraca najwyższą wersję wpisu lub usunięcia - większa od znacznika oznacza zmiany do pobrania."""
+        return self._run(lambda cur: _select_latest_version(cur, self.user_id, engine=self._engine))
+
+    def changes_since(self, watermark: int, limit: int = ENTRY_CHANGES_LIMIT): #zwraca zmiany wpisów od znacznika
+        """Zwraca :class:`~db.tablepassword_crud.EntryChanges` i usuwa z pamięci podręcznej rekordy zmienionych wpisów."""
+        changes = self._run(lambda cur: _select_changes(cur, self.user_id, watermark, limit, engine=self._engine))
+        if changes.overflow:
+            self._cache.clear()
+        for entry_id in [entry[0] for entry in changes.entries] + changes.deleted_ids: #zmiany spoza tej sesji
+            self._cache.discard(entry_id)
+        return changes
+
+    def close(self) -> None: #kończy sesję i oddaje połączenie do puli
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            conn, self._conn = self._conn, None
+            self._cache.clear() #zaszyfrowane hasła nie zostają w pamięci po sesji
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __enter__(self) -> "VaultSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+__all__ = ["VaultSession"]
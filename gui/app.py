@@ -15,6 +15,7 @@ from gui.backend import Backend #importowanie klasy Backend z pliku gui/backend.
 def run_gui() -> None: #funkcja uruchamiająca aplikację GUI
     app = QGuiApplication(sys.argv) #utworzenie instancji aplikacji GUI
     backend = Backend() #utworzenie instancji backendu aplikacji
+    app.aboutToQuit.connect(backend.shutdown) #zakończenie zadań w tle i zamknięcie sejfu przed wyjściem
     engine = QQmlApplicationEngine() #utworzenie instancji silnika aplikacji QML
     icon_path = _resolve_resource(Path("gui") / "Icon.ico")
     if icon_path.exists():
@@ -22,6 +23,7 @@ def run_gui() -> None: #funkcja uruchamiająca aplikację GUI
     ctx = engine.rootContext() #pobranie kontekstu głównego silnika QML
     ctx.setContextProperty("backend", backend) #ustawienie właściwości kontekstu o nazwie "backend" na instancję backendu
     ctx.setContextProperty("passwordModel", backend.password_model) #ustawienie właściwości kontekstu o nazwie "passwordModel" na model haseł z backendu
+    ctx.setContextProperty("passwordFilter", backend.password_filter) #wyniki wyszukiwania na liście haseł
     ctx.setContextProperty(
         "appIconSource",
         QUrl.fromLocalFile(str(icon_path)) if icon_path.exists() else "",
@@ -1,15 +1,24 @@
 """backend.py - logika backendu GUI aplikacji Password Manager. w tym miejscu wykonywana jest większość operacji związanych z bazą danych i bezpieczeństwem. zawiera klasę Backend, która zarządza stanem aplikacji, sesją użytkownika oraz interakcjami z bazą danych.
 Zawiera funkcje i właściwości do:
-- Zarządzania sesją użytkownika (logowanie, wylogowywanie).
+- Zarządzania sesją użytkownika (logowanie, wylogowywanie, zakończenie zadań w tle przy zamykaniu aplikacji).
 - Obsługi widoków GUI (przełączanie między ekranami).
-- Zarządzania danymi haseł (dodawanie, edytowanie, usuwanie, kopiowanie do schowka).
+- Zarządzania danymi haseł (dodawanie, edytowanie, usuwanie, kopiowanie do schowka, import z pliku CSV).
+- Stronicowania i sortowania listy haseł (pierwsza strona po każdej zmianie, kolejne doczytywane przez fetchMore modelu przy przewijaniu).
+- Wyszukiwania w bazie wpisów spoza wczytanej części listy (uzupełnienie wyszukiwania rozmytego PasswordFilterModel).
+- Odświeżania listy zmianami od znacznika wersji (dodane, zmienione i usunięte wpisy) zamiast wczytywania jej od nowa.
+- Okresowego sprawdzania zmian z innych urządzeń (jedno zapytanie o najwyższą wersję, interwał podwajany przy braku zmian).
 
 To ona łącznie z klasą PasswordListModel z gui/models.py zarządza danymi wyświetlanymi w GUI.
 
+Operacje blokujące (zapytania do bazy, bcrypt, szyfrowanie) są uruchamiane w tle przez TaskRunner (gui/tasks.py); sloty tylko
+walidują dane i uruchamiają zadanie, a wynik jest stosowany w wątku GUI. Stan zajętości i postęp są dostępne w QML jako busy i progress.
+
 dodatkowo wykorzystuje funkcje z modułów db i security do operacji na bazie danych i bezpieczeństwie haseł. kolejno:
 - db_connection.py: do zarządzania połączeniami z bazą danych.
 - db_creation.py: do tworzenia bazy danych i tabel.
+- entries_import.py: do importu wpisów z plików CSV innych menedżerów haseł.
 - tablepassword_crud.py: do operacji CRUD na tabeli przechowywania haseł.
+- vault_session.py: do sesji sejfu trzymającej połączenie z bazą zalogowanego użytkownika.
 - tableusers_insertandverify.py: do zarządzania użytkownikami i weryfikacją.
 - security/encrypt.py: do szyfrowania i deszyfrowania danych.
 - security/hashing.py: do bezpiecznego haszowania haseł.
@@ -17,40 +26,45 @@ dodatkowo wykorzystuje funkcje z modułów db i security do operacji na bazie da
 - gui/models.py: do zarządzania modelami danych używanymi w GUI.
 - gui/constants.py: do stałych używanych w GUI.
 - gui/helpers.py: do pomocniczych funkcji wspierających logikę backendu.
+- gui/tasks.py: do wykonywania operacji na bazie danych i kryptografii poza wątkiem GUI.
 - config/settings.py: do zarządzania ustawieniami aplikacji, takimi jak klucz szyfrowania.
 """
 
+import random #importowanie modułu random do rozrzutu interwału sprawdzania zmian
 from pathlib import Path #importowanie modułu Path do obsługi ścieżek plików
 
-import pyodbc #importowanie modułu pyodbc do obsługi połączeń z bazą danych
 from PySide6.QtCore import ( #importowanie klas QObject, Property, Signal, Slot z modułu PySide6.QtCore
     QObject,
     Property,
     Signal,
     Slot,
     QTimer,
+    QUrl,
 )
 
 from config import settings #importowanie modułu settings z pakietu config
-from db.db_connection import format_server_with_port, split_server_and_port #importowanie funkcji format_server_with_port i split_server_and_port z pliku db_connection.py
+from db.db_connection import close_all_pools, format_server_with_port, split_server_and_port #importowanie zamykania pul oraz funkcji format_server_with_port i split_server_and_port z pliku db_connection.py
+from db.storage_engine import DB_ERRORS, DB_INTEGRITY_ERRORS #importowanie krotek wyjątków bazodanowych niezależnych od silnika
 from db.db_creation import ensure_database_exists #importowanie funkcji ensure_database_exists z pliku db_creation.py
+from db.entries_import import import_password_csv #importowanie importu wpisów z pliku CSV
+from db.vault_backup import export_vault, restore_vault #importowanie eksportu i odtwarzania kopii sejfu
 from db.tablepassword_crud import ( #importowanie funkcji CRUD z pliku tablepassword_crud.py
-    add_password_entry, #dodawanie wpisu z hasłem
+    ENTRY_SORT_KEYS, #dozwolone klucze sortowania listy
     copy_password_to_clipboard, #kopiowanie hasła do schowka
-    delete_password_entry, #usuwanie wpisu z hasłem
     decrypt_password, #odszyfrowywanie hasła
-    get_password_entry, #pobieranie wpisu z hasłem
-    list_password_entries, #listowanie wpisów z hasłami
-    update_password_entry, #aktualizowanie wpisu z hasłem
 )
 from db.tableusers_insertandverify import ( #importowanie funkcji zarządzających użytkownikami z pliku tableusers_insertandverify.py
+    complete_mfa_login, #drugi krok logowania z MFA (tylko kod TOTP)
     create_user, #tworzenie użytkownika
     ensure_user_mfa_state, #zapewnienie stanu MFA użytkownika
     get_user_mfa_provisioning, #pobieranie URI provisioning MFA użytkownika
     update_user_credentials, #aktualizowanie danych uwierzytelniających użytkownika
     verify_user, #weryfikacja użytkownika
 )
+from db.vault_session import VaultSession #importowanie sesji sejfu z pliku vault_session.py
 from gui.constants import ( #importowanie stałych z pliku constants.py
+    POLL_INTERVAL_MAX_MS,
+    POLL_INTERVAL_MIN_MS,
     VIEW_CLICK_TO_RUN, 
     VIEW_DATABASE_SETTINGS,
     VIEW_EDIT_USER_ACCOUNT,
@@ -59,28 +73,44 @@ from gui.constants import ( #importowanie stałych z pliku constants.py
     VIEW_PASSWORD_EDIT,
     VIEW_PASSWORDS_LIST,
 )
-from gui.helpers import build_password_rows, parse_expire #importowanie funkcji build_password_rows i parse_expire z pliku helpers.py
-from gui.models import PasswordListModel #importowanie klasy PasswordListModel z pliku models.py
-from security.encrypt import encrypt_with_user_secret #importowanie funkcji encrypt_with_user_secret z pliku encrypt.py
+from gui.helpers import build_password_row, build_password_rows, parse_expire #importowanie funkcji budujących wiersze listy i parse_expire z pliku helpers.py
+from gui.models import PasswordFilterModel, PasswordListModel #importowanie modeli listy haseł z pliku models.py
+from gui.tasks import TaskRunner #importowanie klasy TaskRunner z pliku tasks.py
+from security.keyring import SessionKeyRing #importowanie pęku kluczy sesji z pliku keyring.py
 from security.hashing import hash_password #importowanie funkcji hash_password z pliku hashing.py
 from security.password_generator import generate_password #importowanie funkcji generate_password z pliku password_generator.py
 
 
+def _load_first_page(vault: VaultSession, sort: str, descending: bool): #pierwsza strona listy i znacznik wersji (do wykonania w tle)
+    watermark = vault.watermark() #odczytany przed stroną - zmiany zatwierdzone w trakcie wrócą w _sync_passwords
+    return sort, descending, vault.page(sort=sort, descending=descending), watermark
+
+
 class Backend(QObject): #klasa Backend dziedzicząca po QObject
     statusMessageChanged = Signal(str) #sygnał zmiany komunikatu statusu
     currentViewChanged = Signal() #sygnał zmiany bieżącego widoku
     editContextChanged = Signal() #sygnał zmiany kontekstu edycji
     mfaSetupChanged = Signal() #sygnał zmiany ustawień MFA
+    busyChanged = Signal() #sygnał zmiany zajętości (zadanie w tle rozpoczęte/zakończone)
+    progressChanged = Signal() #sygnał zmiany postępu zadania w tle
+    sortChanged = Signal() #sygnał zmiany sortowania listy haseł
 
     def __init__(self) -> None: #konstruktor klasy Backend
         super().__init__() #wywołanie konstruktora klasy bazowej QObject
         self._status = "" #inicjalizacja zmiennej status jako pusty ciąg znaków
         self._ui_dir = Path(__file__).resolve().parent.parent / "ui" #ścieżka do katalogu ui
         self._current_view = (self._ui_dir / VIEW_CLICK_TO_RUN).as_uri() #ustawienie bieżącego widoku na widok początkowy
-        self.password_model = PasswordListModel() #utworzenie instancji modelu listy haseł
+        self.password_model = PasswordListModel(self._fetch_password_page) #model listy haseł doczytujący strony przez fetchMore
+        self.password_filter = PasswordFilterModel(self.password_model, self._search_passwords) #wyszukiwanie rozmyte nad listą haseł i w bazie
         self._user_id: int | None = None #inicjalizacja zmiennej user_id jako None
-        self._user_secret: str | None = None #inicjalizacja zmiennej user_secret jako None
+        self._keyring: SessionKeyRing | None = None #pęk kluczy sesji zalogowanego użytkownika (szyfrowanie wpisów i sekretu MFA)
         self._user_login: str | None = None #inicjalizacja zmiennej user_login jako None
+        self._vault: VaultSession | None = None #sesja sejfu (dedykowane połączenie) zalogowanego użytkownika
+        self._sort_key = "created_at" #klucz sortowania listy haseł
+        self._sort_descending = True #kierunek sortowania listy haseł
+        self._list_sort = (self._sort_key, self._sort_descending) #sortowanie listy wyświetlanej w modelu (dla kolejnych stron)
+        self._watermark: int | None = None #znacznik wersji wpisów z chwili wczytania listy (zmiany od niego - _sync_passwords)
+        self._seen_version: int | None = None #najwyższa wersja wpisów użytkownika zauważona przez sprawdzanie zmian
         self._edit_entry_id: int | None = None #inicjalizacja zmiennej edit_entry_id jako None
         self._edit_service = "" #inicjalizacja zmiennej edit_service jako pusty ciąg znaków
         self._edit_login = "" #inicjalizacja zmiennej edit_login jako pusty ciąg znaków
@@ -99,6 +129,15 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
         self._session_timer.setInterval(10 * 60 * 1000) #ustawienie interwału na 10 minut
         self._session_timer.setSingleShot(True) #timer jednorazowy
         self._session_timer.timeout.connect(self._handle_session_timeout) #po upływie czasu wywołuje funkcję wygaszającą sesję
+        self._session_token = 0 #numer sesji - wyniki zadań z zakończonej sesji są odrzucane
+        self._poll_interval = POLL_INTERVAL_MIN_MS #bieżący interwał sprawdzania zmian z innych urządzeń
+        self._poll_timer = QTimer(self) #timer sprawdzania zmian wpisów z innych urządzeń
+        self._poll_timer.setSingleShot(True) #kolejne sprawdzenie planowane po zakończeniu poprzedniego
+        self._poll_timer.timeout.connect(self._poll_changes)
+        self._pending_mfa: tuple[str, str, str] | None = None #(login, hasło, bilet pre-auth) oczekującego logowania z MFA
+        self._tasks = TaskRunner(self) #zadania w tle (baza danych, bcrypt, szyfrowanie)
+        self._tasks.busyChanged.connect(self.busyChanged)
+        self._tasks.progressChanged.connect(self.progressChanged)
 
 #Poniżej właściwości klasy Backend z dekoratorem Property do udostępniania danych do QML i powiązanymi sygnałami zmiany wartości. 
 
@@ -162,6 +201,26 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
     def mfaProvisioningUri(self) -> str: # zwraca URI provisioning MFA  
         return self._mfa_uri
 
+    @Property(str, notify=sortChanged)
+    def sortKey(self) -> str: # zwraca klucz sortowania listy hasel
+        return self._sort_key
+
+    @Property(bool, notify=sortChanged)
+    def sortDescending(self) -> bool: # zwraca czy lista hasel jest sortowana malejaco
+        return self._sort_descending
+
+    @Property(bool, notify=busyChanged)
+    def busy(self) -> bool: # zwraca czy trwa operacja w tle
+        return self._tasks.busy
+
+    @Property(float, notify=progressChanged)
+    def progress(self) -> float: # zwraca postep operacji w tle (0.0-1.0, -1 gdy nieokreslony)
+        return self._tasks.progress
+
+    @Slot(str, result=bool)
+    def isActionBusy(self, action: str) -> bool: # zwraca czy trwa operacja o podanej nazwie
+        return self._tasks.is_running(action)
+
     def _set_status(self, message: str) -> None: # ustawia komunikat statusu
         self._status = message
         self.statusMessageChanged.emit(message)
@@ -172,6 +231,45 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
             self._current_view = path
             self.currentViewChanged.emit()
 
+    def _start_task( #uruchamia blokującą pracę w tle i stosuje wynik w wątku GUI
+        self,
+        action: str,
+        work,
+        on_success,
+        error_label: str,
+        *,
+        on_error=None,
+        session_bound: bool = True,
+        with_progress: bool = False,
+        background: bool = False,
+    ) -> bool:
+        token = self._session_token
+
+        def _success(result) -> None:
+            if session_bound and token != self._session_token: #sesja zakończyła się w trakcie - wynik nieaktualny
+                return
+            on_success(result)
+
+        def _failure(exc: Exception) -> None:
+            if session_bound and token != self._session_token:
+                return
+            if on_error is not None and on_error(exc): #wyjątek obsłużony przez wywołującego
+                return
+            if isinstance(exc, ValueError): #błędy walidacji mają gotowy komunikat
+                self._set_status(f"[!] {exc}")
+            else:
+                self._set_status(f"[!] {error_label}: {exc}")
+
+        return self._tasks.submit( #False - ta sama akcja już trwa
+            action, work, _success, _failure, with_progress=with_progress, background=background
+        )
+
+    def _decrypt_failed(self, exc: Exception) -> bool: #błąd odszyfrowania (inny niż błąd bazy danych)
+        if isinstance(exc, DB_ERRORS):
+            return False
+        self._set_status(f"[!] Nie udało się odszyfrować hasła: {exc}")
+        return True
+
     def _handle_session_timeout(self) -> None: #obsługa wygaśnięcia sesji po upływie czasu
         if self._user_id is None: #jeżeli nie ma aktywnej sesji to nic nie rób
             return
@@ -188,7 +286,7 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
         self._clear_mfa_setup()
 
     def _require_session(self) -> bool: #sprawdzenie czy istnieje aktywna sesja użytkownika
-        if self._user_id is None or self._user_secret is None: #jeżeli nie to zwróć False i ustaw komunikat statusu
+        if self._user_id is None or self._keyring is None or self._vault is None: #jeżeli nie to zwróć False i ustaw komunikat statusu
             self._set_status("[!] Brak aktywnej sesji użytkownika.") 
             return False
         return True
@@ -197,12 +295,165 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
     def _refresh_passwords(self) -> None: #odświeżenie listy haseł użytkownika
         if not self._require_session(): # jeżeli nie ma aktywnej sesji to zakończ funkcję
             return
-        try: #pobranie listy wpisów z hasłami dla zalogowanego użytkownika
-            entries = list_password_entries(user_id=self._user_id) #lista wpisów z hasłami
-        except pyodbc.Error as exc:  #komunikat o błędzie w czasie wykonywania
-            self._set_status(f"[!] Błąd podczas pobierania haseł: {exc}") # ustawienie komunikatu statusu z informacją o błędzie
+        def done(loaded) -> None:
+            if loaded[:2] != (self._sort_key, self._sort_descending): #sortowanie zmieniło się w trakcie - wczytaj ponownie
+                self._refresh_passwords()
+                return
+            self._apply_entries(loaded)
+
+        self._start_task( #pobranie pierwszej strony wpisów z sesji sejfu w tle
+            "refresh", self._first_page_loader(), done, "Błąd podczas pobierania haseł"
+        )
+
+    def _first_page_loader(self): #zwraca funkcję wczytującą pierwszą stronę listy w bieżącym sortowaniu (do wykonania w tle)
+        vault, sort, descending = self._vault, self._sort_key, self._sort_descending
+        return lambda: _load_first_page(vault, sort, descending)
+
+    def _apply_entries(self, loaded) -> None: #ustawienie pierwszej strony wpisów w modelu listy haseł
+        sort, descending, page, watermark = loaded
+        self._list_sort = (sort, descending)
+        self._watermark = watermark
+        if self._seen_version is None or self._seen_version < watermark:
+            self._seen_version = watermark
+        self.password_model.set_entries(build_password_rows(page.entries), page.next_cursor, (sort, descending))
+
+    def _is_fresh_row(self, row) -> bool: #czy wiersz ze zmian różni się od wyświetlanego (albo nie jest wczytany)
+        index = self.password_model.row_of(row.entry_id)
+        if index is None:
+            return True
+        current = self.password_model.entry_at(index)
+        return (current.service, current.login, current.expire_date, current.expired) != (
+            row.service, row.login, row.expire_date, row.expired
+        )
+
+    def _sync_passwords(self, on_synced=None) -> None: #zastosowanie zmian wpisów od wczytania listy (bez resetu modelu)
+        notify = on_synced or (lambda fresh: None) #otrzymuje True, gdy zmiany zmieniły wyświetlaną listę
+        if not self._require_session():
+            return
+        if self._watermark is None: #lista nie została jeszcze wczytana
+            self._refresh_passwords()
+            notify(True)
+            return
+        vault, watermark = self._vault, self._watermark
+
+        def work():
+            return vault.changes_since(watermark)
+
+        def done(changes) -> None:
+            if self._watermark != watermark: #lista wczytana w międzyczasie od nowa - zawiera te zmiany
+                notify(False)
+                return
+            if changes.overflow: #zbyt wiele zmian - pierwsza strona od nowa
+                self._refresh_passwords()
+                notify(True)
+                return
+            rows = build_password_rows(changes.entries)
+            fresh = any(self._is_fresh_row(row) for row in rows) or any(
+                self.password_model.row_of(entry_id) is not None for entry_id in changes.deleted_ids
+            ) #np. własne zapisy lub wiersze powyżej znacznika przy otwartej transakcji w bazie (MSSQL)
+            for row in rows: #wstawienie lub zmiana pojedynczych wierszy
+                self.password_model.update_entry(row)
+                self.password_filter.update_entry(row)
+            for entry_id in changes.deleted_ids:
+                self.password_model.remove_entry(entry_id)
+                self.password_filter.remove_entry(entry_id)
+            self._watermark = changes.watermark
+            notify(fresh)
+
+        def failed(exc: Exception) -> bool:
+            notify(False)
+            return on_synced is not None #sprawdzanie zmian w tle - bez komunikatu
+
+        if not self._start_task("sync", work, done, "Błąd podczas odświeżania haseł", on_error=failed, background=True):
+            notify(False) #synchronizacja już trwa
+
+    def _restart_polling(self) -> None: #sprawdzanie zmian od najkrótszego interwału (logowanie, powrót do listy)
+        self._poll_interval = POLL_INTERVAL_MIN_MS
+        self._schedule_poll()
+
+    def _schedule_poll(self) -> None: #planuje kolejne sprawdzenie zmian
+        if self._vault is None:
+            return
+        self._poll_timer.start(int(self._poll_interval * random.uniform(0.9, 1.1))) #rozrzut - klienci nie pytają serwera jednocześnie
+
+    def _poll_changes(self) -> None: #sprawdzenie, czy wpisy zmieniły się na innym urządzeniu
+        if self._vault is None:
+            return
+        if self._watermark is None: #lista jeszcze nie wczytana
+            self._schedule_poll()
+            return
+        vault = self._vault
+
+        def synced(fresh: bool) -> None: #interwał od początku tylko, gdy zmiany były nowe dla tej listy
+            self._poll_interval = POLL_INTERVAL_MIN_MS if fresh else min(self._poll_interval * 2, POLL_INTERVAL_MAX_MS)
+            self._schedule_poll()
+
+        def done(version: int) -> None:
+            # porównanie z ostatnio zauważoną wersją, nie ze znacznikiem listy - w MSSQL znacznik (MIN_ACTIVE_ROWVERSION)
+            # pozostaje poniżej zatwierdzonych wierszy, dopóki w bazie trwa dowolna transakcja
+            if self._seen_version is None or version > self._seen_version: #nowa wersja - pobranie tylko zmian
+                self._seen_version = version
+                self._sync_passwords(synced)
+                return
+            self._poll_interval = min(self._poll_interval * 2, POLL_INTERVAL_MAX_MS) #brak zmian - rzadsze sprawdzanie
+            self._schedule_poll()
+
+        def failed(exc: Exception) -> bool: #bez komunikatu - ponowna próba po dłuższym czasie
+            self._poll_interval = min(self._poll_interval * 2, POLL_INTERVAL_MAX_MS)
+            self._schedule_poll()
+            return True
+
+        if not self._start_task("poll", vault.latest_version, done, "Błąd sprawdzania zmian", on_error=failed, background=True):
+            self._schedule_poll()
+
+    def _fetch_password_page(self, cursor: tuple, generation: int) -> None: #fetchMore modelu - wczytanie strony za kursorem w tle
+        model = self.password_model
+        if self._vault is None:
+            model.fetch_failed(generation)
             return
-        self.password_model.set_entries(build_password_rows(entries)) #ustawienie wpisów w modelu listy haseł
+        vault, (sort, descending) = self._vault, self._list_sort
+
+        def work():
+            return vault.page(sort=sort, descending=descending, after=cursor)
+
+        def done(page) -> None:
+            model.append_page(generation, build_password_rows(page.entries), page.next_cursor)
+
+        def failed(exc: Exception) -> bool:
+            model.fetch_failed(generation)
+            return False #komunikat błędu jak dla pozostałych zadań
+
+        if not self._start_task("load_more", work, done, "Błąd podczas pobierania haseł", on_error=failed):
+            model.fetch_failed(generation)
+
+    def _search_passwords(self, query: str) -> None: #wyszukanie zapytania w bazie (w tle) - trafienia spoza wczytanej części listy
+        if self._vault is None:
+            return
+        vault = self._vault
+
+        def work():
+            return vault.search(query)
+
+        def done(entries) -> None:
+            self.password_filter.add_remote_matches(query, build_password_rows(entries))
+            current = self.password_filter.query
+            if current and current != query: #zapytanie zmieniło się w trakcie - wyszukanie aktualnego
+                self._search_passwords(current)
+
+        self._start_task("search", work, done, "Błąd wyszukiwania haseł") #False - trwa wyszukiwanie, aktualne zapytanie sprawdzi done
+
+    @Slot(str)
+    def sortPasswords(self, key: str) -> None: # sortuje liste hasel, ponowny wybor tej samej kolumny odwraca kierunek
+        if key not in ENTRY_SORT_KEYS:
+            return
+        if key == self._sort_key:
+            self._sort_descending = not self._sort_descending
+        else:
+            self._sort_key = key
+            self._sort_descending = key == "created_at" #najnowsze wpisy na górze, pozostałe kolumny rosnąco
+        self.sortChanged.emit()
+        if self._vault is not None:
+            self._refresh_passwords()
 
     def _prepare_edit_context( #przygotowanie kontekstu edycji hasła
         self,
@@ -220,17 +471,6 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
         self._edit_expire = expire
         self.editContextChanged.emit()
 
-    def _fetch_entry(self, entry_id: int, not_found_message: str, error_label: str): #pobranie wpisu z hasłem
-        try:
-            entry = get_password_entry(user_id=self._user_id, entry_id=entry_id)
-        except pyodbc.Error as exc:  # komunikat o błędzie w czasie wykonywania
-            self._set_status(f"[!] {error_label}: {exc}") #ustawienie komunikatu statusu z informacją o błędzie
-            return None #zwrócenie None w przypadku błędu
-        if entry is None: #jeżeli wpis nie został znaleziony
-            self._set_status(not_found_message) #ustawienie komunikatu statusu z informacją o braku wpisu
-            return None #zwrócenie None
-        return entry #zwrócenie wpisu
-
     @Slot(str) #slot do wyświetlania komunikatu
     def showMessage(self, message: str) -> None: #wyświetlenie komunikatu
         self._set_status(message) #ustawienie komunikatu statusu
@@ -243,12 +483,38 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
         if not login or not password: #jeżeli login lub hasło są puste
             self._set_status("[!] Podaj login i hasło.") #ustawienie komunikatu statusu z informacją o braku loginu lub hasła
             return #zakończenie funkcji
-        try: #próba weryfikacji użytkownika
-            result = verify_user(login=login, password=password, mfa_code=mfa_code) #wynik weryfikacji użytkownika
-        except pyodbc.Error as exc:  # komunikat o błędzie w czasie wykonywania
-            self._set_status(f"[!] Błąd logowania: {exc}") #ustawienie komunikatu statusu z informacją o błędzie logowania
-            return
+        pending = self._pending_mfa #bilet z poprzedniego kroku, jeśli hasło zostało już sprawdzone
+        ticket = pending[2] if pending is not None and mfa_code and pending[:2] == (login, password) else None
+        sort, descending = self._sort_key, self._sort_descending
+        def work(report): #weryfikacja (bcrypt lub sam kod TOTP) i otwarcie sesji sejfu w tle
+            result = None
+            if ticket is not None: #drugi krok - bez ponownego bcrypt
+                result = complete_mfa_login(ticket, mfa_code)
+            if result is None or result.status == "expired": #brak lub wygasły bilet - pełna weryfikacja
+                result = verify_user( #wynik weryfikacji użytkownika (postęp tylko przy migracji sejfu)
+                    login=login, password=password, mfa_code=mfa_code, progress=report
+                )
+            if result.status != "ok" or result.user_id is None or result.login is None:
+                return result, None, []
+            vault = VaultSession(result.user_id) #jedno połączenie i nazwa tabeli na cały czas logowania
+            try:
+                entries = _load_first_page(vault, sort, descending) #pierwsza strona listy haseł w tym samym zadaniu
+            except Exception:
+                vault.close()
+                raise
+            return result, vault, entries
+
+        self._start_task(
+            "login",
+            work,
+            lambda payload: self._finish_login(login, password, *payload),
+            "Błąd logowania",
+            session_bound=False,
+            with_progress=True,
+        )
 
+    def _finish_login(self, login: str, password: str, result, vault, entries) -> None: #zastosowanie wyniku logowania w wątku GUI
+        self._pending_mfa = (login, password, result.ticket) if result.ticket else None #bilet zachowywany tylko do kolejnej próby kodu
         if result.status == "locked": #jeżeli konto jest zablokowane
             self._set_status(
                 "[!] Konto jest zablokowane. Skontaktuj się z administratorem."
@@ -260,16 +526,23 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
         if result.status == "mfa_invalid": #jeżeli kod MFA jest nieprawidłowy
             self._set_status("[!] Nieprawidłowy kod MFA.") #ustawienie komunikatu statusu z informacją o nieprawidłowym kodzie MFA
             return
-        if result.status != "ok" or result.user_id is None or result.login is None: #jeżeli weryfikacja nie powiodła się
+        if result.status == "migration_pending": #przenoszenie wpisów ze starego układu nie powiodło się
+            self._set_status("[!] Przenoszenie wpisów konta nie zostało zakończone. Zaloguj się ponownie lub skontaktuj się z administratorem.")
+            return
+        if vault is None: #jeżeli weryfikacja nie powiodła się
             self._set_status("[!] Nieprawidłowy login lub hasło.") #ustawienie komunikatu statusu z informacją o nieprawidłowym loginie lub haśle
             return
 
+        self._close_vault() #zamknięcie ewentualnej poprzedniej sesji sejfu
+        self._session_token += 1 #nowa sesja - wyniki zadań poprzedniej są odrzucane
+        self._vault = vault
         self._user_id, self._user_login = result.user_id, result.login #ustawienie identyfikatora użytkownika i loginu
-        self._user_secret = password #ustawienie sekretu użytkownika jako hasła
+        self._keyring = SessionKeyRing(result.data_key) #klucz szyfrowania wyprowadzany raz na sesję z klucza danych
         self._clear_mfa_setup() #wyczyszczenie ustawień MFA
         self._set_status(f"[+] Zalogowano jako {self._user_login}.") #ustawienie komunikatu statusu z informacją o zalogowaniu
         self._session_timer.start() #uruchomienie timera sesji po zalogowaniu
-        self._refresh_passwords() #odświeżenie listy haseł użytkownika
+        self._restart_polling() #sprawdzanie zmian z innych urządzeń
+        self._apply_entries(entries) #lista haseł wczytana razem z logowaniem
         self.editContextChanged.emit() #emitowanie sygnału zmiany kontekstu edycji
         self._set_view(VIEW_PASSWORDS_LIST) #ustawienie widoku na listę haseł
 
@@ -298,33 +571,66 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
                 return
         else:
             self._pending_short_password = None #wyzerowanie zmiennej pending_short_password
-        try: 
+        def work(): #haszowanie bcrypt i zapis użytkownika w tle
             hashed_password = hash_password(password) #zahashowanie hasła
             create_user(login=login, secured_pwd=hashed_password) #utworzenie użytkownika w bazie danych
-        except FileNotFoundError: #jeżeli plik z kluczem aplikacji nie został znaleziony
+
+        self._start_task(
+            "register",
+            work,
+            lambda _: self._set_status("[+] Użytkownik został zarejestrowany. Możesz się zalogować."), #komunikat o pomyślnej rejestracji
+            "Błąd podczas rejestracji",
+            on_error=self._register_failed,
+            session_bound=False,
+        )
+
+    def _register_failed(self, exc: Exception) -> bool: #komunikaty błędów rejestracji
+        if isinstance(exc, FileNotFoundError): #jeżeli plik z kluczem aplikacji nie został znaleziony
             self._set_status("[!] Brak klucza aplikacji w config/key.json.") #ustawienie komunikatu statusu z informacją o braku klucza aplikacji
-            return #zakończenie funkcji
-        except pyodbc.IntegrityError: #jeżeli wystąpi błąd integralności bazy danych
+            return True
+        if isinstance(exc, DB_INTEGRITY_ERRORS): #jeżeli wystąpi błąd integralności bazy danych
             self._set_status("[!] Użytkownik o podanym loginie już istnieje.") #ustawienie komunikatu statusu z informacją o istnieniu użytkownika
-            return
-        except pyodbc.Error as exc:  # komunikat o błędzie w czasie wykonywania
-            self._set_status(f"[!] Błąd podczas rejestracji: {exc}") #ustawienie komunikatu statusu z informacją o błędzie rejestracji
-            return #zakończenie funkcji
+            return True
+        return False
 
-        self._set_status("[+] Użytkownik został zarejestrowany. Możesz się zalogować.") #ustawienie komunikatu statusu z informacją o pomyślnej rejestracji
+    def _close_vault(self) -> None: #zamknięcie sesji sejfu i oddanie połączenia do puli
+        vault, self._vault = self._vault, None
+        if vault is not None:
+            vault.close()
 
     @Slot() #slot do wylogowania użytkownika
     def logout(self) -> None: #wylogowanie użytkownika
         self._session_timer.stop() #zatrzymanie timera sesji
+        self._poll_timer.stop() #zatrzymanie sprawdzania zmian
+        self._session_token += 1 #wyniki zadań w toku dotyczą już zakończonej sesji
+        self._pending_mfa = None #porzucenie oczekującego logowania z MFA
+        self._close_vault() #zamknięcie sesji sejfu
         self._user_id = None #wyzerowanie identyfikatora użytkownika
-        self._user_secret = None #wyzerowanie sekretu użytkownika
+        if self._keyring is not None: #usunięcie klucza szyfrowania (zadania w toku nie mogą już go użyć)
+            self._keyring.clear()
+        self._keyring = None
         self._user_login = None #wyzerowanie loginu użytkownika
-        self.password_model.set_entries([]) #wyczyszczenie wpisów w modelu listy haseł
+        self._watermark = None #wyzerowanie znacznika wersji listy
+        self._seen_version = None
+        self.password_model.set_entries([]) #wyczyszczenie wpisów w modelu listy haseł (bez kursora kolejnych stron)
+        self.password_filter.setQuery("") #wyczyszczenie wyszukiwania
         self._prepare_edit_context() #wyzerowanie kontekstu edycji
         self.editContextChanged.emit() #emitowanie sygnału zmiany kontekstu edycji
         self._clear_mfa_setup() #wyczyszczenie ustawień MFA
         self._set_view(VIEW_LOGIN) #ustawienie widoku na ekran logowania
 
+    @Slot() #slot wywoływany przy zamykaniu aplikacji (QGuiApplication.aboutToQuit)
+    def shutdown(self) -> None: #zakończenie zadań w tle i zamknięcie połączeń przed wyjściem
+        self._session_timer.stop() #zatrzymanie timerów - żadne nowe zadanie nie zostanie uruchomione
+        self._poll_timer.stop()
+        self._session_token += 1 #wyniki zadań w toku nie są już stosowane
+        self._tasks.wait_for_done() #import, odtwarzanie, synchronizacja i sprawdzanie zmian używają połączenia sejfu
+        self._close_vault() #połączenie wraca do puli dopiero po zakończeniu zadań
+        if self._keyring is not None: #usunięcie klucza szyfrowania z pamięci
+            self._keyring.clear()
+        self._keyring = None
+        close_all_pools() #zamknięcie połączeń z bazą danych
+
     @Slot() #slot do otwarcia ustawień bazy danych
     def openDatabaseSettings(self) -> None: #otwarcie ustawień bazy danych
         self._set_status("") #wyzerowanie komunikatu statusu
@@ -390,8 +696,7 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
                 "password": password,
             }
         )
-        try: #próba nawiązania połączenia z bazą danych i utworzenia bazy danych jeżeli nie istnieje
-            created = ensure_database_exists(db_name=payload["database"], config=payload) #sprawdzenie i utworzenie bazy danych
+        def done(created: bool) -> None:
             if warning: #jeżeli wystąpiło ostrzeżenie
                 self._set_status(warning) #ustawienie komunikatu statusu z ostrzeżeniem
             elif created: #jeżeli baza danych została utworzona
@@ -400,8 +705,20 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
                 )
             else:
                 self._set_status("[+] Połączenie z bazą powiodło się.")
-        except Exception as exc:  # bład w czasie wykonywania
+
+        def failed(exc: Exception) -> bool:  # bład w czasie wykonywania
             self._set_status(f"[!] Błąd połączenia z bazą: {exc}") #ustawienie komunikatu statusu z informacją o błędzie połączenia
+            return True
+
+        self._set_status("[i] Testowanie połączenia z bazą...")
+        self._start_task( #próba nawiązania połączenia z bazą danych i utworzenia bazy danych jeżeli nie istnieje (w tle - timeout połączenia)
+            "test_database",
+            lambda: ensure_database_exists(db_name=payload["database"], config=payload), #sprawdzenie i utworzenie bazy danych
+            done,
+            "Błąd połączenia z bazą",
+            on_error=failed,
+            session_bound=False,
+        )
 
     @Slot() #slot do otwarcia ustawień klucza aplikacji
     def openKeySettings(self) -> None: #otwarcie ustawień klucza aplikacji
@@ -442,7 +759,8 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
     @Slot()
     def backToPasswords(self) -> None: # wraca do listy hasel
         if self._user_id:
-            self._refresh_passwords()
+            self._sync_passwords() #tylko zmiany od wczytania listy
+            self._restart_polling()
         self._set_view(VIEW_PASSWORDS_LIST)
 
     @Slot()
@@ -463,81 +781,112 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
     def startEditPassword(self, entry_id: int) -> None: # przygotowuje edycje hasla
         if not self._require_session():
             return
-        entry = self._fetch_entry(
-            entry_id, "[!] Nie znaleziono wpisu do edycji.", "Błąd pobierania wpisu"
-        )
-        if entry is None:
-            return
-        _, service, login, encrypted_password, _, expire_date = entry
-        try:
-            decrypted = decrypt_password(encrypted_password, self._user_secret)
-        except Exception:  # pragma: no cover - runtime message
-            decrypted = ""
-        expire_str = expire_date.strftime("%Y-%m-%d") if expire_date else ""
-        self._prepare_edit_context(
-            entry_id=entry_id,
-            service=service or "",
-            login=login or "",
-            password=decrypted,
-            expire=expire_str,
-        )
-        self._set_view(VIEW_PASSWORD_EDIT)
+        vault, secret = self._vault, self._keyring
+
+        def work():
+            entry = vault.get(entry_id)
+            if entry is None:
+                return None
+            _, service, login, encrypted_password, _, expire_date = entry
+            try:
+                decrypted = decrypt_password(encrypted_password, secret)
+            except Exception:  # pragma: no cover - runtime message
+                decrypted = ""
+            return service, login, decrypted, expire_date
+
+        def done(payload) -> None:
+            if payload is None:
+                self._set_status("[!] Nie znaleziono wpisu do edycji.")
+                return
+            service, login, decrypted, expire_date = payload
+            expire_str = expire_date.strftime("%Y-%m-%d") if expire_date else ""
+            self._prepare_edit_context(
+                entry_id=entry_id,
+                service=service or "",
+                login=login or "",
+                password=decrypted,
+                expire=expire_str,
+            )
+            self._set_view(VIEW_PASSWORD_EDIT)
+
+        self._start_task(f"edit:{entry_id}", work, done, "Błąd pobierania wpisu")
 
     @Slot(int)
     def deletePassword(self, entry_id: int) -> None: # usuwa wpis hasla
         if not self._require_session():
             return
-        try:
-            deleted = delete_password_entry(user_id=self._user_id, entry_id=entry_id)
-        except pyodbc.Error as exc:  # pragma: no cover - runtime message
-            self._set_status(f"[!] Błąd usuwania wpisu: {exc}")
-            return
-        if deleted:
-            self._set_status("[+] Wpis usunięto.")
-            self._refresh_passwords()
-        else:
-            self._set_status("[!] Nie znaleziono wskazanego wpisu.")
+        vault = self._vault
+
+        def work():
+            return vault.delete(entry_id)
+
+        def done(deleted: bool) -> None:
+            if deleted:
+                self._set_status("[+] Wpis usunięto.")
+            else:
+                self._set_status("[!] Nie znaleziono wskazanego wpisu.")
+            self.password_model.remove_entry(entry_id) #usunięcie tylko tego wiersza (bez przebudowy listy)
+            self.password_filter.remove_entry(entry_id) #trafienie wyszukiwania spoza wczytanej części listy
+
+        self._start_task(f"delete:{entry_id}", work, done, "Błąd usuwania wpisu")
+
+    def _decrypt_entry_password(self, entry_id: int): #zwraca funkcję pobierającą i odszyfrowującą hasło wpisu (do wykonania w tle)
+        vault, secret = self._vault, self._keyring
+
+        def work():
+            entry = vault.get(entry_id)
+            if entry is None:
+                return None
+            return decrypt_password(entry[3], secret)
+
+        return work
 
     @Slot(int)
     def revealPassword(self, entry_id: int) -> None: # pokazuje lub ukrywa haslo
         if not self._require_session():
             return
-        if self.password_model.is_revealed(entry_id):
+        if self.password_model.is_revealed(entry_id) or self.password_filter.is_revealed(entry_id):
             self.password_model.update_password_text(entry_id, "********", False)
+            self.password_filter.update_password_text(entry_id, "********", False)
             self._set_status("[+] Hasło ukryto.")
             return
-        entry = self._fetch_entry(
-            entry_id, "[!] Nie znaleziono hasła.", "Błąd pobierania hasła"
+
+        def done(decrypted: str | None) -> None:
+            if decrypted is None:
+                self._set_status("[!] Nie znaleziono hasła.")
+                return
+            self.password_model.update_password_text(entry_id, decrypted, True)
+            self.password_filter.update_password_text(entry_id, decrypted, True)
+            self._set_status("[+] Hasło odszyfrowano.")
+
+        self._start_task(
+            f"reveal:{entry_id}",
+            self._decrypt_entry_password(entry_id),
+            done,
+            "Błąd pobierania hasła",
+            on_error=self._decrypt_failed,
         )
-        if entry is None:
-            return
-        encrypted = entry[3]
-        try:
-            decrypted = decrypt_password(encrypted, self._user_secret)
-        except Exception as exc:  # pragma: no cover - runtime message
-            self._set_status(f"[!] Nie udało się odszyfrować hasła: {exc}")
-            return
-        self.password_model.update_password_text(entry_id, decrypted, True)
-        self._set_status("[+] Hasło odszyfrowano.")
 
     @Slot(int)
     def copyPassword(self, entry_id: int) -> None: # kopiuje haslo do schowka
         if not self._require_session():
             return
-        entry = self._fetch_entry(
-            entry_id, "[!] Nie znaleziono hasła.", "Błąd pobierania hasła"
+
+        def done(decrypted: str | None) -> None: #schowek obsługiwany w wątku GUI
+            if decrypted is None:
+                self._set_status("[!] Nie znaleziono hasła.")
+                return
+            success, message = copy_password_to_clipboard(decrypted)
+            prefix = "[+]" if success else "[!]"
+            self._set_status(f"{prefix} {message}")
+
+        self._start_task(
+            f"copy:{entry_id}",
+            self._decrypt_entry_password(entry_id),
+            done,
+            "Błąd pobierania hasła",
+            on_error=self._decrypt_failed,
         )
-        if entry is None:
-            return
-        encrypted = entry[3]
-        try:
-            decrypted = decrypt_password(encrypted, self._user_secret)
-        except Exception as exc:  # pragma: no cover - runtime message
-            self._set_status(f"[!] Nie udało się odszyfrować hasła: {exc}")
-            return
-        success, message = copy_password_to_clipboard(decrypted)
-        prefix = "[+]" if success else "[!]"
-        self._set_status(f"{prefix} {message}")
 
     @Slot(str)
     def copyPlainText(self, text: str) -> None: # kopiuje tekst do schowka
@@ -570,39 +919,49 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
         trimmed_login = new_login.strip()
         normalized_mfa = mfa_code.strip()
 
-        try:
-            (
-                updated_login,
-                password_changed,
-                login_changed,
-            ) = update_user_credentials(
-                user_id=self._user_id,
+        user_id, secret = self._user_id, self._keyring
+
+        def work(report): #bcrypt, opakowanie klucza danych i zmiana stanu MFA w tle
+            updated_login, password_changed, login_changed = update_user_credentials(
+                user_id=user_id,
                 old_password=old_password,
                 new_login=trimmed_login or None,
                 new_password=trimmed_new_pwd or None,
+                progress=report,
             )
-        except ValueError as exc:
-            self._set_status(f"[!] {exc}")
-            return
-        except pyodbc.Error as exc:  # pragma: no cover - runtime message
-            self._set_status(f"[!] Błąd aktualizacji konta: {exc}")
-            return
+            try: #klucz danych nie zmienia się przy zmianie hasła
+                _, mfa_message = ensure_user_mfa_state(
+                    user_id=user_id,
+                    user_secret=secret,
+                    mfa_code=normalized_mfa,
+                )
+            except (ValueError, *DB_ERRORS) as exc: #dane konta zostały już zapisane - błąd MFA raportowany osobno
+                return updated_login, password_changed, login_changed, None, exc
+            return updated_login, password_changed, login_changed, mfa_message, None
+
+        self._start_task(
+            "save_account",
+            work,
+            lambda payload: self._finish_save_account(*payload),
+            "Błąd aktualizacji konta",
+            with_progress=True,
+        )
 
+    def _finish_save_account( #zastosowanie wyniku zmiany konta w wątku GUI
+        self,
+        updated_login: str,
+        password_changed: bool,
+        login_changed: bool,
+        mfa_message: str | None,
+        mfa_error: Exception | None,
+    ) -> None:
         self._user_login = updated_login
-        if password_changed:
-            self._user_secret = trimmed_new_pwd
 
-        try:
-            _, mfa_message = ensure_user_mfa_state(
-                user_id=self._user_id,
-                user_secret=self._user_secret,
-                mfa_code=normalized_mfa,
-            )
-        except ValueError as exc:
-            self._set_status(f"[!] {exc}")
+        if isinstance(mfa_error, ValueError):
+            self._set_status(f"[!] {mfa_error}")
             return
-        except pyodbc.Error as exc:  # pragma: no cover - runtime message
-            self._set_status(f"[!] Błąd aktualizacji MFA: {exc}")
+        if mfa_error is not None:  # pragma: no cover - runtime message
+            self._set_status(f"[!] Błąd aktualizacji MFA: {mfa_error}")
             return
 
         requires_relogin = password_changed or login_changed
@@ -613,7 +972,7 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
         else:
             self.editContextChanged.emit()
             self._set_view(VIEW_PASSWORDS_LIST)
-            self._refresh_passwords()
+            self._sync_passwords()
 
         if mfa_message:
             status_message = f"{status_message} {mfa_message}"
@@ -625,25 +984,24 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
         if not self._require_session():
             return
 
-        try:
-            secret, uri, is_enabled = get_user_mfa_provisioning(
-                user_id=self._user_id,
-                user_secret=self._user_secret,
-            )
-        except ValueError as exc:
-            self._set_status(f"[!] {exc}")
-            return
-        except pyodbc.Error as exc:  # pragma: no cover - runtime message
-            self._set_status(f"[!] Błąd generowania sekretu MFA: {exc}")
-            return
+        user_id, user_secret = self._user_id, self._keyring
 
-        self._mfa_secret = secret
-        self._mfa_uri = uri
-        self.mfaSetupChanged.emit()
+        def done(payload) -> None:
+            secret, uri, is_enabled = payload
+            self._mfa_secret = secret
+            self._mfa_uri = uri
+            self.mfaSetupChanged.emit()
+
+            prefix = "[i]" if is_enabled else "[+]"
+            self._set_status(
+                f"{prefix} Sekret MFA jest gotowy. Zeskanuj kod QR lub wpisz sekret, a następnie podaj kod z aplikacji."
+            )
 
-        prefix = "[i]" if is_enabled else "[+]"
-        self._set_status(
-            f"{prefix} Sekret MFA jest gotowy. Zeskanuj kod QR lub wpisz sekret, a następnie podaj kod z aplikacji."
+        self._start_task(
+            "mfa_setup",
+            lambda: get_user_mfa_provisioning(user_id=user_id, user_secret=user_secret),
+            done,
+            "Błąd generowania sekretu MFA",
         )
 
     @Slot(str, str, str, str)
@@ -665,39 +1023,137 @@ class Backend(QObject): #klasa Backend dziedzicząca po QObject
             return
         if expire and expire_date is None:
             return
-        encrypted = (
-            encrypt_with_user_secret(password, self._user_secret).encode("ascii")
-            if password
-            else None
-        )
-        try:
-            if self._edit_entry_id is None:
-                add_password_entry(
-                    user_id=self._user_id,
+        vault, secret, entry_id = self._vault, self._keyring, self._edit_entry_id
+        model = self.password_model
+
+        def work(): #szyfrowanie i zapis w tle
+            encrypted = (
+                secret.encrypt(password).encode("ascii")
+                if password
+                else None
+            )
+            if entry_id is None:
+                new_id = vault.add(
                     service=trimmed_service,
                     account_login=trimmed_login,
                     account_password=encrypted or b"",
                     expire_date=expire_date,
                 )
-                self._set_status("[+] Dodano nowe hasło.")
-            else:
-                updated = update_password_entry(
-                    user_id=self._user_id,
-                    entry_id=self._edit_entry_id,
-                    new_service=trimmed_service,
-                    new_login=trimmed_login,
-                    new_password=encrypted,
-                    new_expire_date=expire_date,
-                )
-                if updated:
-                    self._set_status("[+] Zapisano zmiany hasła.")
-                else:
-                    self._set_status("[!] Nie znaleziono wpisu do aktualizacji.")
-        except Exception as exc:  # pragma: no cover - runtime message
+                return "[+] Dodano nowe hasło.", new_id, vault.get(new_id) #tylko nowy wpis zamiast całej listy
+            updated = vault.update(
+                entry_id,
+                new_service=trimmed_service,
+                new_login=trimmed_login,
+                new_password=encrypted,
+                new_expire_date=expire_date,
+            )
+            if updated:
+                return "[+] Zapisano zmiany hasła.", entry_id, vault.get(entry_id)
+            return "[!] Nie znaleziono wpisu do aktualizacji.", entry_id, None
+
+        def done(payload) -> None:
+            message, saved_id, entry = payload
+            self._set_status(message)
+            self._set_view(VIEW_PASSWORDS_LIST)
+            if entry is None: #wpis usunięty w międzyczasie
+                model.remove_entry(saved_id)
+                self.password_filter.remove_entry(saved_id)
+                return
+            saved_id, service, login, _, created_at, expire = entry
+            row = build_password_row((saved_id, service, login, created_at, expire))
+            model.update_entry(row) #wstawienie lub zmiana jednego wiersza
+            self.password_filter.update_entry(row) #trafienie wyszukiwania spoza wczytanej części listy
+
+        def failed(exc: Exception) -> bool:  # pragma: no cover - runtime message
             self._set_status(f"[!] Błąd zapisu hasła: {exc}")
+            return True
+
+        self._start_task("save_password", work, done, "Błąd zapisu hasła", on_error=failed)
+
+    @Slot(str)
+    def importPasswords(self, file_url: str) -> None: # importuje wpisy z pliku CSV (Chrome, Firefox, Bitwarden, KeePass)
+        if not self._require_session():
             return
-        self._set_view(VIEW_PASSWORDS_LIST)
-        self._refresh_passwords()
+        path = QUrl(file_url).toLocalFile() if file_url.startswith("file:") else file_url #FileDialog zwraca adres file:///
+        if not path:
+            self._set_status("[!] Nie wybrano pliku do importu.")
+            return
+        user_id, secret, first_page = self._user_id, self._keyring, self._first_page_loader()
+
+        def work(report): #odczyt, szyfrowanie i zapis partiami w tle
+            result = import_password_csv(user_id, secret, path, progress=report)
+            return result, first_page()
+
+        def done(payload) -> None:
+            result, entries = payload
+            message = f"[+] Zaimportowano {result.imported} wpisów ({result.layout})."
+            if result.rejected:
+                message += f" Odrzucono {result.rejected} - szczegóły w pliku {result.rejected_path}."
+            self._set_status(message)
+            self._apply_entries(entries)
+
+        def failed(exc: Exception) -> bool:
+            if isinstance(exc, (OSError, UnicodeDecodeError)): #plik niedostępny lub w innym kodowaniu niż UTF-8
+                self._set_status(f"[!] Nie można odczytać pliku: {exc}")
+                return True
+            return False
+
+        self._start_task(
+            "import_passwords", work, done, "Błąd importu haseł", on_error=failed, with_progress=True
+        )
+
+    @Slot(str)
+    def exportVault(self, file_url: str) -> None: # zapisuje zaszyfrowana kopie sejfu do pliku
+        if not self._require_session():
+            return
+        path = QUrl(file_url).toLocalFile() if file_url.startswith("file:") else file_url #FileDialog zwraca adres file:///
+        if not path:
+            self._set_status("[!] Nie wybrano pliku kopii.")
+            return
+        user_id, secret = self._user_id, self._keyring
+
+        def work(report): #odczyt partiami, kompresja i szyfrowanie ramek w tle
+            return export_vault(user_id, secret, path, progress=report)
+
+        def done(count: int) -> None:
+            self._set_status(f"[+] Zapisano kopię sejfu ({count} wpisów) do pliku {path}.")
+
+        def failed(exc: Exception) -> bool:
+            if isinstance(exc, OSError): #brak uprawnień lub miejsca na dysku
+                self._set_status(f"[!] Nie można zapisać pliku: {exc}")
+                return True
+            return False
+
+        self._start_task("export_vault", work, done, "Błąd eksportu sejfu", on_error=failed, with_progress=True)
+
+    @Slot(str)
+    def restoreVault(self, file_url: str) -> None: # dodaje do sejfu wpisy z zaszyfrowanej kopii
+        if not self._require_session():
+            return
+        path = QUrl(file_url).toLocalFile() if file_url.startswith("file:") else file_url #FileDialog zwraca adres file:///
+        if not path:
+            self._set_status("[!] Nie wybrano pliku kopii.")
+            return
+        user_id, secret, first_page = self._user_id, self._keyring, self._first_page_loader()
+
+        def work(report): #weryfikacja ramek i zapis partiami w tle
+            count = restore_vault(user_id, secret, path, progress=report)
+            return count, first_page()
+
+        def done(payload) -> None:
+            count, entries = payload
+            self._set_status(f"[+] Odtworzono {count} wpisów z kopii sejfu.")
+            self._apply_entries(entries)
+
+        def failed(exc: Exception) -> bool:
+            if isinstance(exc, OSError): #plik niedostępny
+                self._set_status(f"[!] Nie można odczytać pliku: {exc}")
+                return True
+            return False
+
+        self._start_task(
+            "restore_vault", work, done, "Błąd odtwarzania sejfu", on_error=failed, with_progress=True
+        )
 
     @Slot(int, result=str)
     def generatePassword(self, length: int = 16) -> str: # generuje haslo o zadanej dlugosci
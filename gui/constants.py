@@ -9,3 +9,6 @@ VIEW_DATABASE_SETTINGS = "Databasesettings_ui.qml"
 VIEW_KEY_SETTINGS = "KeySettings_ui.qml"
 VIEW_EDIT_USER_ACCOUNT = "EditUserAccount_UI.qml"
 VIEW_PASSWORD_EDIT = "PasswordEdit_UI.qml"
+
+POLL_INTERVAL_MIN_MS = 5 * 1000 # sprawdzanie zmian z innych urzadzen - interwal po wykryciu zmiany
+POLL_INTERVAL_MAX_MS = 2 * 60 * 1000 # gorny limit interwalu przy braku zmian (interwal podwajany)
@@ -2,6 +2,7 @@
 
 Zawiera funkcje:
 - parse_expire(): Parsuje date waznosci w kilku formatach lub zwraca None.
+- build_password_row(): Buduje pojedynczy PasswordRow z rekordu listy wpisow.
 - build_password_rows(): Buduje liste PasswordRow na potrzeby GUI.
 """
 from datetime import datetime # do parsowania dat
@@ -22,15 +23,18 @@ def parse_expire(raw: str) -> datetime | None: # parsuje date waznosci z kilku f
     raise ValueError("Nieprawidlowy format daty waznosci.") # informuje o blednym formacie
 
 
+def build_password_row(e: tuple) -> PasswordRow: # mapuje rekord (id, service, login, created_at, expire_date) na PasswordRow
+    return PasswordRow(
+        entry_id=e[0], # id wpisu
+        service=str(e[1] or ""), # nazwa uslugi
+        login=str(e[2] or ""), # login uzytkownika
+        password_text="********", # maska hasla
+        revealed=False, # domyslnie ukryte
+        expired=is_password_expired(e[4]), # flaga wygasniecia
+        created_at=e[3], # data utworzenia (sortowanie)
+        expire_date=e[4], # data wygasniecia (sortowanie)
+    )
+
+
 def build_password_rows(entries: list[tuple]) -> list[PasswordRow]: # mapuje rekordy bazy na obiekty PasswordRow
-    return [
-        PasswordRow(
-            entry_id=e[0], # id wpisu
-            service=str(e[1] or ""), # nazwa uslugi
-            login=str(e[2] or ""), # login uzytkownika
-            password_text="********", # maska hasla
-            revealed=False, # domyslnie ukryte
-            expired=is_password_expired(e[4]), # flaga wygasniecia
-        )
-        for e in entries
-    ]
+    return [build_password_row(e) for e in entries]
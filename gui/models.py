@@ -1,15 +1,24 @@
 ﻿"""Modele danych GUI aplikacji.
 Zawiera klasy:
-- PasswordRow: Struktura danych wpisu hasla.
-- PasswordListModel: Model listy hasel dla QML.
+- PasswordRow: Struktura danych wpisu hasla (__slots__).
+- PasswordListModel: Model listy hasel dla QML (doczytywanie stron przez canFetchMore/fetchMore, indeks entry_id -> wiersz
+  oraz wstawianie, zmiana i usuwanie pojedynczych wierszy bez resetu modelu).
+- PasswordFilterModel: Warstwa proxy nad PasswordListModel z wyszukiwaniem rozmytym po serwisie i loginie (ranking, debounce,
+  zawezanie poprzednich wynikow, skanowanie porcjami miedzy klatkami) uzupelnionym o trafienia z bazy spoza wczytanej czesci listy.
 """
 
-from dataclasses import dataclass
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import compress
+from operator import attrgetter
+from typing import Callable
 
-from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PySide6.QtCore import QAbstractListModel, QAbstractProxyModel, QModelIndex, Qt, QTimer, Property, Signal, Slot
 
 
-@dataclass
+@dataclass(slots=True)
 class PasswordRow: # struktura wpisu hasla
     entry_id: int
     service: str
@@ -17,6 +26,12 @@ class PasswordRow: # struktura wpisu hasla
     password_text: str = "********"
     revealed: bool = False
     expired: bool = False
+    created_at: datetime | None = None # klucz sortowania listy
+    expire_date: datetime | None = None # klucz sortowania listy
+    search_key: str = field(default="", init=False, repr=False) # "serwis<TAB>login" malymi literami dla wyszukiwania
+
+    def __post_init__(self) -> None: # klucz wyszukiwania liczony raz przy wczytaniu wpisu
+        self.search_key = f"{self.service}\t{self.login}".casefold()
 
 
 class PasswordListModel(QAbstractListModel): # model listy hasel dla QML
@@ -27,9 +42,15 @@ class PasswordListModel(QAbstractListModel): # model listy hasel dla QML
     RevealedRole = Qt.UserRole + 5
     ExpiredRole = Qt.UserRole + 6
 
-    def __init__(self) -> None: # inicjalizuje model
+    def __init__(self, fetch_page: Callable[[tuple, int], None] | None = None) -> None: # inicjalizuje model
         super().__init__()
         self._items: list[PasswordRow] = []
+        self._rows: dict[int, int] = {} # entry_id -> numer wiersza
+        self._sort: tuple[str, bool] = ("created_at", True) # sortowanie wczytanej listy (klucz, malejaco)
+        self._fetch_page = fetch_page # zleca wczytanie strony za kursorem (wynik wraca przez append_page)
+        self._next_cursor: tuple | None = None # kursor nastepnej strony (None - wczytano wszystkie wpisy)
+        self._fetch_pending = False # czy trwa wczytywanie strony
+        self._generation = 0 # numer wczytania listy - strony zamowione dla poprzedniej listy sa odrzucane
 
     def rowCount(self, parent=QModelIndex()) -> int: # zwraca liczbe wierszy
         if parent.isValid():
@@ -39,7 +60,9 @@ class PasswordListModel(QAbstractListModel): # model listy hasel dla QML
     def data(self, index: QModelIndex, role: int = Qt.DisplayRole): # zwraca dane dla roli
         if not index.isValid() or not (0 <= index.row() < len(self._items)):
             return None
-        item = self._items[index.row()]
+        return self.item_data(self._items[index.row()], role)
+
+    def item_data(self, item: PasswordRow, role: int): # zwraca wartosc roli dla wpisu
         if role == self.EntryIdRole:
             return item.entry_id
         if role == self.ServiceRole:
@@ -64,24 +87,468 @@ class PasswordListModel(QAbstractListModel): # model listy hasel dla QML
             self.ExpiredRole: b"expired",
         }
 
-    def set_entries(self, entries: list[PasswordRow]) -> None: # ustawia liste wpisow
+    def canFetchMore(self, parent=QModelIndex()) -> bool: # czy widok moze zazadac kolejnej strony
+        if parent.isValid() or self._fetch_page is None:
+            return False
+        return self._next_cursor is not None and not self._fetch_pending
+
+    def fetchMore(self, parent=QModelIndex()) -> None: # zleca wczytanie kolejnej strony (asynchronicznie)
+        if not self.canFetchMore(parent):
+            return
+        self._fetch_pending = True
+        self._fetch_page(self._next_cursor, self._generation)
+
+    def set_entries( # ustawia pierwsza strone wpisow
+        self, entries: list[PasswordRow], next_cursor: tuple | None = None, sort: tuple[str, bool] | None = None
+    ) -> None:
         self.beginResetModel()
         self._items = list(entries)
+        self._rows = {item.entry_id: row for row, item in enumerate(self._items)}
+        self._next_cursor = next_cursor
+        if sort is not None:
+            self._sort = sort
+        self._fetch_pending = False
+        self._generation += 1
         self.endResetModel()
 
+    def append_page(self, generation: int, entries: list[PasswordRow], next_cursor: tuple | None) -> None: # dopisuje wczytana strone na koncu listy
+        if generation != self._generation: # lista zostala w miedzyczasie wczytana od nowa
+            return
+        self._fetch_pending = False
+        self._next_cursor = next_cursor
+        entries = [item for item in entries if item.entry_id not in self._rows] # bez wpisow wstawionych juz w miejscu (np. przez synchronizacje)
+        if entries:
+            first = len(self._items)
+            self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+            self._items.extend(entries)
+            self._rows.update((item.entry_id, first + offset) for offset, item in enumerate(entries))
+            self.endInsertRows()
+
+    def fetch_failed(self, generation: int) -> None: # konczy nieudane wczytywanie strony (widok moze ponowic)
+        if generation == self._generation:
+            self._fetch_pending = False
+
+    def has_more(self) -> bool: # czy w bazie sa wpisy za wczytana czescia listy
+        return self._next_cursor is not None
+
+    def _sort_value(self, item: PasswordRow): # klucz porzadku wiersza zgodny z ORDER BY (kolumna, id) listy w bazie
+        key = self._sort[0]
+        if key == "service": # tekst bez rozrozniania wielkosci liter jak kolacja *_CI_AS / NOCASE
+            return item.service.casefold(), item.entry_id
+        if key == "login":
+            return item.login.casefold(), item.entry_id
+        if key == "expire_date": # NULL przed datami przy sortowaniu rosnacym
+            return (item.expire_date is not None, item.expire_date or datetime.min), item.entry_id
+        return item.created_at or datetime.min, item.entry_id
+
+    def _precedes(self, first: PasswordRow, second: PasswordRow) -> bool: # czy first jest przed second w biezacym sortowaniu
+        a, b = self._sort_value(first), self._sort_value(second)
+        return a > b if self._sort[1] else a < b
+
+    def _position_for(self, item: PasswordRow) -> int: # miejsce wiersza na posortowanej liscie (wyszukiwanie binarne)
+        low, high = 0, len(self._items)
+        while low < high:
+            middle = (low + high) // 2
+            if self._precedes(item, self._items[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _reindex(self, first: int) -> None: # odswieza indeks entry_id -> wiersz od podanego wiersza
+        for row in range(first, len(self._items)):
+            self._rows[self._items[row].entry_id] = row
+
+    def row_of(self, entry_id: int) -> int | None: # zwraca numer wiersza wpisu lub None
+        return self._rows.get(entry_id)
+
+    def entry_at(self, row: int) -> PasswordRow: # zwraca wpis z podanego wiersza
+        return self._items[row]
+
+    def entries(self) -> list[PasswordRow]: # zwraca kopie listy wczytanych wpisow (w kolejnosci wierszy)
+        return list(self._items)
+
+    def insert_entry(self, item: PasswordRow) -> bool: # wstawia wpis w miejscu wynikajacym z sortowania
+        if item.entry_id in self._rows: # wpis jest juz na liscie (np. wczytany ponownie z baza)
+            self.update_entry(item)
+            return True
+        position = self._position_for(item)
+        if position == len(self._items) and self._next_cursor is not None: # za wczytana czescia - wczyta go fetchMore
+            return False
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._items.insert(position, item)
+        self._reindex(position)
+        self.endInsertRows()
+        return True
+
+    def remove_entry(self, entry_id: int) -> bool: # usuwa wiersz wpisu
+        row = self._rows.pop(entry_id, None)
+        if row is None:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._items[row]
+        self._reindex(row)
+        self.endRemoveRows()
+        return True
+
+    def update_entry(self, item: PasswordRow) -> None: # zastepuje wiersz wpisu (przenosi go, gdy zmienil sie klucz sortowania)
+        row = self._rows.get(item.entry_id)
+        if row is None: # wpis spoza wczytanej czesci listy
+            self.insert_entry(item)
+            return
+        self._items[row] = item
+        in_order = (row == 0 or self._precedes(self._items[row - 1], item)) and (
+            row == len(self._items) - 1 or self._precedes(item, self._items[row + 1])
+        )
+        if in_order: # kolejnosc zachowana - zmiana tylko tego wiersza
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index, [])
+            return
+        self.remove_entry(item.entry_id)
+        self.insert_entry(item)
+
     def is_revealed(self, entry_id: int) -> bool: # sprawdza czy haslo jest ujawnione
-        for item in self._items:
-            if item.entry_id == entry_id:
-                return item.revealed
-        return False
+        row = self._rows.get(entry_id)
+        return row is not None and self._items[row].revealed
 
     def update_password_text(self, entry_id: int, text: str, revealed: bool) -> None: # aktualizuje tekst i stan ujawnienia
-        for row, item in enumerate(self._items):
-            if item.entry_id == entry_id:
-                item.password_text = text
-                item.revealed = revealed
-                index = self.index(row, 0)
-                self.dataChanged.emit(
-                    index, index, [self.PasswordRole, self.RevealedRole]
-                )
-                break
+        row = self._rows.get(entry_id)
+        if row is None:
+            return
+        item = self._items[row]
+        item.password_text = text
+        item.revealed = revealed
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index, [self.PasswordRole, self.RevealedRole])
+
+
+_search_keys = attrgetter("search_key")
+
+
+class PasswordFilterModel(QAbstractProxyModel): # wyszukiwanie rozmyte nad lista hasel dla QML
+    """Lista wpisow pasujacych do zapytania, uszeregowana wedlug trafnosci.
+
+    Wyniki sa w trzech grupach: serwis zaczyna sie od zapytania, zapytanie
+    wystepuje w serwisie lub loginie, litery zapytania wystepuja po kolei
+    (dopasowanie rozmyte). W grupie obowiazuje kolejnosc listy zrodlowej.
+    Gdy zapytanie tylko sie wydluza, sprawdzane sa wylacznie poprzednie
+    wyniki. Pelne skanowanie dzieli sie na porcje wykonywane w kolejnych
+    obiegach petli zdarzen, wiec zadna klatka nie jest blokowana.
+
+    Gdy lista nie jest wczytana w calosci, zapytanie jest tez wyszukiwane
+    w bazie (search_remote); trafienia spoza wczytanej czesci listy tworza
+    czwarta grupe na koncu wynikow, dopoki nie wczyta ich fetchMore.
+    """
+
+    queryChanged = Signal()
+    activeChanged = Signal()
+    DEBOUNCE_MS = 150 # opoznienie filtrowania po ostatnim znaku
+    SLICE_ROWS = 5000 # liczba wierszy sprawdzanych w jednym obiegu petli zdarzen
+
+    def __init__( # inicjalizuje proxy nad modelem listy hasel
+        self, source: PasswordListModel, search_remote: Callable[[str], None] | None = None
+    ) -> None:
+        super().__init__()
+        self._query = "" # zastosowane zapytanie (puste - proxy nieaktywne)
+        self._pending = "" # zapytanie czekajace na uplyw debounce
+        self._search_remote = search_remote # zleca wyszukanie zapytania w bazie (wynik wraca przez add_remote_matches)
+        self._items: list[PasswordRow] = [] # wyniki w kolejnosci wyswietlania
+        self._remote: list[PasswordRow] = [] # trafienia z bazy spoza listy zrodlowej (ostatnia grupa _items)
+        self._tier_ends = [0, 0, 0, 0] # koniec kazdej grupy trafnosci w _items
+        self._proxy_rows: dict[int, int] | None = None # entry_id -> wiersz proxy (budowany leniwie)
+        self._fuzzy = re.compile("") # wzorzec dopasowania rozmytego zastosowanego zapytania
+        self._scan = None # trwajace skanowanie porcjami
+        self._scan_stale = False # lista zrodlowa zmienila sie w trakcie skanowania
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._apply_pending)
+        self._scan_timer = QTimer(self)
+        self._scan_timer.setInterval(0)
+        self._scan_timer.timeout.connect(self._scan_step)
+        self.setSourceModel(source)
+        source.modelReset.connect(self._source_reset)
+        source.rowsInserted.connect(self._source_rows_inserted)
+        source.rowsAboutToBeRemoved.connect(self._source_rows_removing)
+        source.dataChanged.connect(self._source_data_changed)
+
+    @Property(str, notify=queryChanged)
+    def query(self) -> str: # zwraca zastosowane zapytanie
+        return self._query
+
+    @Property(bool, notify=activeChanged)
+    def active(self) -> bool: # czy lista jest filtrowana
+        return bool(self._query)
+
+    @Slot(str)
+    def setQuery(self, text: str) -> None: # ustawia zapytanie (z opoznieniem - debounce)
+        self._pending = text.strip().casefold()
+        if not self._pending: # wyczyszczenie pola dziala od razu
+            self._debounce.stop()
+            self._apply_pending()
+            return
+        self._debounce.start()
+
+    # --- interfejs QAbstractProxyModel ---
+
+    def rowCount(self, parent=QModelIndex()) -> int: # zwraca liczbe wynikow
+        return 0 if parent.isValid() else len(self._items)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else 1
+
+    def index(self, row: int, column: int = 0, parent=QModelIndex()) -> QModelIndex:
+        if parent.isValid() or column != 0 or not (0 <= row < len(self._items)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()) -> QModelIndex: # lista plaska - brak rodzicow
+        return QModelIndex()
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole): # dane z listy wynikow (trafienia z bazy nie maja wiersza zrodlowego)
+        if not index.isValid() or not (0 <= index.row() < len(self._items)):
+            return None
+        return self.sourceModel().item_data(self._items[index.row()], role)
+
+    def mapToSource(self, proxy_index: QModelIndex) -> QModelIndex:
+        if not proxy_index.isValid() or not (0 <= proxy_index.row() < len(self._items)):
+            return QModelIndex()
+        row = self.sourceModel().row_of(self._items[proxy_index.row()].entry_id)
+        return QModelIndex() if row is None else self.sourceModel().index(row, 0)
+
+    def mapFromSource(self, source_index: QModelIndex) -> QModelIndex:
+        if not source_index.isValid():
+            return QModelIndex()
+        row = self._proxy_row(self.sourceModel().entry_at(source_index.row()).entry_id)
+        return QModelIndex() if row is None else self.createIndex(row, 0)
+
+    # --- dopasowanie ---
+
+    def _proxy_row(self, entry_id: int) -> int | None: # wiersz proxy wpisu (indeks odbudowywany po zmianach)
+        if self._proxy_rows is None:
+            self._proxy_rows = {item.entry_id: row for row, item in enumerate(self._items)}
+        return self._proxy_rows.get(entry_id)
+
+    def _tier(self, key: str) -> int | None: # grupa trafnosci klucza wyszukiwania lub None
+        if key.startswith(self._query):
+            return 0
+        if self._query in key:
+            return 1
+        return 2 if self._fuzzy.match(key) else None
+
+    def _apply_pending(self) -> None: # stosuje zapytanie po uplywie debounce
+        query = self._pending
+        if query == self._query:
+            return
+        narrowing = bool(self._query) and self._scan is None and query.startswith(self._query)
+        self._query = query
+        self.queryChanged.emit()
+        self._replace_remote([]) # trafienia z bazy dotyczyly poprzedniego zapytania
+        if not query:
+            self._stop_scan()
+            self._publish([], [], [])
+            self.activeChanged.emit()
+            return
+        # litery po kolei; klasa [^x]* nie cofa sie, wiec dopasowanie jest liniowe
+        self._fuzzy = re.compile("".join(f"[^{re.escape(c)}]*{re.escape(c)}" for c in query))
+        candidates = self._items[:self._tier_ends[2]] if narrowing else self.sourceModel().entries()
+        self._start_scan(candidates, resort=narrowing)
+        self._request_remote()
+        self.activeChanged.emit()
+
+    def _request_remote(self) -> None: # zleca wyszukanie zapytania w bazie, gdy lista nie jest wczytana w calosci
+        if self._search_remote is not None and self._query and self.sourceModel().has_more():
+            self._search_remote(self._query)
+
+    def _start_scan(self, candidates: list[PasswordRow], *, resort: bool) -> None: # rozpoczyna dopasowywanie kandydatow
+        self._stop_scan()
+        self._scan_stale = False
+        self._scan = (candidates, 0, ([], [], []), resort)
+        if len(candidates) <= self.SLICE_ROWS: # mala lista - od razu, bez czekania na petle zdarzen
+            self._scan_step()
+        else:
+            self._scan_timer.start()
+
+    def _stop_scan(self) -> None:
+        self._scan_timer.stop()
+        self._scan = None
+
+    def _scan_step(self) -> None: # sprawdza jedna porcje kandydatow
+        if self._scan is None:
+            return
+        candidates, start, tiers, resort = self._scan
+        chunk = candidates[start:start + self.SLICE_ROWS]
+        keys = list(map(_search_keys, chunk))
+        for position in compress(range(len(chunk)), map(self._fuzzy.match, keys)): # dopasowanie w C, Python tylko dla trafien
+            key = keys[position]
+            tiers[0 if key.startswith(self._query) else 1 if self._query in key else 2].append(chunk[position])
+        start += len(chunk)
+        if start < len(candidates):
+            self._scan = (candidates, start, tiers, resort)
+            return
+        self._stop_scan()
+        if self._scan_stale: # wiersze dodane lub usuniete w trakcie - skanowanie aktualnej listy od nowa
+            self._start_scan(self.sourceModel().entries(), resort=False)
+            return
+        if resort: # kandydaci z zawezania byli w kolejnosci wynikow - przywrocenie kolejnosci listy w grupach
+            source = self.sourceModel()
+            for tier in tiers:
+                tier.sort(key=lambda item: source.row_of(item.entry_id))
+        self._publish(*tiers)
+
+    def _publish(self, prefix: list, contains: list, fuzzy: list) -> None: # zastepuje wyniki (jeden reset widoku)
+        source = self.sourceModel()
+        self.beginResetModel()
+        self._remote = [item for item in self._remote if source.row_of(item.entry_id) is None] # wczytane sa juz w grupach
+        self._items = prefix + contains + fuzzy + self._remote
+        local = len(prefix) + len(contains) + len(fuzzy)
+        self._tier_ends = [len(prefix), len(prefix) + len(contains), local, len(self._items)]
+        self._proxy_rows = None
+        self.endResetModel()
+
+    # --- trafienia z bazy ---
+
+    def add_remote_matches(self, query: str, entries: list[PasswordRow]) -> None: # ustawia trafienia z bazy dla zapytania
+        if query != self._query: # odpowiedz dla poprzedniego zapytania
+            return
+        source = self.sourceModel()
+        self._replace_remote([item for item in entries if source.row_of(item.entry_id) is None]) # wczytane znajduje skanowanie
+
+    def _replace_remote(self, remote: list[PasswordRow]) -> None: # zastepuje ostatnia grupe wynikow (rowniez w trakcie skanowania)
+        first = self._tier_ends[2]
+        if self._remote:
+            self.beginRemoveRows(QModelIndex(), first, len(self._items) - 1)
+            del self._items[first:]
+            self._remote = []
+            self._tier_ends[3] = first
+            self._proxy_rows = None
+            self.endRemoveRows()
+        if remote:
+            self.beginInsertRows(QModelIndex(), first, first + len(remote) - 1)
+            self._items.extend(remote)
+            self._remote = remote
+            self._tier_ends[3] = len(self._items)
+            self._proxy_rows = None
+            self.endInsertRows()
+
+    def _remote_row(self, entry_id: int) -> int | None: # wiersz proxy trafienia z bazy lub None
+        row = self._proxy_row(entry_id)
+        return row if row is not None and row >= self._tier_ends[2] else None
+
+    def is_revealed(self, entry_id: int) -> bool: # czy haslo trafienia z bazy jest ujawnione
+        row = self._remote_row(entry_id)
+        return row is not None and self._items[row].revealed
+
+    def update_password_text(self, entry_id: int, text: str, revealed: bool) -> None: # aktualizuje haslo trafienia z bazy
+        row = self._remote_row(entry_id)
+        if row is None: # wpisy listy zrodlowej zmienia PasswordListModel
+            return
+        item = self._items[row]
+        item.password_text = text
+        item.revealed = revealed
+        index = self.createIndex(row, 0)
+        self.dataChanged.emit(index, index, [PasswordListModel.PasswordRole, PasswordListModel.RevealedRole])
+
+    def update_entry(self, item: PasswordRow) -> None: # zastepuje trafienie z bazy po edycji wpisu
+        row = self._remote_row(item.entry_id)
+        if row is None:
+            return
+        if self._tier(item.search_key) is None: # wpis nie pasuje juz do zapytania
+            self._remove_item(row)
+            return
+        self._items[row] = item
+        self._remote[row - self._tier_ends[2]] = item
+        index = self.createIndex(row, 0)
+        self.dataChanged.emit(index, index, [])
+
+    def remove_entry(self, entry_id: int) -> bool: # usuwa trafienie z bazy (wpis usuniety)
+        row = self._remote_row(entry_id)
+        if row is None:
+            return False
+        self._remove_item(row)
+        return True
+
+    # --- zmiany listy zrodlowej ---
+
+    def _source_reset(self) -> None: # nowa lista (np. sortowanie, import) - pelne skanowanie
+        if not self._query:
+            return
+        if self._items: # poprzednie wyniki nie wskazuja juz wierszy listy zrodlowej
+            self._publish([], [], [])
+        self._start_scan(self.sourceModel().entries(), resort=False)
+        self._request_remote() # po ponownym wczytaniu czesc trafien moze byc juz poza lista
+
+    def _insert_item(self, item: PasswordRow, tier: int) -> None: # wstawia trafienie w grupie wedlug kolejnosci listy zrodlowej
+        source = self.sourceModel()
+        low = self._tier_ends[tier - 1] if tier else 0
+        position = bisect_right(
+            self._items, source.row_of(item.entry_id), low, self._tier_ends[tier],
+            key=lambda other: source.row_of(other.entry_id),
+        )
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._items.insert(position, item)
+        for index in range(tier, 4):
+            self._tier_ends[index] += 1
+        self._proxy_rows = None
+        self.endInsertRows()
+
+    def _remove_item(self, proxy_row: int) -> None: # usuwa wynik z podanego wiersza proxy
+        self.beginRemoveRows(QModelIndex(), proxy_row, proxy_row)
+        if proxy_row >= self._tier_ends[2]:
+            del self._remote[proxy_row - self._tier_ends[2]]
+        del self._items[proxy_row]
+        for index in range(4):
+            if self._tier_ends[index] > proxy_row:
+                self._tier_ends[index] -= 1
+        self._proxy_rows = None
+        self.endRemoveRows()
+
+    def _source_rows_inserted(self, parent: QModelIndex, first: int, last: int) -> None: # nowe wiersze (strona, nowy wpis)
+        if not self._query:
+            return
+        if self._scan is not None: # skanowanie w toku obejmuje kopie listy sprzed zmiany
+            self._scan_stale = True
+            return
+        source = self.sourceModel()
+        for row in range(first, last + 1):
+            item = source.entry_at(row)
+            remote_row = self._remote_row(item.entry_id)
+            if remote_row is not None: # trafienie z bazy wczytane przez fetchMore - przechodzi do swojej grupy
+                self._remove_item(remote_row)
+            tier = self._tier(item.search_key)
+            if tier is not None:
+                self._insert_item(item, tier)
+
+    def _source_rows_removing(self, parent: QModelIndex, first: int, last: int) -> None: # wiersze znikajace z listy
+        if not self._query:
+            return
+        if self._scan is not None:
+            self._scan_stale = True
+            return
+        source = self.sourceModel()
+        for row in range(first, last + 1):
+            proxy_row = self._proxy_row(source.entry_at(row).entry_id)
+            if proxy_row is not None:
+                self._remove_item(proxy_row)
+
+    def _source_data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex, roles=()) -> None: # zmiana wiersza
+        if not self._query:
+            return
+        if self._scan is not None: # serwis lub login mogly sie zmienic
+            self._scan_stale = True
+            return
+        source = self.sourceModel()
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            item = source.entry_at(row)
+            proxy_row = self._proxy_row(item.entry_id)
+            tier = self._tier(item.search_key)
+            if proxy_row is not None:
+                old_tier = bisect_right(self._tier_ends, proxy_row)
+                if tier == old_tier: # ta sama grupa - zmiana tylko tego wiersza (obiekt mogl zostac podmieniony)
+                    self._items[proxy_row] = item
+                    index = self.createIndex(proxy_row, 0)
+                    self.dataChanged.emit(index, index, roles)
+                    continue
+                self._remove_item(proxy_row)
+            if tier is not None:
+                self._insert_item(item, tier)
@@ -0,0 +1,130 @@
+"""tasks.py - warstwa zadań w tle dla GUI. Wykonuje blokujące operacje (zapytania do bazy, haszowanie bcrypt, szyfrowanie)
+w puli wątków QThreadPool, a wynik lub wyjątek przekazuje z powrotem do wątku GUI przez sygnały Qt.
+
+Każde zadanie ma nazwę akcji (np. "login", "save_password"). Dla danej akcji w toku może być tylko jedno zadanie,
+więc wielokrotne kliknięcie przycisku nie kolejkuje tej samej pracy kilka razy. Zadania tła (np. okresowe sprawdzanie zmian)
+nie zmieniają stanu zajętości.
+
+Zawiera klasy:
+- TaskRunner: Uruchamia zadania w tle, pilnuje jednego zadania na akcję i udostępnia stan zajętości oraz postęp.
+- _TaskSignals: Sygnały zadania (wynik, błąd, postęp) emitowane z wątku roboczego.
+- _Task: Opakowanie funkcji w QRunnable.
+"""
+
+from PySide6.QtCore import ( #importowanie klas Qt do obsługi puli wątków i sygnałów
+    QObject,
+    QRunnable,
+    QThreadPool,
+    Signal,
+    Slot,
+)
+
+
+class _TaskSignals(QObject): #sygnały zadania emitowane z wątku roboczego
+    finished = Signal(str, object) #akcja, wynik
+    failed = Signal(str, object) #akcja, wyjątek
+    progress = Signal(str, float) #akcja, postęp 0.0-1.0
+
+
+class _Task(QRunnable): #zadanie uruchamiane w puli wątków
+    def __init__(self, action: str, fn, with_progress: bool) -> None:
+        super().__init__()
+        self.setAutoDelete(False) #czas życia zadania kontroluje TaskRunner
+        self.action = action
+        self.signals = _TaskSignals()
+        self._fn = fn
+        self._with_progress = with_progress
+
+    def run(self) -> None: #wykonywane w wątku roboczym
+        try:
+            if self._with_progress: #funkcja otrzymuje callback raportujący postęp
+                result = self._fn(lambda value: self.signals.progress.emit(self.action, float(value)))
+            else:
+                result = self._fn()
+        except Exception as exc: #wyjątek przekazywany do wątku GUI
+            self.signals.failed.emit(self.action, exc)
+        else:
+            self.signals.finished.emit(self.action, result)
+
+
+class TaskRunner(QObject): #uruchamianie zadań w tle z jednym zadaniem na akcję
+    """Uruchamia funkcje w :class:`QThreadPool` i wywołuje callbacki w wątku GUI.
+
+    Callbacki ``on_success(result)`` i ``on_error(exc)`` są wywoływane przez
+    sloty tego obiektu, więc zawsze trafiają do wątku, w którym utworzono
+    TaskRunner (wątek GUI), niezależnie od wątku wykonującego zadanie.
+    """
+
+    busyChanged = Signal() #sygnał zmiany zajętości (rozpoczęcie/zakończenie zadania)
+    progressChanged = Signal() #sygnał zmiany postępu
+
+    def __init__(self, parent: QObject | None = None, pool: QThreadPool | None = None) -> None:
+        super().__init__(parent)
+        self._pool = pool or QThreadPool.globalInstance() #wspólna pula wątków aplikacji
+        self._running: dict[str, tuple[_Task, object, object, bool]] = {} #akcja -> (zadanie, on_success, on_error, zadanie tła)
+        self._progress = -1.0 #postęp ostatniego zadania raportującego (-1 = nieokreślony)
+
+    @property
+    def busy(self) -> bool: #czy jakiekolwiek zadanie (poza zadaniami tła) jest w toku
+        return any(not background for _, _, _, background in self._running.values())
+
+    @property
+    def progress(self) -> float: #postęp bieżącego zadania lub -1, gdy nieokreślony
+        return self._progress
+
+    def is_running(self, action: str) -> bool: #czy zadanie danej akcji jest w toku
+        return action in self._running
+
+    def submit( #uruchamia zadanie w tle
+        self, action: str, fn, on_success, on_error, *, with_progress: bool = False, background: bool = False
+    ) -> bool:
+        """Uruchamia ``fn`` w tle; zwraca False, jeśli zadanie ``action`` już trwa.
+
+        Przy ``with_progress=True`` funkcja otrzymuje jeden argument - callback
+        ``report(value)`` przyjmujący postęp z zakresu 0.0-1.0. Zadanie
+        z ``background=True`` nie jest uwzględniane w :attr:`busy`.
+        """
+        if action in self._running: #jedno zadanie na akcję - ignoruj ponowne kliknięcia
+            return False
+        task = _Task(action, fn, with_progress)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        task.signals.progress.connect(self._on_progress)
+        was_busy = self.busy
+        self._running[action] = (task, on_success, on_error, background)
+        if self.busy != was_busy:
+            self.busyChanged.emit()
+        self._pool.start(task)
+        return True
+
+    def wait_for_done(self, msecs: int = -1) -> bool: #czeka na zakończenie zadań w puli (np. przy zamykaniu aplikacji)
+        return self._pool.waitForDone(msecs)
+
+    def _pop(self, action: str): #usuwa zadanie z listy trwających i zwraca jego callbacki
+        was_busy = self.busy
+        _, on_success, on_error, _ = self._running.pop(action)
+        if not self._running:
+            self._progress = -1.0
+            self.progressChanged.emit()
+        if self.busy != was_busy:
+            self.busyChanged.emit()
+        return on_success, on_error
+
+    @Slot(str, object)
+    def _on_finished(self, action: str, result) -> None: #wynik zadania - wątek GUI
+        on_success, _ = self._pop(action)
+        on_success(result)
+
+    @Slot(str, object)
+    def _on_failed(self, action: str, exc) -> None: #wyjątek zadania - wątek GUI
+        _, on_error = self._pop(action)
+        on_error(exc)
+
+    @Slot(str, float)
+    def _on_progress(self, action: str, value: float) -> None: #postęp zadania - wątek GUI
+        if action in self._running:
+            self._progress = max(0.0, min(1.0, value))
+            self.progressChanged.emit()
+
+
+__all__ = ["TaskRunner"]
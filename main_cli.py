@@ -2,8 +2,10 @@
 Zawiera funkcje:
 - prompt_credentials(): Pobiera dane logowania z konsoli.
 - register_user(): Rejestruje uzytkownika.
-- login_user(): Loguje uzytkownika i obsluguje panel.
+- login_user(): Loguje uzytkownika i otwiera sesje sejfu.
+- _user_panel(): Obsluguje panel uzytkownika na otwartej sesji sejfu.
 - show_user_entries(): Wyswietla liste hasel.
+- search_user_entries(): Wyszukuje hasla po poczatku nazwy uslugi lub loginu.
 - main(): Uruchamia menu glowne CLI.
 """
 
@@ -11,17 +13,14 @@ import sys #importowanie modułu sys do obsługi systemu
 from datetime import datetime #importowanie klasy datetime z modułu datetime
 from getpass import getpass #importowanie funkcji getpass do bezpiecznego pobierania haseł
 from config import settings as app_settings #importowanie narzędzia do zarządzania konfiguracją aplikacji
-import pyodbc #importowanie modułu pyodbc do obsługi połączeń z bazą danych
-
-from db.tablepassword_crud import ( #importowanie funkcji CRUD z pliku tablepassword_crud.py
-    add_password_entry,
-    list_password_entries,
-    update_password_entry,
-    delete_password_entry,
-    view_or_copy_password
-)
-from db.tableusers_insertandverify import create_user, verify_user #importowanie funkcji create_user i verify_user z pliku tableusers_insertandverify.py
-from security.encrypt import encrypt_with_user_secret # importowanie funkcji szyfrujących z pliku security/encrypt.py
+
+from db.entries_import import import_password_csv #importowanie importu wpisów z pliku CSV
+from db.vault_backup import export_vault, restore_vault #importowanie eksportu i odtwarzania kopii sejfu
+from db.storage_engine import DB_ERRORS, DB_INTEGRITY_ERRORS #importowanie krotek wyjątków bazodanowych niezależnych od silnika
+from db.tablepassword_crud import view_or_copy_password #importowanie podglądu hasła z pliku tablepassword_crud.py
+from db.tableusers_insertandverify import complete_mfa_login, create_user, verify_user #importowanie funkcji logowania i tworzenia użytkownika z pliku tableusers_insertandverify.py
+from db.vault_session import VaultSession #importowanie sesji sejfu z pliku vault_session.py
+from security.keyring import SessionKeyRing # importowanie pęku kluczy sesji z pliku security/keyring.py
 from security.hashing import hash_password
 
 
@@ -61,19 +60,19 @@ def register_user() -> None: # rejestruje nowego uzytkownika w bazie
         print(
             "\n[!] Brak klucza aplikacji w config/key.json. Skontaktuj się z administratorem.\n"
         )
-    except pyodbc.IntegrityError:
+    except DB_INTEGRITY_ERRORS:
         print("\n[!] Użytkownik o podanym loginie już istnieje.\n")
-    except pyodbc.Error as exc:
+    except DB_ERRORS as exc:
         print(f"\n[!] Błąd podczas rejestracji: {exc}.\n")
     else:
         print("\n[+] Użytkownik został zarejestrowany pomyślnie.\n")
 
 
-def show_user_entries(user_id: int) -> None: # wyswietla liste hasel uzytkownika
+def show_user_entries(vault: VaultSession) -> None: # wyswietla liste hasel uzytkownika
     """Wyświetla listę zapisanych haseł użytkownika."""
     try:
-        entries = list_password_entries(user_id=user_id)
-    except pyodbc.Error as exc:
+        entries = vault.list()
+    except DB_ERRORS as exc:
         print(f"\n[!] Błąd podczas pobierania haseł: {exc}.\n")
         return
 
@@ -81,7 +80,30 @@ def show_user_entries(user_id: int) -> None: # wyswietla liste hasel uzytkownika
         print("\n[-] Brak zapisanych haseł.\n")
         return
 
-    print("\nZapisane hasła:")
+    _print_entries("Zapisane hasła:", entries)
+
+
+def search_user_entries(vault: VaultSession) -> None: # wyszukuje hasla po poczatku uslugi lub loginu
+    """Wyświetla wpisy, których usługa lub login zaczyna się od podanego tekstu."""
+    prefix = input("Początek nazwy usługi lub loginu: ").strip()
+    if not prefix:
+        print("\n[!] Nie podano tekstu do wyszukania.\n")
+        return
+    try:
+        entries = vault.search(prefix)
+    except DB_ERRORS as exc:
+        print(f"\n[!] Błąd podczas wyszukiwania haseł: {exc}.\n")
+        return
+
+    if not entries:
+        print("\n[-] Brak pasujących haseł.\n")
+        return
+
+    _print_entries(f"Wyniki wyszukiwania \"{prefix}\":", entries)
+
+
+def _print_entries(title: str, entries) -> None: # wyswietla tabele wpisow
+    print(f"\n{title}")
     print("-" * 60)
     print(f"{'ID':<6} {'Usługa':<20} {'Login':<20} {'Wygasa':<12}")
     print("-" * 60)
@@ -102,33 +124,60 @@ def login_user() -> None: # loguje uzytkownika i obsluguje panel po zalogowaniu
 
     try:
         verification = verify_user(login=login, password=password)
-    except pyodbc.Error as exc:
+    except DB_ERRORS as exc:
         print(f"\n[!] Błąd podczas logowania: {exc}.\n")
         return
 
-    if verification.status == "mfa_required":
+    ticket = verification.ticket if verification.status == "mfa_required" else None
+    while ticket: #drugi krok - tylko kod TOTP, hasło sprawdzone już raz
         mfa_code = input("Kod MFA: ").strip()
         if not mfa_code:
             print("\n[!] Kod MFA jest wymagany.\n")
             return
         try:
-            verification = verify_user(login=login, password=password, mfa_code=mfa_code)
-        except pyodbc.Error as exc:
+            verification = complete_mfa_login(ticket, mfa_code)
+        except DB_ERRORS as exc:
             print(f"\n[!] Błąd podczas weryfikacji MFA: {exc}.\n")
             return
+        ticket = verification.ticket #ustawiony tylko, gdy po błędnym kodzie można spróbować ponownie
+        if ticket:
+            print("\n[!] Nieprawidłowy kod MFA. Spróbuj ponownie.\n")
+
+    if verification.status == "expired":
+        print("\n[!] Czas na podanie kodu MFA minął. Zaloguj się ponownie.\n")
+        return
 
     if verification.status == "locked":
         print("\n[!] Konto jest zablokowane. Skontaktuj się z administratorem.\n")
         return
 
+    if verification.status == "migration_pending":
+        print("\n[!] Przenoszenie wpisów konta nie zostało zakończone. Zaloguj się ponownie lub skontaktuj się z administratorem.\n")
+        return
+
     if verification.status in {"invalid", "mfa_invalid"} or verification.user_id is None:
         print("\n[!] Nieprawidłowy login, hasło lub kod MFA.\n")
         return
 
     user_id, user_login = verification.user_id, verification.login or login
-    user_secret = password
+    keyring = SessionKeyRing(verification.data_key) #wpisy szyfrowane są kluczem danych użytkownika (wyprowadzonym raz na sesję), nie hasłem
     print("\n[+] Logowanie zakończone sukcesem.\n")
 
+    try: #sesja sejfu - jedno połączenie i nazwa tabeli na cały czas logowania
+        vault = VaultSession(user_id)
+    except DB_ERRORS as exc:
+        print(f"\n[!] Błąd podczas otwierania sejfu: {exc}.\n")
+        return
+    try:
+        _user_panel(vault, user_login, keyring)
+    finally:
+        vault.close() #oddanie połączenia do puli po wylogowaniu
+        keyring.clear() #usunięcie klucza szyfrowania po wylogowaniu
+
+
+def _user_panel(vault: VaultSession, user_login: str, keyring: SessionKeyRing) -> None: # obsluguje panel uzytkownika po zalogowaniu
+    """Menu operacji na hasłach zalogowanego użytkownika."""
+    user_id = vault.user_id
     while True:
         print("-" * 40)
         print(f"Panel użytkownika: {user_login}")
@@ -138,6 +187,10 @@ def login_user() -> None: # loguje uzytkownika i obsluguje panel po zalogowaniu
         print("3. Podgląd lub kopiowanie hasła")
         print("4. Edytuj hasło")
         print("5. Usuń hasło")
+        print("6. Importuj hasła z pliku CSV (Chrome, Firefox, Bitwarden, KeePass)")
+        print("7. Zapisz zaszyfrowaną kopię sejfu do pliku")
+        print("8. Odtwórz wpisy z kopii sejfu")
+        print("9. Wyszukaj hasło po usłudze lub loginie")
         print("Q. Wyloguj")
 
         choice = input("\nWybierz opcję: ").strip()
@@ -170,17 +223,14 @@ def login_user() -> None: # loguje uzytkownika i obsluguje panel po zalogowaniu
                     continue
 
             try:
-                encrypted_password = encrypt_with_user_secret(
-                    account_password, user_secret
-                ).encode("ascii")
-                add_password_entry(
-                    user_id=user_id,
+                encrypted_password = keyring.encrypt(account_password).encode("ascii")
+                vault.add(
                     service=service,
                     account_login=account_login,
                     account_password=encrypted_password,
                     expire_date=expire_date,
                 )
-            except pyodbc.Error as exc:
+            except DB_ERRORS as exc:
                 print(f"\n[!] Błąd podczas zapisywania hasła: {exc}.\n")
             except ValueError as exc:
                 print(f"\n[!] {exc}.\n")
@@ -188,13 +238,13 @@ def login_user() -> None: # loguje uzytkownika i obsluguje panel po zalogowaniu
                 print("\n[+] Hasło zostało dodane.\n")
 
         elif choice == "2":
-            show_user_entries(user_id)
+            show_user_entries(vault)
 
         elif choice == "3":
-            view_or_copy_password(user_id, user_secret)
+            view_or_copy_password(user_id, keyring, vault=vault)
 
         elif choice == "4":
-            show_user_entries(user_id)
+            show_user_entries(vault)
             entry_raw = input("Podaj ID wpisu do edycji: ").strip()
             if not entry_raw.isdigit():
                 print("\n[!] Nieprawidłowe ID.\n")
@@ -217,9 +267,7 @@ def login_user() -> None: # loguje uzytkownika i obsluguje panel po zalogowaniu
                 if not new_password:
                     print("\n[!] Hasło nie może być puste.\n")
                     continue
-                new_password_bytes = encrypt_with_user_secret(
-                    new_password, user_secret
-                ).encode("ascii")
+                new_password_bytes = keyring.encrypt(new_password).encode("ascii")
 
             expire_raw = input(
                 "Nowa data wygaśnięcia (YYYY-MM-DD) [puste - bez zmian]: "
@@ -233,15 +281,14 @@ def login_user() -> None: # loguje uzytkownika i obsluguje panel po zalogowaniu
                     continue
 
             try:
-                updated = update_password_entry(
-                    user_id=user_id,
-                    entry_id=entry_id,
+                updated = vault.update(
+                    entry_id,
                     new_service=new_service,
                     new_login=new_login,
                     new_password=new_password_bytes,
                     new_expire_date=new_expire_date,
                 )
-            except pyodbc.Error as exc:
+            except DB_ERRORS as exc:
                 print(f"\n[!] Błąd podczas edycji hasła: {exc}.\n")
             else:
                 if updated:
@@ -250,7 +297,7 @@ def login_user() -> None: # loguje uzytkownika i obsluguje panel po zalogowaniu
                     print("\n[-] Nie znaleziono wpisu o podanym ID.\n")
 
         elif choice == "5":
-            show_user_entries(user_id)
+            show_user_entries(vault)
             entry_raw = input("Podaj ID wpisu do usunięcia: ").strip()
             if not entry_raw.isdigit():
                 print("\n[!] Nieprawidłowe ID.\n")
@@ -265,8 +312,8 @@ def login_user() -> None: # loguje uzytkownika i obsluguje panel po zalogowaniu
                 continue
 
             try:
-                deleted = delete_password_entry(user_id=user_id, entry_id=entry_id)
-            except pyodbc.Error as exc:
+                deleted = vault.delete(entry_id)
+            except DB_ERRORS as exc:
                 print(f"\n[!] Błąd podczas usuwania hasła: {exc}.\n")
             else:
                 if deleted:
@@ -274,6 +321,58 @@ def login_user() -> None: # loguje uzytkownika i obsluguje panel po zalogowaniu
                 else:
                     print("\n[-] Nie znaleziono wpisu o podanym ID.\n")
 
+        elif choice == "6":
+            csv_path = input("Ścieżka do pliku CSV: ").strip().strip('"')
+            if not csv_path:
+                print("\n[!] Nie podano ścieżki do pliku.\n")
+                continue
+
+            def report(fraction: float) -> None: #postęp importu w jednej linii
+                print(f"\r[i] Import: {fraction:.0%}", end="", flush=True)
+
+            try:
+                result = import_password_csv(user_id, keyring, csv_path, progress=report)
+            except (OSError, UnicodeDecodeError) as exc:
+                print(f"\n[!] Nie można odczytać pliku: {exc}.\n")
+            except DB_ERRORS as exc:
+                print(f"\n[!] Błąd podczas importu haseł: {exc}.\n")
+            except ValueError as exc:
+                print(f"\n[!] {exc}\n")
+            else:
+                print(f"\n[+] Zaimportowano {result.imported} wpisów (format: {result.layout}).")
+                if result.rejected:
+                    print(f"[-] Odrzucono {result.rejected} wierszy - szczegóły w pliku {result.rejected_path}.")
+                print()
+
+        elif choice in ("7", "8"):
+            backup_path = input("Ścieżka do pliku kopii: ").strip().strip('"')
+            if not backup_path:
+                print("\n[!] Nie podano ścieżki do pliku.\n")
+                continue
+
+            def report(fraction: float) -> None: #postęp kopii w jednej linii
+                print(f"\r[i] Postęp: {fraction:.0%}", end="", flush=True)
+
+            try:
+                if choice == "7":
+                    count = export_vault(user_id, keyring, backup_path, progress=report)
+                else:
+                    count = restore_vault(user_id, keyring, backup_path, progress=report)
+            except OSError as exc:
+                print(f"\n[!] Błąd dostępu do pliku: {exc}.\n")
+            except DB_ERRORS as exc:
+                print(f"\n[!] Błąd bazy danych: {exc}.\n")
+            except ValueError as exc:
+                print(f"\n[!] {exc}\n")
+            else:
+                if choice == "7":
+                    print(f"\n[+] Zapisano kopię sejfu ({count} wpisów).\n")
+                else:
+                    print(f"\n[+] Odtworzono {count} wpisów z kopii.\n")
+
+        elif choice == "9":
+            search_user_entries(vault)
+
         elif choice.upper() == "Q":
             print("\n[-] Wylogowano użytkownika.\n")
             break
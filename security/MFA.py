@@ -7,8 +7,7 @@ przechowywania sekretów w bazie danych.
 
 import pyotp
 
-from .decrypt import decrypt_with_user_secret
-from .encrypt import encrypt_with_user_secret
+from .keyring import SessionKeyRing, session_key_ring
 
 
 def generate_mfa_secret() -> str: # generuje sekret MFA
@@ -24,14 +23,14 @@ def build_provisioning_uri(login: str, secret: str, *, issuer: str = "Password M
     return totp.provisioning_uri(name=login, issuer_name=issuer)
 
 
-def encrypt_mfa_secret(secret: str, user_secret: str) -> bytes: # szyfruje sekret MFA
-    """Szyfruje sekret MFA wykorzystując hasło użytkownika."""
+def encrypt_mfa_secret(secret: str, user_secret: SessionKeyRing | str | bytes) -> bytes: # szyfruje sekret MFA
+    """Szyfruje sekret MFA pękiem kluczy sesji lub kluczem danych (w starszych kontach - hasłem) użytkownika."""
 
-    encrypted = encrypt_with_user_secret(secret, user_secret)
+    encrypted = session_key_ring(user_secret).encrypt(secret)
     return encrypted.encode("ascii")
 
 
-def decrypt_mfa_secret(encrypted_secret: bytes, user_secret: str) -> str: # odszyfrowuje sekret MFA
+def decrypt_mfa_secret(encrypted_secret: bytes, user_secret: SessionKeyRing | str | bytes) -> str: # odszyfrowuje sekret MFA
     """Deszyfruje sekret MFA zapisany w bazie."""
 
     if isinstance(encrypted_secret, memoryview):
@@ -39,7 +38,7 @@ def decrypt_mfa_secret(encrypted_secret: bytes, user_secret: str) -> str: # odsz
     if isinstance(encrypted_secret, bytearray):
         encrypted_secret = bytes(encrypted_secret)
     token = encrypted_secret.decode("ascii") if isinstance(encrypted_secret, bytes) else str(encrypted_secret)
-    return decrypt_with_user_secret(token, user_secret).decode("utf-8")
+    return session_key_ring(user_secret).decrypt(token).decode("utf-8")
 
 
 def verify_mfa_code(secret: str, code: str) -> bool: # weryfikuje kod MFA
@@ -0,0 +1,103 @@
+"""Klucz danych użytkownika (envelope encryption).
+
+Wpisy sejfu i sekret MFA są szyfrowane losowym, 32-bajtowym kluczem danych
+użytkownika, a nie bezpośrednio jego hasłem. W bazie (``dbo.users.data_key``)
+klucz danych przechowywany jest w postaci opakowanej kluczem wyprowadzonym
+z hasła głównego - zmiana hasła wymaga więc jedynie ponownego opakowania
+jednego klucza zamiast ponownego szyfrowania wszystkich wpisów.
+
+Opakowany klucz zapisywany jest w wersjonowanym formacie:
+- ``dk1$<AES-EAX>`` - klucz opakowujący ``sha256`` z hasła (starszy format),
+- ``dk2$<parametry KDF>$<AES-EAX>`` - klucz opakowujący ``scrypt`` z solą
+  i kosztem użytkownika (``security/kdf.py``).
+Klucze w starszym formacie lub o koszcie innym niż bieżąca polityka są
+opakowywane ponownie przy najbliższym poprawnym logowaniu
+(:func:`unwrap_data_key_and_upgrade`) - wpisy sejfu nie są przy tym zmieniane.
+
+Po odpakowaniu przy logowaniu z klucza danych tworzony jest pęk kluczy sesji
+(:class:`security.keyring.SessionKeyRing`), używany w miejsce hasła użytkownika.
+
+Zawiera funkcje:
+- generate_data_key(): Losuje nowy klucz danych.
+- wrap_data_key(): Opakowuje klucz danych kluczem wyprowadzonym z hasła.
+- unwrap_data_key(): Odpakowuje klucz danych przy użyciu hasła.
+- unwrap_data_key_and_upgrade(): Odpakowuje klucz danych i w razie potrzeby opakowuje go ponownie według bieżącej polityki KDF.
+"""
+
+import hashlib # do wyprowadzenia klucza opakowującego z hasła
+import secrets # do losowania klucza danych
+
+from .decrypt import _aes_decrypt # odszyfrowanie AES-EAX
+from .encrypt import _aes_encrypt # szyfrowanie AES-EAX
+from .kdf import KdfParams, derive_key, format_kdf_params, load_kdf_params, new_kdf_params, parse_kdf_params # KDF scrypt
+
+DATA_KEY_SIZE = 32 # długość klucza danych w bajtach
+_WRAPPED_PREFIX = b"dk1$" # starszy format - klucz opakowujący sha256(hasło)
+_WRAPPED_PREFIX_KDF = b"dk2$" # klucz opakowujący scrypt z parametrami użytkownika
+
+
+def _derive_wrapping_key(password: str | bytes) -> bytes: # klucz opakowujący (KEK) z hasła
+    """Wyprowadza klucz opakowujący, odseparowany od klucza ``sha256(hasło)`` starszych wpisów."""
+
+    password_bytes = password.encode("utf-8") if isinstance(password, str) else password
+    return hashlib.sha256(b"password-manager:data-key-wrap:" + password_bytes).digest()
+
+
+def generate_data_key() -> bytes: # losuje nowy klucz danych
+    """Zwraca nowy losowy klucz danych użytkownika."""
+
+    return secrets.token_bytes(DATA_KEY_SIZE)
+
+
+def wrap_data_key(data_key: bytes, password: str | bytes, *, params: KdfParams | None = None) -> bytes: # opakowuje klucz danych
+    """Szyfruje klucz danych kluczem ``scrypt`` z hasła; wynik trafia do ``dbo.users.data_key``.
+
+    Bez ``params`` używana jest bieżąca polityka z ``config/security.json``
+    i nowa losowa sól.
+    """
+
+    params = params if params is not None else new_kdf_params()
+    token = _aes_encrypt(data_key, derive_key(password, params))
+    return _WRAPPED_PREFIX_KDF + f"{format_kdf_params(params)}${token}".encode("ascii")
+
+
+def _split_wrapped(wrapped: bytes) -> tuple[KdfParams | None, str]: # parametry KDF (None dla dk1$) i szyfrogram klucza
+    try:
+        if wrapped.startswith(_WRAPPED_PREFIX_KDF):
+            params_text, token = wrapped[len(_WRAPPED_PREFIX_KDF):].decode("ascii").rsplit("$", 1)
+            return parse_kdf_params(params_text), token
+        if wrapped.startswith(_WRAPPED_PREFIX):
+            return None, wrapped[len(_WRAPPED_PREFIX):].decode("ascii")
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Nieprawidłowy format klucza danych użytkownika.") from exc
+    raise ValueError("Nieznany format klucza danych użytkownika.")
+
+
+def unwrap_data_key(wrapped: bytes, password: str | bytes) -> bytes: # odpakowuje klucz danych
+    """Odszyfrowuje klucz danych; zgłasza ``ValueError`` przy błędnym haśle lub formacie."""
+
+    params, token = _split_wrapped(wrapped)
+    wrapping_key = _derive_wrapping_key(password) if params is None else derive_key(password, params)
+    try:
+        data_key = _aes_decrypt(token, wrapping_key)
+    except ValueError as exc:
+        raise ValueError("Nie można odszyfrować klucza danych użytkownika.") from exc
+    if len(data_key) != DATA_KEY_SIZE:
+        raise ValueError("Nieprawidłowa długość klucza danych użytkownika.")
+    return data_key
+
+
+def unwrap_data_key_and_upgrade(wrapped: bytes, password: str | bytes) -> tuple[bytes, bytes | None]: # odpakowuje i w razie potrzeby opakowuje ponownie
+    """Zwraca ``(klucz_danych, nowe_opakowanie)``.
+
+    ``nowe_opakowanie`` jest różne od ``None``, gdy klucz zapisany jest
+    w starszym formacie ``dk1$`` lub z kosztem innym niż bieżąca polityka
+    i należy go zastąpić (klucz danych - a więc i wpisy - się nie zmienia).
+    """
+
+    data_key = unwrap_data_key(wrapped, password)
+    params, _ = _split_wrapped(wrapped)
+    policy = load_kdf_params()
+    if params is not None and params.same_cost(policy):
+        return data_key, None
+    return data_key, wrap_data_key(data_key, password, params=new_kdf_params(policy))
@@ -1,13 +1,32 @@
-"""Pomocnicze funkcje do tworzenia skrótów haseł użytkowników."""
+"""Pomocnicze funkcje do tworzenia skrótów haseł użytkowników.
 
+Skróty zapisywane są w wersjonowanej kopercie::
 
+    $pm1$<schemat>$<identyfikator pieprzu>$<koszt>$<skrót bcrypt>
+
+dzięki czemu weryfikacja wie z góry, którego algorytmu użyć, i wykonuje
+dokładnie jedno sprawdzenie ``bcrypt``. Skróty bez koperty (starszy format)
+są rozpoznawane przez :func:`parse_password_hash` jako ``None``.
+
+Koszt ``bcrypt`` pochodzi z ``config/security.json`` (``bcrypt_rounds``) i może
+zostać dobrany do sprzętu przez :func:`calibrate_bcrypt_cost`.
+"""
+
+
+import hashlib
+import hmac
+import json
 import os 
+import time
 from pathlib import Path
+from typing import NamedTuple
 
 import bcrypt
 
 from .encrypt import KEY_FILE, _ensure_json_key
 
+SECURITY_CONFIG_FILE = KEY_FILE.with_name("security.json") # polityka haszowania obok key.json
+
 
 def _load_salt(key_file: str | os.PathLike[str] | None = None) -> bytes: # pobiera sol z key.json
     """Zwraca 32-bajtową sól z pliku ``key.json``.
@@ -23,11 +42,103 @@ def _load_salt(key_file: str | os.PathLike[str] | None = None) -> bytes: # pobie
     return key
 
 
+HASH_ENVELOPE_PREFIX = b"$pm1$" # znacznik wersji formatu koperty
+HASH_SCHEME_BCRYPT_PEPPER = "bcrypt-pepper" # bcrypt z hasła połączonego z kluczem z key.json
+DEFAULT_BCRYPT_ROUNDS = 15
+MIN_BCRYPT_ROUNDS = 10 # dolna granica kosztu polityki (również w kalibracji)
+MAX_BCRYPT_ROUNDS = 31 # górna granica kosztu obsługiwana przez bcrypt
+DEFAULT_TARGET_MS = 250 # docelowy czas pojedynczego haszowania w kalibracji
+
+
+class PasswordHash(NamedTuple): # rozpakowana koperta skrótu hasła
+    """Pola wersjonowanej koperty skrótu hasła."""
+
+    scheme: str
+    pepper_id: str
+    cost: int
+    digest: bytes
+
+
+def pepper_id(salt: bytes) -> str: # krótki identyfikator klucza użytego jako pieprz
+    """Zwraca identyfikator pieprzu - nie ujawnia klucza, a pozwala wykryć jego zmianę."""
+
+    return hmac.new(salt, b"password-pepper-id", hashlib.sha256).hexdigest()[:8]
+
+
+def format_password_hash(scheme: str, pepper: str, cost: int, digest: bytes) -> bytes: # buduje kopertę skrótu
+    """Zapisuje skrót ``bcrypt`` wraz z metadanymi w kopercie ``$pm1$``."""
+
+    return HASH_ENVELOPE_PREFIX + f"{scheme}${pepper}${int(cost)}$".encode("ascii") + digest
+
+
+def parse_password_hash(hashed: bytes) -> PasswordHash | None: # rozpakowuje kopertę skrótu
+    """Zwraca pola koperty lub ``None`` dla skrótu w starszym formacie (bez koperty)."""
+
+    if not hashed.startswith(HASH_ENVELOPE_PREFIX):
+        return None
+    try:
+        scheme, pepper, cost, digest = hashed[len(HASH_ENVELOPE_PREFIX):].split(b"$", 3)
+        return PasswordHash(scheme.decode("ascii"), pepper.decode("ascii"), int(cost), digest)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Nieprawidłowy format skrótu hasła.") from exc
+
+
+def load_bcrypt_rounds(config_file: str | os.PathLike[str] | None = None) -> int: # wczytuje koszt bcrypt z polityki
+    """Zwraca koszt ``bcrypt`` z ``config/security.json`` lub wartość domyślną.
+
+    Koszt spoza polityki jest sprowadzany do granic - inaczej przeliczanie
+    skrótów przy logowaniu obniżałoby koszt zapisanych haseł.
+    """
+
+    path = Path(config_file) if config_file is not None else SECURITY_CONFIG_FILE
+    try:
+        rounds = int(json.loads(path.read_text(encoding="utf-8")).get("bcrypt_rounds", DEFAULT_BCRYPT_ROUNDS))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return DEFAULT_BCRYPT_ROUNDS
+    return min(max(rounds, MIN_BCRYPT_ROUNDS), MAX_BCRYPT_ROUNDS) # granice polityki (jak w edit_security_config), nie algorytmu
+
+
+def calibrate_bcrypt_cost( # dobiera koszt bcrypt do docelowego czasu haszowania
+    target_ms: float = DEFAULT_TARGET_MS,
+    *,
+    min_rounds: int = MIN_BCRYPT_ROUNDS,
+    max_rounds: int = MAX_BCRYPT_ROUNDS,
+) -> tuple[int, float]:
+    """Mierzy szybkość ``bcrypt`` na tym komputerze i dobiera koszt.
+
+    Zwraca ``(koszt, zmierzony_czas_ms)`` - największy koszt, którego czas
+    haszowania nie przekracza ``target_ms`` (nie mniej niż ``min_rounds``).
+    Każdy kolejny koszt podwaja czas, więc pomiar zaczyna się od niskiego
+    kosztu i jest ekstrapolowany, a wybrany koszt jest mierzony ponownie.
+    """
+
+    def measure(rounds: int) -> float: # czas jednego haszowania w ms (najlepszy z prób)
+        salt = bcrypt.gensalt(rounds=rounds)
+        best = float("inf")
+        for _ in range(3 if rounds < 12 else 1):
+            start = time.perf_counter()
+            bcrypt.hashpw(b"calibration:password", salt)
+            best = min(best, (time.perf_counter() - start) * 1000.0)
+        return best
+
+    base_rounds = 8
+    base_ms = max(measure(base_rounds), 1e-3)
+    rounds = base_rounds
+    while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - base_rounds) <= target_ms:
+        rounds += 1
+    rounds = max(rounds, min_rounds)
+    elapsed = measure(rounds)
+    while rounds > min_rounds and elapsed > target_ms: # ekstrapolacja była zbyt optymistyczna
+        rounds -= 1
+        elapsed /= 2
+    return rounds, elapsed
+
+
 def hash_password( # tworzy hash hasla bcrypt
     password: str,
     *,
     key_file: str | os.PathLike[str] | None = None,
-    rounds: int = 15,
+    rounds: int | None = None,
 ) -> bytes:
     """Tworzy skrót hasła użytkownika z wykorzystaniem algorytmu ``bcrypt``.
 
@@ -38,12 +149,18 @@ def hash_password( # tworzy hash hasla bcrypt
     key_file:
         Opcjonalna ścieżka do niestandardowego pliku ``key.json`` z solą.
     rounds:
-        Liczba rund użytych do generowania soli bcrypt.
+        Liczba rund użytych do generowania soli bcrypt. Domyślnie koszt
+        z polityki w ``config/security.json`` (:func:`load_bcrypt_rounds`).
+
+    Zwraca skrót w kopercie ``$pm1$`` (zob. :func:`format_password_hash`).
     """
 
     salt = _load_salt(key_file) 
+    if rounds is None:
+        rounds = load_bcrypt_rounds()
     password_bytes = password.encode("utf-8")
     mixed_password = password_bytes + b":" + salt
     bcrypt_salt = bcrypt.gensalt(rounds=rounds)
-    return bcrypt.hashpw(mixed_password, bcrypt_salt)
+    digest = bcrypt.hashpw(mixed_password, bcrypt_salt)
+    return format_password_hash(HASH_SCHEME_BCRYPT_PEPPER, pepper_id(salt), rounds, digest)
 
@@ -0,0 +1,178 @@
+"""Wyprowadzanie klucza opakowującego klucz danych z hasła głównego (KDF).
+
+Klucz danych użytkownika (``security/data_key.py``) w pierwszej wersji opakowywany
+był kluczem ``sha256(hasło)``, który można łamać offline praktycznie bez kosztu.
+Nowe opakowania używają ``scrypt`` (funkcja kosztowna pamięciowo) z losową solą.
+Sól i parametry zapisywane są razem z opakowanym kluczem w ``dbo.users.data_key``::
+
+    scrypt$<log2 N>$<r>$<p>$<sól base64>
+
+więc każdy użytkownik ma własną sól, a zmiana polityki nie unieważnia kluczy
+opakowanych wcześniej. Koszt ``scrypt`` ponoszony jest raz - przy logowaniu;
+dalej sesja używa pęku kluczy (``security/keyring.py``).
+
+Parametry pochodzą z ``config/security.json`` (``scrypt_log_n``, ``scrypt_r``,
+``scrypt_p``) i mogą zostać dobrane do sprzętu przez :func:`calibrate_scrypt_cost`.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from .hashing import SECURITY_CONFIG_FILE
+
+KDF_SCHEME_SCRYPT = "scrypt" # identyfikator schematu w zapisie parametrów
+KDF_KEY_SIZE = 32 # długość wyprowadzanego klucza (AES-256)
+KDF_SALT_SIZE = 16 # długość losowej soli użytkownika
+DEFAULT_SCRYPT_LOG_N = 15 # N = 2^15 -> 32 MiB pamięci przy r = 8
+DEFAULT_SCRYPT_R = 8
+DEFAULT_SCRYPT_P = 1
+MIN_SCRYPT_LOG_N = 14 # dolna granica kosztu polityki (również w kalibracji)
+MAX_SCRYPT_LOG_N = 20 # górna granica kosztu (1 GiB pamięci przy r = 8)
+MAX_SCRYPT_R = 32 # górna granica rozmiaru bloku (pamięć rośnie liniowo z r)
+MAX_SCRYPT_P = 16 # górna granica równoległości (czas rośnie liniowo z p)
+DEFAULT_TARGET_MS = 250 # docelowy czas odblokowania sejfu w kalibracji
+
+
+class KdfParams(NamedTuple): # parametry wyprowadzenia klucza jednego użytkownika
+    """Schemat, koszt i sól funkcji ``scrypt``."""
+
+    scheme: str
+    log_n: int
+    r: int
+    p: int
+    salt: bytes
+
+    def same_cost(self, other: "KdfParams") -> bool: # czy koszt zgodny z inną polityką (bez porównywania soli)
+        return (self.scheme, self.log_n, self.r, self.p) == (other.scheme, other.log_n, other.r, other.p)
+
+
+def load_kdf_params(config_file: str | os.PathLike[str] | None = None) -> KdfParams: # wczytuje politykę scrypt
+    """Zwraca parametry ``scrypt`` z ``config/security.json`` (bez soli) lub wartości domyślne.
+
+    Wartości spoza polityki (np. ręcznie wpisany zbyt niski koszt) są
+    sprowadzane do granic - inaczej każde logowanie opakowywałoby klucz
+    danych słabszym kosztem.
+    """
+
+    path = Path(config_file) if config_file is not None else SECURITY_CONFIG_FILE
+    try:
+        config = json.loads(path.read_text(encoding="utf-8"))
+        log_n = int(config.get("scrypt_log_n", DEFAULT_SCRYPT_LOG_N))
+        r = int(config.get("scrypt_r", DEFAULT_SCRYPT_R))
+        p = int(config.get("scrypt_p", DEFAULT_SCRYPT_P))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return KdfParams(KDF_SCHEME_SCRYPT, DEFAULT_SCRYPT_LOG_N, DEFAULT_SCRYPT_R, DEFAULT_SCRYPT_P, b"")
+    return KdfParams(
+        KDF_SCHEME_SCRYPT,
+        min(max(log_n, MIN_SCRYPT_LOG_N), MAX_SCRYPT_LOG_N),
+        min(max(r, 1), MAX_SCRYPT_R),
+        min(max(p, 1), MAX_SCRYPT_P),
+        b"",
+    )
+
+
+def new_kdf_params(policy: KdfParams | None = None) -> KdfParams: # parametry z nową losową solą
+    """Zwraca parametry bieżącej polityki (lub ``policy``) z nową losową solą."""
+
+    policy = policy if policy is not None else load_kdf_params()
+    return policy._replace(salt=secrets.token_bytes(KDF_SALT_SIZE))
+
+
+def format_kdf_params(params: KdfParams) -> str: # zapis parametrów obok opakowanego klucza
+    """Zapisuje parametry w postaci ``scrypt$<log2 N>$<r>$<p>$<sól base64>``."""
+
+    salt = base64.b64encode(params.salt).decode("ascii")
+    return f"{params.scheme}${params.log_n}${params.r}${params.p}${salt}"
+
+
+def parse_kdf_params(text: str) -> KdfParams: # odczyt parametrów zapisanych przez format_kdf_params
+    """Odwrotność :func:`format_kdf_params`; zgłasza ``ValueError`` przy nieznanym schemacie lub formacie."""
+
+    try:
+        scheme, log_n, r, p, salt = text.split("$")
+        params = KdfParams(scheme, int(log_n), int(r), int(p), base64.b64decode(salt, validate=True))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Nieprawidłowy format parametrów KDF.") from exc
+    if params.scheme != KDF_SCHEME_SCRYPT:
+        raise ValueError(f"Nieobsługiwany schemat KDF: {params.scheme}.")
+    if ( # ochrona przed zmanipulowanym kosztem
+        not 1 <= params.log_n <= MAX_SCRYPT_LOG_N
+        or not 1 <= params.r <= MAX_SCRYPT_R
+        or not 1 <= params.p <= MAX_SCRYPT_P
+    ):
+        raise ValueError("Nieprawidłowe parametry KDF.")
+    return params
+
+
+def derive_key(password: str | bytes, params: KdfParams) -> bytes: # klucz z hasła według parametrów użytkownika
+    """Wyprowadza 32-bajtowy klucz ``scrypt`` z hasła i soli zapisanej w ``params``."""
+
+    password_bytes = password.encode("utf-8") if isinstance(password, str) else password
+    n = 1 << params.log_n
+    return hashlib.scrypt(
+        password_bytes,
+        salt=params.salt,
+        n=n,
+        r=params.r,
+        p=params.p,
+        maxmem=128 * params.r * (n + params.p + 2) + (1 << 20), # bufor V scrypt z zapasem - domyślny limit OpenSSL to 32 MiB
+        dklen=KDF_KEY_SIZE,
+    )
+
+
+def calibrate_scrypt_cost( # dobiera koszt scrypt do docelowego czasu odblokowania sejfu
+    target_ms: float = DEFAULT_TARGET_MS,
+    *,
+    r: int = DEFAULT_SCRYPT_R,
+    p: int = DEFAULT_SCRYPT_P,
+    min_log_n: int = MIN_SCRYPT_LOG_N,
+    max_log_n: int = MAX_SCRYPT_LOG_N,
+) -> tuple[int, float]:
+    """Mierzy szybkość ``scrypt`` na tym komputerze i dobiera ``log2 N``.
+
+    Zwraca ``(log2 N, zmierzony_czas_ms)`` - największy koszt, którego czas
+    wyprowadzenia nie przekracza ``target_ms`` (nie mniej niż ``min_log_n``).
+    Zwiększenie ``log2 N`` o 1 podwaja czas i pamięć, więc - jak przy bcrypt -
+    pomiar zaczyna się od niskiego kosztu i jest ekstrapolowany, a wybrany
+    koszt jest mierzony ponownie.
+    """
+
+    def measure(log_n: int) -> float: # czas jednego wyprowadzenia w ms (najlepszy z prób)
+        params = KdfParams(KDF_SCHEME_SCRYPT, log_n, r, p, secrets.token_bytes(KDF_SALT_SIZE))
+        best = float("inf")
+        for _ in range(3 if log_n < 14 else 1):
+            start = time.perf_counter()
+            derive_key(b"calibration:password", params)
+            best = min(best, (time.perf_counter() - start) * 1000.0)
+        return best
+
+    base_log_n = 12
+    base_ms = max(measure(base_log_n), 1e-3)
+    log_n = base_log_n
+    while log_n < max_log_n and base_ms * 2 ** (log_n + 1 - base_log_n) <= target_ms:
+        log_n += 1
+    log_n = max(log_n, min_log_n)
+    elapsed = measure(log_n)
+    while log_n > min_log_n and elapsed > target_ms: # ekstrapolacja była zbyt optymistyczna
+        log_n -= 1
+        elapsed /= 2
+    return log_n, elapsed
+
+
+__all__ = [
+    "DEFAULT_SCRYPT_LOG_N",
+    "KDF_SCHEME_SCRYPT",
+    "KdfParams",
+    "calibrate_scrypt_cost",
+    "derive_key",
+    "format_kdf_params",
+    "load_kdf_params",
+    "new_kdf_params",
+    "parse_kdf_params",
+]
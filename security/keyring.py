@@ -0,0 +1,89 @@
+"""Pęk kluczy sesji zalogowanego użytkownika.
+
+Klucz szyfrowania wpisów i sekretu MFA wyprowadzany jest z klucza danych użytkownika (security/data_key.py)
+jeden raz - przy logowaniu - zamiast przy każdym wywołaniu ``encrypt_with_user_secret``/``decrypt_with_user_secret``.
+Sesja (GUI, CLI) przekazuje dalej obiekt ``SessionKeyRing`` zamiast surowego klucza danych, a funkcje przyjmujące
+``user_secret`` akceptują zarówno pęk kluczy, jak i surowy sekret (np. hasło kont sprzed migracji).
+Format szyfrogramów jest taki sam jak w security/encrypt.py - pęk kluczy nie zmienia danych zapisanych w bazie.
+
+Zawiera kolejno:
+- SessionKeyRing: Klucz szyfrowania sesji z operacjami pojedynczymi i wsadowymi (encrypt_many, decrypt_many).
+- session_key_ring: Zwraca pęk kluczy dla podanego sekretu lub przekazany pęk bez zmian.
+"""
+
+from concurrent.futures import Executor # do opcjonalnego szyfrowania partii w puli wątków
+from typing import Iterable, Union # do opisu typów argumentów
+
+from .decrypt import _aes_decrypt # odszyfrowanie AES-EAX
+from .encrypt import _aes_encrypt, _ensure_user_secret_key # szyfrowanie AES-EAX i wyprowadzenie klucza z sekretu
+
+PARALLEL_MIN_ITEMS = 16 # od tylu elementów partia trafia do puli wątków (AES z pycryptodome działa poza GIL)
+
+
+class SessionKeyRing: # klucz szyfrowania wpisów jednej sesji
+    """Klucz wyprowadzony raz z sekretu użytkownika; po :meth:`clear` nie da się go już użyć."""
+
+    __slots__ = ("_key",)
+
+    def __init__(self, secret: Union[str, bytes]) -> None:
+        self._key: bytes | None = _ensure_user_secret_key(secret) # sha256 sekretu - liczone tylko tutaj
+
+    def __repr__(self) -> str: # bez klucza w logach i komunikatach błędów
+        return f"SessionKeyRing(closed={self._key is None})"
+
+    @property
+    def closed(self) -> bool: # czy klucz został już usunięty
+        return self._key is None
+
+    def _require_key(self) -> bytes:
+        key = self._key
+        if key is None:
+            raise ValueError("Sesja została zamknięta - klucz szyfrowania nie jest już dostępny.")
+        return key
+
+    def encrypt(self, data: Union[str, bytes]) -> str: # szyfruje pojedynczą wartość
+        """Zwraca szyfrogram base64 w formacie ``encrypt_with_user_secret``."""
+
+        payload = data.encode("utf-8") if isinstance(data, str) else data
+        return _aes_encrypt(payload, self._require_key())
+
+    def decrypt(self, token: str) -> bytes: # odszyfrowuje pojedynczą wartość
+        """Odwrotność :meth:`encrypt`; zgłasza ``ValueError`` przy błędnym kluczu lub uszkodzonych danych."""
+
+        return _aes_decrypt(token, self._require_key())
+
+    def encrypt_many(self, items: Iterable[Union[str, bytes]], *, executor: Executor | None = None) -> list[str]: # szyfruje partię
+        """Szyfruje partię wartości z zachowaniem kolejności.
+
+        Z ``executor`` partie od :data:`PARALLEL_MIN_ITEMS` elementów szyfrowane
+        są w puli wątków wywołującego.
+        """
+
+        key = self._require_key()
+        payloads = [data.encode("utf-8") if isinstance(data, str) else data for data in items]
+        if executor is not None and len(payloads) >= PARALLEL_MIN_ITEMS:
+            return list(executor.map(_aes_encrypt, payloads, [key] * len(payloads)))
+        return [_aes_encrypt(payload, key) for payload in payloads]
+
+    def decrypt_many(self, tokens: Iterable[str], *, executor: Executor | None = None) -> list[bytes]: # odszyfrowuje partię
+        """Odszyfrowuje partię szyfrogramów z zachowaniem kolejności; błąd dowolnego przerywa całą partię."""
+
+        key = self._require_key()
+        tokens = list(tokens)
+        if executor is not None and len(tokens) >= PARALLEL_MIN_ITEMS:
+            return list(executor.map(_aes_decrypt, tokens, [key] * len(tokens)))
+        return [_aes_decrypt(token, key) for token in tokens]
+
+    def clear(self) -> None: # usuwa klucz przy wylogowaniu
+        self._key = None
+
+
+def session_key_ring(secret: Union["SessionKeyRing", str, bytes]) -> SessionKeyRing: # pęk kluczy dla sekretu
+    """Zwraca ``secret``, jeśli jest już pękiem kluczy, albo nowy pęk wyprowadzony z surowego sekretu."""
+
+    if isinstance(secret, SessionKeyRing):
+        return secret
+    return SessionKeyRing(secret)
+
+
+__all__ = ["PARALLEL_MIN_ITEMS", "SessionKeyRing", "session_key_ring"]
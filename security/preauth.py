@@ -0,0 +1,151 @@
+"""Bilety wstępnego uwierzytelnienia (pre-auth) dla dwuetapowego logowania z MFA.
+
+Po poprawnej weryfikacji hasła (bcrypt) ``verify_user`` wydaje krótkotrwały bilet, a drugi krok
+(``complete_mfa_login``) sprawdza już tylko kod TOTP - bez ponownego, kosztownego haszowania bcrypt.
+
+Bilet ma postać ``<id>.<wygaśnięcie>.<podpis HMAC-SHA256>``. Klucz podpisu jest losowany przy starcie procesu,
+a stan biletu (użytkownik, odszyfrowany sekret MFA i klucz danych) przechowywany jest wyłącznie w pamięci procesu.
+Bilet jest jednorazowy: znika po udanym logowaniu, po wygaśnięciu lub po wyczerpaniu limitu błędnych kodów.
+"""
+
+import base64 # do kodowania podpisu biletu
+import hashlib # do funkcji skrótu HMAC
+import hmac # do podpisywania i weryfikacji biletów
+import secrets # do losowania identyfikatorów i klucza podpisu
+import threading # do synchronizacji dostępu do magazynu biletów
+import time # do wyznaczania czasu wygaśnięcia
+from typing import NamedTuple # do opisu danych biletu
+
+PREAUTH_TTL = 120.0 # czas ważności biletu w sekundach
+MAX_MFA_ATTEMPTS = 3 # liczba błędnych kodów MFA, po której bilet jest unieważniany
+
+
+class PreAuth(NamedTuple): # dane użytkownika po poprawnym sprawdzeniu hasła
+    """Stan oczekującego logowania z MFA."""
+
+    user_id: int
+    login: str
+    mfa_secret: str
+    data_key: bytes | None = None # klucz danych użytkownika odpakowany po sprawdzeniu hasła
+
+
+class PreAuthStore: # magazyn biletów pre-auth w pamięci procesu
+    """Wydaje, sprawdza i unieważnia podpisane bilety pre-auth."""
+
+    def __init__(
+        self,
+        *,
+        ttl: float = PREAUTH_TTL,
+        max_attempts: int = MAX_MFA_ATTEMPTS,
+        signing_key: bytes | None = None,
+    ) -> None:
+        self._ttl = ttl
+        self._max_attempts = max_attempts
+        self._key = signing_key or secrets.token_bytes(32)
+        self._pending: dict[str, tuple[float, PreAuth, int]] = {} # id -> (wygaśnięcie, dane, liczba błędnych kodów)
+        self._lock = threading.Lock()
+
+    def _sign(self, ticket_id: str, expires: int) -> str: # podpis HMAC identyfikatora i czasu wygaśnięcia
+        digest = hmac.new(self._key, f"{ticket_id}.{expires}".encode("ascii"), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+    def _parse(self, ticket: str) -> str | None: # zwraca id poprawnie podpisanego i ważnego biletu
+        try:
+            ticket_id, expires_raw, signature = ticket.split(".")
+            expires = int(expires_raw)
+        except (AttributeError, ValueError):
+            return None
+        if not hmac.compare_digest(signature, self._sign(ticket_id, expires)):
+            return None
+        if expires < time.time():
+            return None
+        return ticket_id
+
+    def _purge_locked(self, now: float) -> None: # usuwa wygasłe bilety (wywoływane pod blokadą)
+        expired = [key for key, (expires, _, _) in self._pending.items() if expires < now]
+        for key in expired:
+            del self._pending[key]
+
+    def issue(self, user_id: int, login: str, mfa_secret: str, data_key: bytes | None = None) -> str: # wydaje nowy bilet
+        now = time.time()
+        ticket_id = secrets.token_urlsafe(16)
+        expires = int(now + self._ttl)
+        with self._lock:
+            self._purge_locked(now)
+            self._pending[ticket_id] = (expires, PreAuth(int(user_id), login, mfa_secret, data_key), 0)
+        return f"{ticket_id}.{expires}.{self._sign(ticket_id, expires)}"
+
+    def peek(self, ticket: str) -> PreAuth | None: # zwraca dane ważnego biletu bez jego zużycia
+        ticket_id = self._parse(ticket)
+        if ticket_id is None:
+            return None
+        with self._lock:
+            entry = self._pending.get(ticket_id)
+        return entry[1] if entry is not None else None
+
+    def consume(self, ticket: str) -> PreAuth | None: # zużywa bilet - tylko pierwsze wywołanie zwraca dane
+        ticket_id = self._parse(ticket)
+        if ticket_id is None:
+            return None
+        with self._lock:
+            entry = self._pending.pop(ticket_id, None)
+        return entry[1] if entry is not None else None
+
+    def record_failure(self, ticket: str) -> bool: # zlicza błędny kod; zwraca True, jeśli bilet nadal jest ważny
+        ticket_id = self._parse(ticket)
+        if ticket_id is None:
+            return False
+        with self._lock:
+            entry = self._pending.get(ticket_id)
+            if entry is None:
+                return False
+            expires, pending, failures = entry
+            failures += 1
+            if failures >= self._max_attempts:
+                del self._pending[ticket_id]
+                return False
+            self._pending[ticket_id] = (expires, pending, failures)
+            return True
+
+    def discard(self, ticket: str) -> None: # unieważnia bilet
+        ticket_id = self._parse(ticket)
+        if ticket_id is None:
+            return
+        with self._lock:
+            self._pending.pop(ticket_id, None)
+
+
+_STORE = PreAuthStore() # magazyn współdzielony w obrębie procesu
+
+
+def issue_preauth_ticket(user_id: int, login: str, mfa_secret: str, data_key: bytes | None = None) -> str: # wydaje bilet po poprawnym haśle
+    return _STORE.issue(user_id, login, mfa_secret, data_key)
+
+
+def peek_preauth_ticket(ticket: str) -> PreAuth | None: # sprawdza bilet bez zużycia
+    return _STORE.peek(ticket)
+
+
+def consume_preauth_ticket(ticket: str) -> PreAuth | None: # zużywa bilet
+    return _STORE.consume(ticket)
+
+
+def record_preauth_failure(ticket: str) -> bool: # zlicza błędny kod MFA dla biletu
+    return _STORE.record_failure(ticket)
+
+
+def discard_preauth_ticket(ticket: str) -> None: # unieważnia bilet
+    _STORE.discard(ticket)
+
+
+__all__ = [
+    "MAX_MFA_ATTEMPTS",
+    "PREAUTH_TTL",
+    "PreAuth",
+    "PreAuthStore",
+    "consume_preauth_ticket",
+    "discard_preauth_ticket",
+    "issue_preauth_ticket",
+    "peek_preauth_ticket",
+    "record_preauth_failure",
+]
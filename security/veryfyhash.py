@@ -1,28 +1,91 @@
-"""Funkcje do weryfikacji skrótów ``bcrypt``."""
+"""Funkcje do weryfikacji skrótów ``bcrypt``.
+
+Skróty w kopercie ``$pm1$`` (zob. ``hashing.py``) weryfikowane są dokładnie
+jednym wywołaniem ``bcrypt.checkpw``. Tylko skróty w starszym formacie, bez
+koperty, mogą wymagać drugiego sprawdzenia (bez pieprzu) - po udanym
+logowaniu są one zastępowane skrótem w nowym formacie. Tak samo zastępowane
+są skróty, których koszt różni się od bieżącej polityki (``config/security.json``).
+Samo sprawdzenie (:func:`verify_password`) nigdy nie wylicza nowego skrótu.
+"""
 
 
 import os #biblioteka OS do obsługi plików na komputerze 
 
 import bcrypt #biblioteka na bcrypt odpowiedzialna za hashowanie
 
-from .hashing import _load_salt #   
+from .hashing import ( #funkcje i stałe koperty skrótu
+    HASH_SCHEME_BCRYPT_PEPPER,
+    _load_salt,
+    format_password_hash,
+    hash_password,
+    load_bcrypt_rounds,
+    parse_password_hash,
+    pepper_id,
+)
 
 
-def verify_password( # weryfikuje haslo uzytkownika wzgledem hasha bcrypt
+def _check_password( # sprawdza haslo i ustala, czy zapisany skrot wymaga zastapienia
     password: str,
     hashed: bytes,
-    *,
-    key_file: str | os.PathLike[str] | None = None,
-) -> bool:
-    """Sprawdza zgodność hasła w postaci jawnej ze skrótem ``bcrypt``."""
+    key_file: str | os.PathLike[str] | None,
+) -> tuple[bool, bytes | None, bool]:
+    """Zwraca ``(czy_poprawne, skrót_w_kopercie, czy_przeliczyć)`` bez wyliczania nowego skrótu ``bcrypt``.
+
+    ``skrót_w_kopercie`` to zapisany skrót w starszym formacie opakowany
+    w kopertę (gdy wystarczy dodać kopertę), a ``czy_przeliczyć`` oznacza,
+    że skrót trzeba wyliczyć od nowa (inny koszt lub brak pieprzu).
+    """
 
     try:
         salt = _load_salt(key_file)
         password_bytes = password.encode("utf-8")
         mixed_password = password_bytes + b":" + salt
-        if bcrypt.checkpw(mixed_password, hashed):
-            return True
+        envelope = parse_password_hash(hashed)
+        if envelope is not None: # nowy format - dokładnie jedno sprawdzenie
+            if envelope.scheme != HASH_SCHEME_BCRYPT_PEPPER or envelope.pepper_id != pepper_id(salt):
+                return False, None, False # nieznany schemat lub inny klucz w key.json - bcrypt nie może się zgadzać
+            if not bcrypt.checkpw(mixed_password, envelope.digest):
+                return False, None, False
+            return True, None, envelope.cost != load_bcrypt_rounds() # polityka kosztu zmieniona - przeliczenie przy logowaniu
+
+        if bcrypt.checkpw(mixed_password, hashed): # starszy format z pieprzem - wystarczy dodać kopertę
+            cost = int(hashed.split(b"$")[2])
+            if cost != load_bcrypt_rounds():
+                return True, None, True
+            return True, format_password_hash(HASH_SCHEME_BCRYPT_PEPPER, pepper_id(salt), cost, hashed), False
         # Zgodnosc wsteczna dla haszy utworzonych bez dodatkowego mieszania soli.
-        return bcrypt.checkpw(password_bytes, hashed)
-    except (ValueError, FileNotFoundError):
-        return False
+        if bcrypt.checkpw(password_bytes, hashed):
+            return True, None, True
+        return False, None, False
+    except (ValueError, IndexError, FileNotFoundError):
+        return False, None, False
+
+
+def verify_password_and_upgrade( # weryfikuje haslo i zwraca ewentualny skrot w nowym formacie
+    password: str,
+    hashed: bytes,
+    *,
+    key_file: str | os.PathLike[str] | None = None,
+) -> tuple[bool, bytes | None]:
+    """Sprawdza hasło; zwraca ``(czy_poprawne, nowy_skrót)``.
+
+    ``nowy_skrót`` jest różny od ``None`` tylko dla poprawnego hasła, gdy
+    zapisany skrót jest w starszym formacie lub ma inny koszt niż bieżąca
+    polityka i należy go zastąpić.
+    """
+
+    password_ok, enveloped, rehash = _check_password(password, hashed, key_file)
+    if rehash: # nowy skrót wyliczany tylko tutaj - wywołujący go zapisze
+        return True, hash_password(password, key_file=key_file, rounds=load_bcrypt_rounds())
+    return password_ok, enveloped
+
+
+def verify_password( # weryfikuje haslo uzytkownika wzgledem hasha bcrypt
+    password: str,
+    hashed: bytes,
+    *,
+    key_file: str | os.PathLike[str] | None = None,
+) -> bool:
+    """Sprawdza zgodność hasła w postaci jawnej ze skrótem ``bcrypt`` (bez przeliczania skrótu)."""
+
+    return _check_password(password, hashed, key_file)[0]
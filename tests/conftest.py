@@ -0,0 +1,37 @@
+"""Wspólne fikstury testów - każda baza to osobny plik SQLite w katalogu tymczasowym."""
+
+import json
+
+import pytest
+
+from db.db_connection import close_all_pools
+from db.tableusers_insertandverify import create_user
+import security.kdf
+
+
+@pytest.fixture
+def db_config(tmp_path): #plik konfiguracyjny silnika SQLite dla jednego testu
+    config_path = tmp_path / "db_config.json"
+    config_path.write_text(
+        json.dumps({"engine": "sqlite", "sqlite_path": str(tmp_path / "password_manager.sqlite"), "timeout": 5}),
+        encoding="utf-8",
+    )
+    yield str(config_path)
+    close_all_pools() #pule buforowane są według ścieżki konfiguracji
+
+
+@pytest.fixture
+def make_user(db_config): #tworzy konta w bazie testu (skrót hasła nie jest sprawdzany)
+    def make(login: str) -> int:
+        return create_user(login, b"test-hash", config_path=db_config)
+
+    return make
+
+
+@pytest.fixture
+def low_kdf_cost(tmp_path, monkeypatch): #tania polityka scrypt zamiast config/security.json (poniżej minimum produkcyjnego)
+    policy_path = tmp_path / "security.json"
+    policy_path.write_text(json.dumps({"scrypt_log_n": 10, "scrypt_r": 8, "scrypt_p": 1}), encoding="utf-8")
+    monkeypatch.setattr(security.kdf, "SECURITY_CONFIG_FILE", policy_path)
+    monkeypatch.setattr(security.kdf, "MIN_SCRYPT_LOG_N", 10)
+    return policy_path
@@ -0,0 +1,66 @@
+"""Opakowanie klucza danych - przejście z formatu dk1$ (sha256) na dk2$ (scrypt)."""
+
+import json
+
+import pytest
+
+from security.data_key import (
+    _WRAPPED_PREFIX,
+    _derive_wrapping_key,
+    generate_data_key,
+    unwrap_data_key,
+    unwrap_data_key_and_upgrade,
+    wrap_data_key,
+)
+from security.encrypt import _aes_encrypt
+from security.kdf import MIN_SCRYPT_LOG_N, load_kdf_params, parse_kdf_params
+
+
+def _legacy_wrap(data_key: bytes, password: str) -> bytes: #opakowanie zapisywane przez starsze wersje
+    return _WRAPPED_PREFIX + _aes_encrypt(data_key, _derive_wrapping_key(password)).encode("ascii")
+
+
+def test_dk1_is_rewrapped_with_scrypt(low_kdf_cost):
+    data_key = generate_data_key()
+    legacy = _legacy_wrap(data_key, "master")
+
+    unwrapped, rewrapped = unwrap_data_key_and_upgrade(legacy, "master")
+
+    assert unwrapped == data_key
+    assert rewrapped is not None and rewrapped.startswith(b"dk2$scrypt$")
+    params = parse_kdf_params(rewrapped[len(b"dk2$"):].decode("ascii").rsplit("$", 1)[0])
+    assert params.same_cost(load_kdf_params())
+    assert unwrap_data_key(rewrapped, "master") == data_key #ten sam klucz danych - wpisy bez zmian
+    assert unwrap_data_key_and_upgrade(rewrapped, "master") == (data_key, None)
+
+
+def test_dk2_is_rewrapped_when_policy_cost_changes(low_kdf_cost):
+    data_key = generate_data_key()
+    wrapped = wrap_data_key(data_key, "master")
+    low_kdf_cost.write_text(json.dumps({"scrypt_log_n": 11, "scrypt_r": 8, "scrypt_p": 1}), encoding="utf-8")
+
+    unwrapped, rewrapped = unwrap_data_key_and_upgrade(wrapped, "master")
+
+    assert unwrapped == data_key
+    assert rewrapped is not None and rewrapped.startswith(b"dk2$scrypt$11$8$1$")
+
+
+def test_wrong_password_and_tampered_cost_are_rejected(low_kdf_cost):
+    data_key = generate_data_key()
+    wrapped = wrap_data_key(data_key, "master")
+
+    with pytest.raises(ValueError):
+        unwrap_data_key(_legacy_wrap(data_key, "master"), "other")
+    with pytest.raises(ValueError):
+        unwrap_data_key(wrapped, "other")
+    with pytest.raises(ValueError): #koszt ponad limit nie jest wyprowadzany
+        unwrap_data_key(wrapped.replace(b"$10$8$1$", b"$10$64$1$", 1), "master")
+
+
+def test_policy_below_minimum_is_raised_to_minimum(tmp_path):
+    policy_path = tmp_path / "security.json"
+    policy_path.write_text(json.dumps({"scrypt_log_n": 10, "scrypt_r": 0, "scrypt_p": 99}), encoding="utf-8")
+
+    params = load_kdf_params(policy_path)
+
+    assert (params.log_n, params.r, params.p) == (MIN_SCRYPT_LOG_N, 1, 16)
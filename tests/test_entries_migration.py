@@ -0,0 +1,114 @@
+"""Migracja tabel per użytkownik do dbo.entries - przełączenie i obsługa niezgodności."""
+
+from db.db_connection import get_pool
+from db.entries_migration import MIGRATED_SUFFIX, migrate_user_store, retry_mismatched, run_migration
+from db.schema_registry import schema_scope
+from db.tablepassword_creation import ensure_entries_table
+
+
+def _query(config_path: str, sql: str, params: tuple = ()) -> list: #odczyt pomocniczy na osobnym połączeniu
+    pool = get_pool(config_path)
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        pool.engine.use_database(cur, "password_manager")
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        conn.commit()
+        cur.close()
+    return rows
+
+
+def _table_exists(config_path: str, table: str) -> bool: #czy tabela istnieje w bazie testu
+    pool = get_pool(config_path)
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        pool.engine.use_database(cur, "password_manager")
+        exists = pool.engine.table_exists(cur, table)
+        cur.close()
+    return exists
+
+
+def _create_legacy_store(config_path: str, login: str, user_id: int, count: int) -> str: #tabela w starym układzie z ``count`` wpisami
+    ensure_entries_table(config_path=config_path)
+    table = f"{login} entries"
+    quoted = get_pool(config_path).engine.quote_table(table)
+    _query(
+        config_path,
+        f"""
+        CREATE TABLE {quoted} (
+            id INTEGER PRIMARY KEY, user_id INTEGER, service TEXT, login TEXT, password BLOB,
+            created_at DATETIME, updated_at DATETIME, expire_date DATETIME
+        )
+        """,
+    )
+    for i in range(count):
+        _query(
+            config_path,
+            f"INSERT INTO {quoted} (user_id, service, login, password, created_at, updated_at, expire_date)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_id, f"svc{i}", "login", f"token{i}".encode("ascii"), "2020-01-01 00:00:00", "2020-01-02 00:00:00", None),
+        )
+    return table
+
+
+def _migrate(config_path: str, table: str, user_id: int, *, progress=None): #migracja jednej tabeli na połączeniu z puli
+    pool = get_pool(config_path)
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        pool.engine.use_database(cur, "password_manager")
+        cur.close()
+        return migrate_user_store(
+            conn, pool.engine, table, user_id,
+            scope=schema_scope(config_path, "password_manager"), batch_size=4, progress=progress,
+        )
+
+
+def test_cut_over_copies_rows_and_renames_source(db_config, make_user):
+    owner = make_user("bob")
+    table = _create_legacy_store(db_config, "bob", owner, 10)
+
+    results = run_migration(config_path=db_config, batch_size=4)
+
+    assert [(r.user_id, r.source_table, r.status, r.copied_rows) for r in results] == [(owner, table, "done", 10)]
+    assert _query(db_config, "SELECT COUNT(*) FROM dbo.entries WHERE user_id = ?", (owner,))[0][0] == 10
+    assert _query(db_config, "SELECT status, copied_rows FROM dbo.entries_migration WHERE user_id = ?", (owner,)) == [("done", 10)]
+    assert _table_exists(db_config, table + MIGRATED_SUFFIX) and not _table_exists(db_config, table)
+    assert run_migration(config_path=db_config) == [] #nic więcej do przeniesienia
+
+
+def test_mismatch_discards_copy_and_next_run_recopies(db_config, make_user):
+    owner = make_user("bob")
+    table = _create_legacy_store(db_config, "bob", owner, 10)
+    quoted = get_pool(db_config).engine.quote_table(table)
+    edited = []
+
+    def edit_copied_row(_fraction): #zmiana już skopiowanego wiersza źródła w trakcie migracji
+        if not edited:
+            edited.append(True)
+            _query(db_config, f"UPDATE {quoted} SET service = 'edited' WHERE id = 1")
+
+    result = _migrate(db_config, table, owner, progress=edit_copied_row)
+
+    assert result.status == "mismatch"
+    assert _query(db_config, "SELECT COUNT(*) FROM dbo.entries WHERE user_id = ?", (owner,))[0][0] == 0
+    assert _query(db_config, "SELECT status, last_id, copied_rows FROM dbo.entries_migration WHERE user_id = ?", (owner,)) == [
+        ("copying", 0, 0)
+    ]
+
+    result = _migrate(db_config, table, owner)
+
+    assert (result.status, result.copied_rows) == ("done", 10)
+    services = [row[0] for row in _query(db_config, "SELECT service FROM dbo.entries WHERE user_id = ?", (owner,))]
+    assert len(services) == 10 and "edited" in services and "svc0" not in services
+
+
+def test_retry_mismatched_resets_stuck_accounts(db_config, make_user):
+    owner = make_user("bob")
+    table = _create_legacy_store(db_config, "bob", owner, 6)
+    _migrate(db_config, table, owner, progress=lambda _fraction: None)
+    _query(db_config, "UPDATE dbo.entries_migration SET status = 'mismatch' WHERE user_id = ?", (owner,)) #stan ze starszej wersji
+
+    assert retry_mismatched(config_path=db_config) == [owner]
+
+    assert _query(db_config, "SELECT COUNT(*) FROM dbo.entries WHERE user_id = ?", (owner,))[0][0] == 0
+    assert _query(db_config, "SELECT status FROM dbo.entries_migration WHERE user_id = ?", (owner,)) == [("copying",)]
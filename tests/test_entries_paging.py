@@ -0,0 +1,117 @@
+"""Stronicowanie kursorem (keyset) i zmiany od znacznika wersji w dbo.entries."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.tablepassword_crud import (
+    ENTRY_SORT_KEYS,
+    add_password_entries,
+    delete_password_entry,
+    latest_entry_version,
+    list_changes_since,
+    list_password_entries_page,
+    update_password_entry,
+)
+
+_SORT_COLUMNS = {"service": 1, "login": 2, "created_at": 3, "expire_date": 4} #pozycja kolumny w wierszu strony
+
+
+def _sample_entries() -> list[tuple]: #wpisy z remisami, różną wielkością liter i pustą datą wygaśnięcia
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    services = ["alpha", "Beta", "beta", "GAMMA", "delta", "Alpha"]
+    return [
+        (
+            services[i % len(services)],
+            f"{'User' if i % 2 else 'user'}{i % 4}",
+            b"secret",
+            None if i % 3 == 0 else base + timedelta(days=i % 5),
+            base - timedelta(hours=i % 7), #ta sama data utworzenia dla kilku wpisów
+        )
+        for i in range(40)
+    ]
+
+
+def _expected_order(rows, sort: str, descending: bool) -> list[int]: #kolejność (kolumna, id) jak w SQL - NULL pierwszy przy ASC
+    column = _SORT_COLUMNS[sort]
+
+    def key(row):
+        value = row[column]
+        if isinstance(value, str):
+            value = value.casefold()
+        return (value is not None, value if value is not None else 0, row[0])
+
+    return [row[0] for row in sorted(rows, key=key, reverse=descending)]
+
+
+def _all_pages(user_id: int, sort: str, descending: bool, config_path: str) -> tuple[list[tuple], int]: #przechodzi przez wszystkie strony
+    rows: list[tuple] = []
+    after = None
+    pages = 0
+    while True:
+        page = list_password_entries_page(
+            user_id, sort=sort, descending=descending, after=after, page_size=7, config_path=config_path
+        )
+        rows += page.entries
+        pages += 1
+        if page.next_cursor is None:
+            return rows, pages
+        after = page.next_cursor
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort", ENTRY_SORT_KEYS)
+def test_keyset_pages_cover_entries_in_order(db_config, make_user, sort, descending):
+    owner = make_user("owner")
+    other = make_user("other")
+    add_password_entries(owner, _sample_entries(), config_path=db_config)
+    add_password_entries(other, _sample_entries()[:5], config_path=db_config) #wpisy innego konta nie mogą trafić na strony
+
+    rows, pages = _all_pages(owner, sort, descending, db_config)
+
+    ids = [row[0] for row in rows]
+    assert len(ids) == len(set(ids)) == 40 #bez duplikatów i pominięć na granicach stron
+    assert pages == 6
+    assert ids == _expected_order(rows, sort, descending)
+
+
+def test_unknown_sort_key_is_rejected(db_config, make_user):
+    owner = make_user("owner")
+    with pytest.raises(ValueError):
+        list_password_entries_page(owner, sort="password", config_path=db_config)
+
+
+def test_changes_since_reports_updates_and_tombstones(db_config, make_user):
+    owner = make_user("owner")
+    other = make_user("other")
+    ids = add_password_entries(owner, [(f"svc{i}", "login", b"secret", None) for i in range(5)], config_path=db_config)
+    (foreign_id,) = add_password_entries(other, [("foreign", "login", b"secret", None)], config_path=db_config)
+    watermark = latest_entry_version(owner, config_path=db_config)
+
+    assert update_password_entry(owner, ids[1], new_service="renamed", config_path=db_config)
+    assert delete_password_entry(owner, ids[3], config_path=db_config)
+    assert delete_password_entry(other, foreign_id, config_path=db_config) #usunięcie u innego konta nie jest zmianą właściciela
+    new_ids = add_password_entries(owner, [("added", "login", b"secret", None)], config_path=db_config)
+
+    changes = list_changes_since(owner, watermark, config_path=db_config)
+
+    assert not changes.overflow
+    assert sorted(entry[0] for entry in changes.entries) == sorted([ids[1], *new_ids])
+    assert {entry[0]: entry[1] for entry in changes.entries}[ids[1]] == "renamed"
+    assert changes.deleted_ids == [ids[3]]
+    assert changes.watermark == latest_entry_version(owner, config_path=db_config)
+
+    again = list_changes_since(owner, changes.watermark, config_path=db_config)
+    assert again.entries == [] and again.deleted_ids == []
+
+
+def test_changes_since_overflow_requests_reload(db_config, make_user):
+    owner = make_user("owner")
+    watermark = latest_entry_version(owner, config_path=db_config)
+    ids = add_password_entries(owner, [(f"svc{i}", "login", b"secret", None) for i in range(3)], config_path=db_config)
+    delete_password_entry(owner, ids[0], config_path=db_config)
+
+    changes = list_changes_since(owner, watermark, limit=2, config_path=db_config)
+
+    assert changes.overflow
+    assert changes.entries == [] and changes.deleted_ids == []
@@ -0,0 +1,90 @@
+"""Eksport i odtwarzanie kopii sejfu."""
+
+import json
+import struct
+from datetime import datetime
+
+import pytest
+
+from db.db_connection import get_pool
+from db.tablepassword_crud import _iter_entry_chunks, add_password_entries
+from db.vault_backup import BACKUP_MAGIC, export_vault, restore_vault
+from security.keyring import SessionKeyRing
+
+
+def _stored_entries(config_path: str, user_id: int) -> list[tuple]: #wpisy z zaszyfrowanymi hasłami (bez id)
+    pool = get_pool(config_path)
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        pool.engine.use_database(cur, "password_manager")
+        rows = [row[1:] for chunk in _iter_entry_chunks(cur, user_id, 100) for row in chunk]
+        cur.close()
+    return sorted(rows)
+
+
+def _rewrite_header(source, target, **changes) -> None: #kopia pliku z podmienionymi polami nagłówka
+    raw = source.read_bytes()
+    start = len(BACKUP_MAGIC)
+    (length,) = struct.unpack(">I", raw[start:start + 4])
+    meta = json.loads(raw[start + 4:start + 4 + length])
+    header = json.dumps({**meta, **changes}, sort_keys=True).encode("utf-8")
+    target.write_bytes(raw[:start] + struct.pack(">I", len(header)) + header + raw[start + 4 + length:])
+
+
+@pytest.fixture
+def keyring():
+    return SessionKeyRing(b"k" * 32)
+
+
+def test_round_trip_keeps_entries_and_created_at(db_config, make_user, keyring, tmp_path):
+    owner = make_user("owner")
+    restored = make_user("restored")
+    add_password_entries(
+        owner,
+        [
+            (f"svc{i}", f"login{i}", f"pass{i}", datetime(2030, 1, i + 1) if i % 2 else None, datetime(2021, 5, i + 1, 8, 30))
+            for i in range(7)
+        ],
+        user_secret=keyring,
+        config_path=db_config,
+    )
+    backup = tmp_path / "vault.pmv"
+
+    assert export_vault(owner, keyring, backup, chunk_size=3, config_path=db_config) == 7
+    assert restore_vault(restored, keyring, backup, config_path=db_config) == 7
+
+    assert _stored_entries(db_config, restored) == _stored_entries(db_config, owner)
+    first = _stored_entries(db_config, restored)[0]
+    assert first[3] == datetime(2021, 5, 1, 8, 30)
+    assert keyring.decrypt(first[2].decode("ascii")) == b"pass0"
+
+
+def test_header_errors_are_reported_precisely(db_config, make_user, keyring, tmp_path):
+    owner = make_user("owner")
+    add_password_entries(owner, [("svc", "login", "pass", None)], user_secret=keyring, config_path=db_config)
+    backup = tmp_path / "vault.pmv"
+    export_vault(owner, keyring, backup, config_path=db_config)
+    broken = tmp_path / "broken.pmv"
+
+    _rewrite_header(backup, broken, version=2)
+    with pytest.raises(ValueError, match="wersja"):
+        restore_vault(owner, keyring, broken, config_path=db_config)
+    _rewrite_header(backup, broken, salt="not base64!")
+    with pytest.raises(ValueError, match="uszkodzony"):
+        restore_vault(owner, keyring, broken, config_path=db_config)
+    with pytest.raises(ValueError, match="innego konta"):
+        restore_vault(owner, SessionKeyRing(b"x" * 32), backup, config_path=db_config)
+
+
+def test_truncated_backup_restores_nothing(db_config, make_user, keyring, tmp_path):
+    owner = make_user("owner")
+    restored = make_user("restored")
+    add_password_entries(owner, [(f"svc{i}", "login", "pass", None) for i in range(5)], user_secret=keyring, config_path=db_config)
+    backup = tmp_path / "vault.pmv"
+    export_vault(owner, keyring, backup, chunk_size=2, config_path=db_config)
+    backup.write_bytes(backup.read_bytes()[:-10])
+
+    with pytest.raises(ValueError):
+        restore_vault(restored, keyring, backup, config_path=db_config)
+
+    assert _stored_entries(db_config, restored) == [] #cała transakcja wycofana
@@ -129,6 +129,7 @@ Rectangle {
             width: 120
             height: 50
             text: qsTr("OK")
+            enabled: !backend.busy
             onClicked: backend.loginUser(loginLoginField.text, loginPasswordField.text, loginMfaField.text)
         }
     }
@@ -240,6 +241,7 @@ Rectangle {
             width: 120
             height: 50
             text: qsTr("OK")
+            enabled: !backend.busy
             onClicked: backend.registerUser(registerLoginField.text, registerPasswordField.text, registerConfirmPasswordField.text)
         }
     }
@@ -22,4 +22,22 @@ ApplicationWindow {
             }
         }
     }
+
+    ProgressBar {
+        id: taskProgress
+        anchors.left: parent.left
+        anchors.right: parent.right
+        anchors.bottom: parent.bottom
+        visible: backend.busy
+        indeterminate: backend.progress < 0
+        value: backend.progress < 0 ? 0 : backend.progress
+    }
+
+    BusyIndicator {
+        anchors.right: parent.right
+        anchors.bottom: taskProgress.top
+        anchors.margins: 12
+        running: backend.busy
+        visible: running
+    }
 }
@@ -1,5 +1,6 @@
 import QtQuick
 import QtQuick.Controls
+import QtQuick.Dialogs
 
 Rectangle {
     id: root
@@ -52,6 +53,48 @@ Rectangle {
         anchors.topMargin: 16
     }
 
+    TextField {
+        id: searchField
+        width: 220
+        height: 32
+        anchors.left: parent.left
+        anchors.top: titleText.top
+        anchors.leftMargin: 20
+        placeholderText: qsTr("Szukaj (serwis, login)")
+        onTextChanged: passwordFilter.setQuery(text)
+    }
+
+    Row {
+        id: sortRow
+        spacing: 4
+        anchors.right: parent.right
+        anchors.top: titleText.top
+        anchors.rightMargin: 20
+
+        ComboBox {
+            id: sortCombo
+            width: 150
+            height: 32
+            textRole: "label"
+            valueRole: "key"
+            model: [
+                { key: "created_at", label: qsTr("Data dodania") },
+                { key: "service", label: qsTr("Serwis") },
+                { key: "login", label: qsTr("Login") },
+                { key: "expire_date", label: qsTr("Data wygaśnięcia") }
+            ]
+            currentIndex: indexOfValue(backend.sortKey)
+            onActivated: if (currentValue !== backend.sortKey) backend.sortPasswords(currentValue)
+        }
+
+        Button {
+            width: 32
+            height: 32
+            text: backend.sortDescending ? "↓" : "↑"
+            onClicked: backend.sortPasswords(backend.sortKey) //ten sam klucz odwraca kierunek
+        }
+    }
+
     Row {
         id: headersRow
         spacing: 32
@@ -95,7 +138,7 @@ Rectangle {
             width: 760
             height: 355
             spacing: 12
-            model: passwordModel
+            model: passwordFilter.active ? passwordFilter : passwordModel //wyniki wyszukiwania lub cała lista
             clip: true
             delegate: Rectangle {
                 width: passwordList.width
@@ -212,6 +255,71 @@ Rectangle {
         onClicked: backend.startAddPassword()
     }
 
+    Button {
+        id: importButton
+        y: 534
+        text: qsTr("IMPORTUJ CSV")
+        width: 140
+        height: 40
+        enabled: !backend.busy
+        anchors.left: parent.left
+        anchors.bottom: parent.bottom
+        anchors.leftMargin: 540
+        anchors.bottomMargin: 76
+        onClicked: importDialog.open()
+    }
+
+    FileDialog {
+        id: importDialog
+        title: qsTr("Wybierz plik CSV z eksportu menedżera haseł")
+        nameFilters: [qsTr("Pliki CSV (*.csv)")]
+        onAccepted: backend.importPasswords(selectedFile.toString())
+    }
+
+    Button {
+        id: exportButton
+        y: 534
+        text: qsTr("ZAPISZ KOPIĘ")
+        width: 140
+        height: 40
+        enabled: !backend.busy
+        anchors.left: parent.left
+        anchors.bottom: parent.bottom
+        anchors.leftMargin: 390
+        anchors.bottomMargin: 76
+        onClicked: exportDialog.open()
+    }
+
+    FileDialog {
+        id: exportDialog
+        title: qsTr("Zapisz zaszyfrowaną kopię sejfu")
+        fileMode: FileDialog.SaveFile
+        defaultSuffix: "pmvault"
+        nameFilters: [qsTr("Kopie sejfu (*.pmvault)")]
+        onAccepted: backend.exportVault(selectedFile.toString())
+    }
+
+    Button {
+        id: restoreButton
+        y: 534
+        text: qsTr("ODTWÓRZ KOPIĘ")
+        width: 140
+        height: 40
+        enabled: !backend.busy
+        anchors.left: parent.left
+        anchors.bottom: parent.bottom
+        anchors.leftMargin: 240
+        anchors.bottomMargin: 76
+        onClicked: restoreDialog.open()
+    }
+
+    FileDialog {
+        id: restoreDialog
+        title: qsTr("Wybierz plik kopii sejfu")
+        nameFilters: [qsTr("Kopie sejfu (*.pmvault)"), qsTr("Wszystkie pliki (*)")]
+        onAccepted: backend.restoreVault(selectedFile.toString())
+    }
+
     Button {
         id: logoutButton1
         x: 862